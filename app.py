@@ -1,71 +1,71 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-from flask_sqlalchemy import SQLAlchemy
+import os
+
+# O monkey_patch do eventlet fica no ponto de entrada do servidor (wsgi.py), antes
+# deste import: importar o app não altera socket/threading do processo.
+from flask import Blueprint, Flask, Response, abort, current_app, render_template, request, jsonify, redirect, send_file, send_from_directory, stream_with_context, url_for, flash
 from flask_login import (
-    LoginManager,
-    UserMixin,
     login_user,
     logout_user,
     login_required,
     current_user,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
-from flask_socketio import SocketIO, emit
-import os
+from flask_socketio import emit, join_room
+from urllib.parse import urlsplit
+from bestiary_index import BestiaryIndex
+from hunt_planner import HuntPlanner, multiplier as hunt_multiplier
+from chat_archive import ChatArchive, date_bounds
+from chat_fanout import EmitCoalescer, make_client_manager
+from chat_history import ChatHistory
+from chat_writer import ChatWriteBehind
+from rate_limit import FloodControl, make_bucket_store
+from sqlalchemy import case, func, insert, select, text as sql_text
+from sqlalchemy.exc import IntegrityError
+from config import configure
+from extensions import compression, job_queue, login_manager, profiler, query_stats, socketio, telemetry
+from jobs import JobError, QueueFull
+from models import db, User, Character, Job, XpEntry, XpLog, XpSnapshot, ChatMessage, add_xp_bulk, delete_characters, init_schema
+from query_stats import query_budget
+import chat_search
+import hmac
+import re
+import xp_export
 import json
+import threading
 import requests
 from datetime import date, datetime
 
 
-app = Flask(__name__)
-
-
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
-
-
-# Banco principal (app)
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-    "DATABASE_URL",
-    "sqlite:///" + os.path.join(app.root_path, "data", "app.db"),
-)
-
-
-# Banco separado do chat (bind)
-app.config["SQLALCHEMY_BINDS"] = {
-    "chat": os.environ.get(
-        "CHAT_DATABASE_URL",
-        "sqlite:///" + os.path.join(app.root_path, "data", "chat.db"),
-    )
-}
-
-
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-db = SQLAlchemy(app)
 
+# Rotas HTTP; registradas no app em create_app()
+web = Blueprint("web", __name__)
 
-# SocketIO (cors_allowed_origins="*" para simplificar; pode restringir depois)
-socketio = SocketIO(app, cors_allowed_origins="*")
 
+XP_TABLE_FILE = os.path.join(BASE_DIR, "data", "experience_table_tibia.json")
+BESTIARY_FILE = os.path.join(BASE_DIR, "static", "data", "bestiary.json")
+BESTIARY_ATLAS_FILE = os.path.join(BASE_DIR, "static", "data", "bestiary_atlas.json")
+BESTIARY_ICONS_DIR = os.path.join(BASE_DIR, "static", "img", "bestiary", "monsters")
 
-login_manager = LoginManager()
-login_manager.login_view = "index"
-login_manager.init_app(app)
-login_manager.login_message = "Faça login para acessar esta página."
-login_manager.login_message_category = "error"
 
-
-XP_TABLE_FILE = os.path.join(app.root_path, "data", "experience_table_tibia.json")
+# índice de busca do bestiário: montado no primeiro uso e mantido pelo processo
+bestiary_index = BestiaryIndex(BESTIARY_FILE, BESTIARY_ATLAS_FILE, BESTIARY_ICONS_DIR)
+hunt_planner = HuntPlanner(bestiary_index)
 
 
 
 # =========================
 # Anti-cache
 # =========================
-@app.after_request
+@web.after_app_request
 def add_no_cache_headers(response):
+    # estáticos versionados (?v=hash: atlas do bestiário, ícones) mudam de URL a
+    # cada build, então podem ficar no cache do navegador para sempre
+    if request.path.startswith("/static/") and request.args.get("v") and response.status_code == 200:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
@@ -76,7 +76,14 @@ def add_no_cache_headers(response):
 # =========================
 # Requests Session com retry
 # =========================
-_retry = Retry(
+class _CountedRetry(Retry):
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)  # levanta quando as tentativas acabam
+        telemetry.inc("yonexus_upstream_retries_total")
+        return retry
+
+
+_retry = _CountedRetry(
     total=3,
     backoff_factor=0.6,
     status_forcelist=[429, 500, 502, 503, 504],
@@ -84,98 +91,55 @@ _retry = Retry(
 )
 
 
-_http = requests.Session()
-_http.mount("https://", HTTPAdapter(max_retries=_retry))
-_http.mount("http://", HTTPAdapter(max_retries=_retry))
-
-
-CHAR_INFO_CACHE = {}  # name -> dict {vocation, level, world}
-
-
-
-# =========================
-# Models (banco principal)
-# =========================
-class User(db.Model, UserMixin):
-    id = db.Column(db.Integer, primary_key=True)
+_http = None  # criada no primeiro uso (o pool depende da config do app)
+_http_lock = threading.Lock()
 
 
-    username = db.Column(db.String(40), unique=True, nullable=False, index=True)
-    email = db.Column(db.String(255), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(255), nullable=False)
+def _http_session():
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                session = requests.Session()
+                for prefix in ("https://", "http://"):
+                    session.mount(prefix, HTTPAdapter(
+                        max_retries=_retry,
+                        pool_connections=current_app.config["HTTP_POOL_CONNECTIONS"],
+                        pool_maxsize=current_app.config["HTTP_POOL_MAXSIZE"],
+                    ))
+                _http = session
+    return _http
 
 
-    vip_until = db.Column(db.Date, nullable=True)  # NULL = free
-    active_character_id = db.Column(db.Integer, nullable=True)
-
-
-    characters = db.relationship(
-        "Character",
-        backref="user",
-        lazy=True,
-        cascade="all, delete-orphan",
-    )
+# Semáforo por host: com monkey_patch, threading vira verde e só suspende a greenlet
+_host_slots = {}
+_host_slots_lock = threading.Lock()
 
 
-    def set_password(self, password_plain: str):
-        self.password_hash = generate_password_hash(password_plain)
+def _host_semaphore(url: str):
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        sem = _host_slots.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(current_app.config["HTTP_MAX_PER_HOST"])
+            _host_slots[host] = sem
+    return sem
 
 
-    def check_password(self, password_plain: str) -> bool:
-        return check_password_hash(self.password_hash, password_plain)
-
-
-    def is_vip(self) -> bool:
-        return self.vip_until is not None and self.vip_until >= date.today()
-
-
-
-class Character(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
-
-
-    char_name = db.Column(db.String(80), nullable=False)
-    xp_start = db.Column(db.Integer, nullable=False, default=0)
-    xp_goal = db.Column(db.Integer, nullable=False, default=0)
-    daily_goal = db.Column(db.Integer, nullable=False, default=0)
-    goal_level = db.Column(db.Integer, nullable=True)
-
-
-    logs = db.relationship(
-        "XpLog",
-        backref="character",
-        lazy=True,
-        cascade="all, delete-orphan",
-    )
-
-
-
-class XpLog(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    character_id = db.Column(db.Integer, db.ForeignKey("character.id"), nullable=False, index=True)
-    date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
-    xp = db.Column(db.Integer, nullable=False, default=0)
-
-
-
-# =========================
-# Model do chat (banco separado)
-# =========================
-class ChatMessage(db.Model):
-    __bind_key__ = "chat"
-
-
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(40), nullable=False, index=True)
-
-
-    channel_type = db.Column(db.String(12), nullable=False, default="global", index=True)
-    world = db.Column(db.String(60), nullable=True, index=True)
+def http_get(url: str, **kwargs):
+    kwargs.setdefault("timeout", current_app.config["HTTP_TIMEOUT"])
+    host = urlsplit(url).netloc
+    status = "error"
+    try:
+        with _host_semaphore(url), telemetry.timed("yonexus_upstream_request_duration_seconds", (host,)):
+            r = _http_session().get(url, **kwargs)
+        status = str(r.status_code)
+        return r
+    finally:
+        telemetry.inc("yonexus_upstream_requests_total", (host, status))
 
 
-    text = db.Column(db.String(500), nullable=False)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+CHAR_INFO_CACHE = {}  # name -> dict {vocation, level, world}
 
 
 
@@ -191,11 +155,6 @@ def load_user(user_id):
 # =========================
 # Helpers
 # =========================
-def ensure_data_dir():
-    os.makedirs(os.path.join(app.root_path, "data"), exist_ok=True)
-
-
-
 def load_xp_table():
     with open(XP_TABLE_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -212,9 +171,9 @@ def xp_for_level(level: int) -> int:
 
 
 def get_character_info(name):
-    url = f"https://api.tibiadata.com/v4/character/{name.replace(' ', '%20')}"
+    url = f"{current_app.config['TIBIADATA_URL']}/v4/character/{name.replace(' ', '%20')}"
     try:
-        r = _http.get(url, timeout=10)
+        r = http_get(url)
         r.raise_for_status()
         char = r.json()["character"]["character"]
         info = {
@@ -223,10 +182,13 @@ def get_character_info(name):
             "world": char["world"],
         }
         CHAR_INFO_CACHE[name] = info
+        telemetry.inc("yonexus_char_info_total", ("fresh",))
         return info
     except Exception:
         if name in CHAR_INFO_CACHE:
+            telemetry.inc("yonexus_char_info_total", ("stale",))
             return CHAR_INFO_CACHE[name]
+        telemetry.inc("yonexus_char_info_total", ("miss",))
         raise
 
 
@@ -250,32 +212,262 @@ def get_current_character() -> Character:
 
 
 
-def serialize_chat_row(r: ChatMessage):
+# =========================
+# Validação em segundo plano (jobs.py)
+# =========================
+XP_START_LOCKED = (
+    "XP inicial só pode ser alterado quando não houver histórico de XP. "
+    "Zere o histórico ou selecione outro personagem."
+)
+CHARACTER_NOT_FOUND = "Personagem não encontrado no TibiaData. Verifique o nome."
+AUTO_XP_LOCKED = (
+    "O XP deste personagem é coletado automaticamente pelo highscore. "
+    "Desligue a coleta automática em Configurações para lançar manualmente."
+)
+
+
+
+def _parse_character_form(xp_start_raw, goal_level_raw, daily_goal_raw):
+    """
+    Campos do cadastro de personagem que não dependem do TibiaData.
+    xp_start inválido → ValueError; nível/meta inválidos caem no padrão.
+    """
+    xp_start = int(xp_start_raw) if xp_start_raw else None
+    try:
+        goal_level = int(goal_level_raw) if goal_level_raw else None
+    except ValueError:
+        goal_level = None
+    try:
+        daily_goal = int(daily_goal_raw) if daily_goal_raw else 1_000_000
+    except ValueError:
+        daily_goal = 1_000_000
+    return xp_start, goal_level, daily_goal
+
+
+
+def _job_character_info(name):
+    """get_character_info para jobs: personagem inexistente vira JobError (sem retry)."""
+    try:
+        return get_character_info(name)
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 0
+        if 400 <= status < 500 and status != 429:
+            raise JobError(CHARACTER_NOT_FOUND)
+        raise
+    except (KeyError, TypeError, ValueError):
+        raise JobError(CHARACTER_NOT_FOUND)
+
+
+
+def _xp_for_level_or_fail(level, message):
+    try:
+        return int(xp_for_level(level))
+    except Exception:
+        raise JobError(message)
+
+
+
+def _mark_character_invalid(job, message):
+    ch = db.session.get(Character, job.character_id) if job.character_id else None
+    if ch is not None:
+        ch.validation = "invalid"
+
+
+
+@job_queue.handler("character_validate", on_failure=_mark_character_invalid)
+def job_character_validate(job):
+    """Personagem novo (/register, /characters/add): nível no TibiaData → xp_start e xp_goal."""
+    ch = db.session.get(Character, job.character_id)
+    if ch is None:
+        raise JobError("Personagem não encontrado.")
+    data = job.data
+    info = _job_character_info(ch.char_name)
+    level = int(info["level"])
+
+    xp_min = _xp_for_level_or_fail(level, "Tabela de XP não possui o nível atual do personagem.")
+    xp_start = xp_min if data.get("xp_start") is None else int(data["xp_start"])
+    if xp_start < xp_min:
+        raise JobError(f"XP inicial não pode ser menor que {xp_min} (mínimo do nível {level}).")
+
+    goal_level = data.get("goal_level") or level + 10
+    if goal_level <= level:
+        goal_level = level + 1
+
+    ch.xp_goal = _xp_for_level_or_fail(goal_level, "Nível meta inválido (não existe na tabela).")
+    ch.xp_start = xp_start
+    ch.goal_level = goal_level
+    ch.validation = None
+    return {"character_id": ch.id, "character": info}
+
+
+
+@job_queue.handler("character_config")
+def job_character_config(job):
+    """POST /config que depende do nível atual (nome, XP inicial, nível meta)."""
+    ch = db.session.get(Character, job.character_id)
+    if ch is None:
+        raise JobError("Personagem não encontrado.")
+    changes = job.data
+    info = _job_character_info(changes["char_name"])
+    level = int(info["level"])
+
+    if "xp_start" in changes:
+        xp_min = _xp_for_level_or_fail(level, "Tabela de XP não possui o nível atual do personagem.")
+        has_history = XpLog.query.filter_by(character_id=ch.id).first() is not None
+        if has_history and changes["xp_start"] != ch.xp_start:
+            raise JobError(XP_START_LOCKED)  # XP registrado depois do pedido
+        if changes["xp_start"] < xp_min:
+            raise JobError(f"XP inicial não pode ser menor que {xp_min} (mínimo do nível {level}).")
+        ch.xp_start = changes["xp_start"]
+    elif ch.validation:
+        # personagem que nunca foi validado (nome corrigido): começa do mínimo do nível
+        ch.xp_start = _xp_for_level_or_fail(level, "Tabela de XP não possui o nível atual do personagem.")
+
+    # Se goal_level não veio, mantém o atual; se estiver vazio no banco, cria um padrão
+    goal_level = changes.get("goal_level", ch.goal_level) or level + 10
+    if goal_level <= level:
+        raise JobError("O nível meta deve ser maior que o nível atual do personagem.")
+    xp_goal = _xp_for_level_or_fail(goal_level, "Nível meta inválido (não existe na tabela).")
+
+    renamed = (ch.char_name or "").strip().lower() != changes["char_name"].strip().lower()
+    ch.char_name = changes["char_name"]
+    ch.daily_goal = changes.get("daily_goal", ch.daily_goal)
+    ch.goal_level = goal_level
+    ch.xp_goal = xp_goal
+    ch.validation = None
+    if renamed:
+        XpLog.query.filter_by(character_id=ch.id).delete()
+
+    return {"metrics": xp_delta(ch, reset=renamed, config=True, info=info)}
+
+
+
+def serialize_job(job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "character_id": job.character_id,
+        "attempts": job.attempts,
+        "error": job.error if job.status == "failed" else None,
+        "result": json.loads(job.result) if job.result else None,
+    }
+
+
+
+@job_queue.on_finish
+def _job_finished(job, elapsed):
+    telemetry.inc("yonexus_jobs_total", (job.kind, job.status))
+    telemetry.observe("yonexus_job_duration_seconds", elapsed, (job.kind,))
+    if job.status in ("done", "failed") and job.user_id:
+        socketio.emit("job_done", serialize_job(job), to=user_room(job.user_id))
+
+
+
+def latest_job(ch):
+    return Job.query.filter_by(character_id=ch.id).order_by(Job.id.desc()).first()
+
+
+
+def serialize_chat_row(r):
+    if isinstance(r, dict):
+        return {
+            "id": r["id"],
+            "username": r["username"],
+            "channel_type": r["channel_type"],
+            "world": r["world"],
+            "text": r["text"],
+            "created_at": r["created_at"].isoformat() + "Z",
+        }
     return {
         "id": r.id,
         "username": r.username,
+        "channel_type": r.channel_type,
+        "world": r.world,
         "text": r.text,
         "created_at": r.created_at.isoformat() + "Z",
     }
 
 
+def chat_room(channel_type: str, world=None) -> str:
+    if channel_type == "world":
+        return f"chat:world:{world}"
+    return "chat:global"
 
-with app.app_context():
-    ensure_data_dir()
-    db.create_all()
+
+
+# Serviços do chat: dependem da config, então são criados em create_app()
+chat_writer = None
+chat_history = None
+flood_control = None
+chat_batcher = None
+
+
+def _on_socket_emit(event, data, room):
+    # mensagens vindas de outros workers também alimentam o histórico em memória
+    if event == "chat_message" and isinstance(data, dict) and "id" in data:
+        chat_history.append(data.get("channel_type") or "global", data.get("world"), data)
+    elif event == "chat_batch" and isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict) and "id" in item:
+                chat_history.append(item.get("channel_type") or "global", item.get("world"), item)
+
+
+def _init_chat(app):
+    global chat_writer, chat_history, flood_control, chat_batcher
+
+    chat_writer = ChatWriteBehind(
+        app,
+        db,
+        ChatMessage,
+        max_batch=app.config["CHAT_FLUSH_MAX_BATCH"],
+        interval_ms=app.config["CHAT_FLUSH_INTERVAL_MS"],
+        max_queue=app.config["CHAT_QUEUE_MAX"],
+        max_retries=app.config["CHAT_FLUSH_MAX_RETRIES"],
+        node_lease_s=app.config["CHAT_NODE_LEASE_SECONDS"],
+    )
+
+    chat_history = ChatHistory(
+        app,
+        db,
+        ChatMessage,
+        serialize_chat_row,
+        size=app.config["CHAT_RING_SIZE"],
+        archive=ChatArchive(app.config["CHAT_ARCHIVE_DIR"]),
+    )
+
+    # estado dos buckets no mesmo backend da fila do Socket.IO (compartilhado entre workers)
+    flood_control = FloodControl(
+        make_bucket_store(app.config["SOCKETIO_MESSAGE_QUEUE"]),
+        user_rate=app.config["CHAT_RATE_USER"],
+        user_burst=app.config["CHAT_BURST_USER"],
+        conn_rate=app.config["CHAT_RATE_CONN"],
+        conn_burst=app.config["CHAT_BURST_CONN"],
+    )
+
+    chat_batcher = (
+        EmitCoalescer(socketio, window_ms=app.config["CHAT_BATCH_WINDOW_MS"])
+        if app.config["CHAT_BATCH_WINDOW_MS"] > 0 else None
+    )
+
+    # contadores do anti-flood e da fila de gravação no /internal/metrics (somados entre workers)
+    telemetry.collector(_chat_metrics)
+
+
+SOCKET_WORLDS = {}  # sid -> mundo do personagem ativo (sockets ficam presos ao worker)
 
 
 
 # =========================
 # Rotas públicas
 # =========================
-@app.route("/")
+@web.route("/")
 def index():
     return render_template("home.html")
 
 
 
-@app.route("/xp-table")
+@web.route("/xp-table")
 def xp_table_public():
     return jsonify(load_xp_table())
 
@@ -284,7 +476,7 @@ def xp_table_public():
 # =========================
 # Auth
 # =========================
-@app.route("/register", methods=["POST"])
+@web.route("/register", methods=["POST"])
 def register():
     username = (request.form.get("username", "") or "").strip().lower()
     email = (request.form.get("email", "") or "").strip().lower()
@@ -299,100 +491,56 @@ def register():
 
     if not username or not email or not password:
         flash("Preencha usuário, email e senha.")
-        return redirect(url_for("index"))
+        return redirect(url_for("web.index"))
 
 
     if not char_name:
         flash("Informe o nome do personagem.")
-        return redirect(url_for("index"))
+        return redirect(url_for("web.index"))
 
 
     if User.query.filter((User.username == username) | (User.email == email)).first():
         flash("Usuário ou email já cadastrado.")
-        return redirect(url_for("index"))
-
-
-    try:
-        info = get_character_info(char_name)
-        current_level = int(info["level"])
-    except Exception:
-        flash("Não foi possível encontrar esse personagem na API. Verifique o nome e tente novamente.")
-        return redirect(url_for("index"))
+        return redirect(url_for("web.index"))
 
 
     try:
-        xp_min = int(xp_for_level(current_level))
-    except Exception:
-        flash("Tabela de XP não possui o nível atual do personagem.")
-        return redirect(url_for("index"))
-
-
-    try:
-        xp_start = int(xp_start_raw) if xp_start_raw else xp_min
-    except Exception:
+        xp_start, goal_level, daily_goal = _parse_character_form(xp_start_raw, goal_level_raw, daily_goal_raw)
+    except ValueError:
         flash("XP inicial inválido.")
-        return redirect(url_for("index"))
-
-
-    if xp_start < xp_min:
-        flash(f"XP inicial não pode ser menor que {xp_min} (mínimo do nível {current_level}).")
-        return redirect(url_for("index"))
-
-
-    try:
-        daily_goal = int(daily_goal_raw) if daily_goal_raw else 1_000_000
-    except Exception:
-        daily_goal = 1_000_000
-
-
-    try:
-        goal_level = int(goal_level_raw) if goal_level_raw else (current_level + 10)
-    except Exception:
-        goal_level = current_level + 10
-
-
-    if goal_level <= current_level:
-        goal_level = current_level + 1
-
-
-    try:
-        xp_goal = int(xp_for_level(goal_level))
-    except Exception:
-        flash("Nível meta inválido (não existe na tabela).")
-        return redirect(url_for("index"))
+        return redirect(url_for("web.index"))
 
 
+    # o personagem é conferido no TibiaData em segundo plano (job "character_validate");
+    # a conta já nasce e o dashboard espera a validação
     user = User(username=username, email=email)
     user.set_password(password)
-
-
-    ch = Character(
-        char_name=char_name,
-        xp_start=xp_start,
-        goal_level=goal_level,
-        xp_goal=xp_goal,
-        daily_goal=daily_goal,
-    )
-
-
+    ch = Character(char_name=char_name, daily_goal=daily_goal, validation="pending")
     user.characters.append(ch)
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
 
 
     try:
-        user.active_character_id = ch.id
-        db.session.commit()
-    except Exception:
+        job_queue.enqueue("character_validate", {"xp_start": xp_start, "goal_level": goal_level},
+                          user_id=user.id, character_id=ch.id)
+    except QueueFull:
         db.session.rollback()
+        flash("Muitos cadastros sendo processados agora. Tente novamente em alguns minutos.")
+        return redirect(url_for("web.index"))
+
+
+    user.active_character_id = ch.id
+    db.session.commit()
+    job_queue.wake()
 
 
     login_user(user)
-    return redirect(url_for("index"))
+    return redirect(url_for("web.index"))
 
 
 
-@app.route("/login", methods=["POST"])
+@web.route("/login", methods=["POST"])
 def login():
     username_or_email = (request.form.get("username", "") or "").strip().lower()
     password = request.form.get("password", "") or ""
@@ -405,26 +553,26 @@ def login():
 
     if not user or not user.check_password(password):
         flash("Login inválido.")
-        return redirect(url_for("index"))
+        return redirect(url_for("web.index"))
 
 
     login_user(user)
-    return redirect(url_for("index"))
+    return redirect(url_for("web.index"))
 
 
 
-@app.route("/logout", methods=["POST"])
+@web.route("/logout", methods=["POST"])
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for("index"))
+    return redirect(url_for("web.index"))
 
 
 
 # =========================
 # Multi-personagem
 # =========================
-@app.route("/characters/select", methods=["POST"])
+@web.route("/characters/select", methods=["POST"])
 @login_required
 def characters_select():
     char_id_raw = request.form.get("character_id") or (request.json or {}).get("character_id")
@@ -432,29 +580,29 @@ def characters_select():
         char_id = int(char_id_raw)
     except Exception:
         flash("Personagem inválido.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     ch = Character.query.filter_by(user_id=current_user.id, id=char_id).first()
     if not ch:
         flash("Personagem não encontrado.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     current_user.active_character_id = ch.id
     db.session.commit()
     flash("Personagem selecionado.")
-    return redirect(url_for("xp_tracker"))
+    return redirect(url_for("web.xp_tracker"))
 
 
 
-@app.route("/characters/add", methods=["POST"])
+@web.route("/characters/add", methods=["POST"])
 @login_required
 def add_character():
     existing_count = Character.query.filter_by(user_id=current_user.id).count()
     if (not current_user.is_vip()) and existing_count >= 1:
         flash("Recurso disponível apenas para VIP (múltiplos personagens).")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     char_name = (request.form.get("char_name", "") or "").strip()
@@ -465,7 +613,7 @@ def add_character():
 
     if not char_name:
         flash("Informe o nome do personagem.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     dup = Character.query.filter_by(user_id=current_user.id, char_name=char_name).first()
@@ -473,83 +621,41 @@ def add_character():
         current_user.active_character_id = dup.id
         db.session.commit()
         flash("Esse personagem já existe na sua conta. Selecionado como ativo.")
-        return redirect(url_for("xp_tracker"))
-
-
-    try:
-        info = get_character_info(char_name)
-        current_level = int(info["level"])
-    except Exception:
-        flash("Não foi possível validar esse personagem na API agora. Verifique o nome e tente novamente.")
-        return redirect(url_for("xp_tracker"))
-
-
-    try:
-        xp_min = int(xp_for_level(current_level))
-    except Exception:
-        flash("Tabela de XP não possui o nível atual do personagem.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     try:
-        xp_start = int(xp_start_raw) if xp_start_raw else xp_min
-    except Exception:
+        xp_start, goal_level, daily_goal = _parse_character_form(xp_start_raw, goal_level_raw, daily_goal_raw)
+    except ValueError:
         flash("XP inicial inválido.")
-        return redirect(url_for("xp_tracker"))
-
-
-    if xp_start < xp_min:
-        flash(f"XP inicial não pode ser menor que {xp_min} (mínimo do nível {current_level}).")
-        return redirect(url_for("xp_tracker"))
-
-
-    try:
-        daily_goal = int(daily_goal_raw) if daily_goal_raw else 1_000_000
-    except Exception:
-        daily_goal = 1_000_000
-
-
-    try:
-        goal_level = int(goal_level_raw) if goal_level_raw else (current_level + 10)
-    except Exception:
-        goal_level = current_level + 10
+        return redirect(url_for("web.xp_tracker"))
 
 
-    if goal_level <= current_level:
-        goal_level = current_level + 1
+    ch = Character(user_id=current_user.id, char_name=char_name, daily_goal=daily_goal, validation="pending")
+    db.session.add(ch)
+    db.session.flush()
 
 
     try:
-        xp_goal = int(xp_for_level(goal_level))
-    except Exception:
-        flash("Nível meta inválido (não existe na tabela).")
-        return redirect(url_for("xp_tracker"))
-
-
-    ch = Character(
-        user_id=current_user.id,
-        char_name=char_name,
-        xp_start=xp_start,
-        goal_level=goal_level,
-        xp_goal=xp_goal,
-        daily_goal=daily_goal,
-    )
-
-
-    db.session.add(ch)
-    db.session.commit()
+        job_queue.enqueue("character_validate", {"xp_start": xp_start, "goal_level": goal_level},
+                          user_id=current_user.id, character_id=ch.id)
+    except QueueFull:
+        db.session.rollback()
+        flash("Muitos personagens sendo validados agora. Tente novamente em alguns minutos.")
+        return redirect(url_for("web.xp_tracker"))
 
 
     current_user.active_character_id = ch.id
     db.session.commit()
+    job_queue.wake()
 
 
-    flash("Personagem adicionado e selecionado.")
-    return redirect(url_for("xp_tracker"))
+    flash("Personagem adicionado e selecionado. Validando no TibiaData...")
+    return redirect(url_for("web.xp_tracker"))
 
 
 
-@app.route("/characters/delete", methods=["POST"])
+@web.route("/characters/delete", methods=["POST"])
 @login_required
 def characters_delete():
     char_id_raw = request.form.get("character_id") or (request.json or {}).get("character_id")
@@ -557,19 +663,19 @@ def characters_delete():
         char_id = int(char_id_raw)
     except Exception:
         flash("Personagem inválido.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     ch = Character.query.filter_by(user_id=current_user.id, id=char_id).first()
     if not ch:
         flash("Personagem não encontrado.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     total = Character.query.filter_by(user_id=current_user.id).count()
     if total <= 1:
         flash("Você não pode excluir o último personagem.")
-        return redirect(url_for("xp_tracker"))
+        return redirect(url_for("web.xp_tracker"))
 
 
     if current_user.active_character_id == ch.id:
@@ -580,19 +686,20 @@ def characters_delete():
         current_user.active_character_id = other.id if other else None
 
 
-    db.session.delete(ch)
+    # banco sem ON DELETE CASCADE (não migrado): delete_characters apaga os filhos antes
+    delete_characters([ch.id])
     db.session.commit()
 
 
     flash("Personagem excluído.")
-    return redirect(url_for("xp_tracker"))
+    return redirect(url_for("web.xp_tracker"))
 
 
 
 # =========================
 # XP tracker
 # =========================
-@app.route("/xp-tracker")
+@web.route("/xp-tracker")
 @login_required
 def xp_tracker():
     get_current_character()
@@ -600,27 +707,34 @@ def xp_tracker():
 
 
 
-@app.route("/more-metrics")
+@web.route("/more-metrics")
 @login_required
 def more_metrics():
     return render_template("more_metrics.html")
 
 
 
-@app.route("/metrics")
+@web.route("/metrics")
 @login_required
+@query_budget(5)  # consultado a cada poucos segundos pelo dashboard
 def metrics():
     ch = get_current_character()
     if not ch:
         return jsonify({"error": "Nenhum personagem cadastrado."}), 400
 
-    log_rows = (
-        XpLog.query
-        .filter_by(character_id=ch.id)
-        .order_by(XpLog.date.asc())
-        .all()
-    )
-    log = [{"date": r.date, "xp": r.xp} for r in log_rows]
+    if ch.validation == "pending":
+        job = latest_job(ch)
+        return jsonify({"pending": True, "char_name": ch.char_name,
+                        "job": serialize_job(job) if job else None}), 202
+    if ch.validation == "invalid":
+        job = latest_job(ch)
+        reason = job.error if job and job.error else CHARACTER_NOT_FOUND
+        return jsonify({
+            "error": f"Não foi possível validar {ch.char_name}: {reason} Corrija em Configurações.",
+            "invalid": True,
+        }), 422
+
+    summary = xp_summary(ch)
 
     try:
         info = get_character_info(ch.char_name)
@@ -629,45 +743,150 @@ def metrics():
             "error": "API do TibiaData indisponível no momento. Tente novamente em alguns segundos."
         }), 503
 
-    xp_total = ch.xp_start + sum(d["xp"] for d in log)
-    xp_remaining = max(0, ch.xp_goal - xp_total)
+    summary["character"] = info
+    return jsonify(summary)
 
-    positives = [d["xp"] for d in log if d["xp"] > 0]
-    avg_xp = sum(positives) / len(positives) if positives else 0
-    days_estimate = xp_remaining / avg_xp if avg_xp > 0 else None
 
-    today = date.today().isoformat()
-    today_xp = next((d["xp"] for d in log if d["date"] == today), 0)
+
+def _xp_numbers(ch, xp_sum, avg_xp, today_xp) -> dict:
+    """Contas do dashboard a partir da soma do log, da média dos dias positivos e do XP de hoje."""
+    xp_total = ch.xp_start + xp_sum
+    xp_remaining = max(0, ch.xp_goal - xp_total)
+    days_estimate = xp_remaining / avg_xp if avg_xp > 0 else None
     daily_progress = (
         min(100, round((today_xp / ch.daily_goal) * 100, 1))
         if ch.daily_goal > 0 else 0
     )
-
-    return jsonify({
-        "config": {
-            "char_name": ch.char_name,
-            "xp_start": ch.xp_start,
-            "xp_goal": ch.xp_goal,
-            "daily_goal": ch.daily_goal,
-            "goal_level": ch.goal_level
-        },
-        "character": info,
+    return {
         "xp_current": xp_total,
         "xp_remaining": xp_remaining,
         "average_xp": round(avg_xp),
         "days_estimate": round(days_estimate) if days_estimate else None,
         "today_xp": today_xp,
         "daily_progress": daily_progress,
+    }
+
+
+def _xp_config(ch) -> dict:
+    return {
+        "character_id": ch.id,
+        "char_name": ch.char_name,
+        "xp_start": ch.xp_start,
+        "xp_goal": ch.xp_goal,
+        "daily_goal": ch.daily_goal,
+        "goal_level": ch.goal_level,
+        "auto_xp": ch.auto_xp
+    }
+
+
+def xp_summary(ch) -> dict:
+    """Números do dashboard (tudo do /metrics menos o TibiaData)."""
+    log_rows = (
+        XpLog.query
+        .filter_by(character_id=ch.id)
+        .order_by(XpLog.date.asc())
+        .all()
+    )
+    log = [{"date": r.date, "xp": r.xp} for r in log_rows]
+
+    positives = [d["xp"] for d in log if d["xp"] > 0]
+    avg_xp = sum(positives) / len(positives) if positives else 0
+    today = date.today().isoformat()
+    today_xp = next((d["xp"] for d in log if d["date"] == today), 0)
+
+    return {
+        "config": _xp_config(ch),
+        **_xp_numbers(ch, sum(d["xp"] for d in log), avg_xp, today_xp),
         "daily_log": log
-    })
+    }
 
 
-@app.route("/add_xp", methods=["POST"])
+def xp_deltas(chars, dates=None) -> dict:
+    """
+    {character_id: delta} de vários personagens com no máximo duas queries (totais
+    e dias alterados agrupados por personagem), não duas por personagem.
+    dates: {character_id: [dias alterados]}.
+    """
+    dates = dates or {}
+    today = date.today().isoformat()
+    totals = {
+        char_id: (xp_sum, avg_xp, today_xp)
+        for char_id, xp_sum, avg_xp, today_xp in db.session.execute(
+            select(
+                XpLog.character_id,
+                func.coalesce(func.sum(XpLog.xp), 0),
+                func.avg(case((XpLog.xp > 0, XpLog.xp))),
+                func.coalesce(func.sum(case((XpLog.date == today, XpLog.xp), else_=0)), 0),
+            )
+            .where(XpLog.character_id.in_([c.id for c in chars]))
+            .group_by(XpLog.character_id)
+        )
+    }
+
+    wanted = {(char_id, d) for char_id, days in dates.items() for d in days}
+    logs = {}
+    if wanted:
+        for char_id, d, xp in db.session.execute(
+            select(XpLog.character_id, XpLog.date, func.sum(XpLog.xp))
+            .where(
+                XpLog.character_id.in_(sorted({c for c, _ in wanted})),
+                XpLog.date.in_(sorted({d for _, d in wanted})),
+            )
+            .group_by(XpLog.character_id, XpLog.date)
+            .order_by(XpLog.date)
+        ):
+            if (char_id, d) in wanted:
+                logs.setdefault(char_id, []).append({"date": d, "xp": xp})
+
+    out = {}
+    for ch in chars:
+        xp_sum, avg_xp, today_xp = totals.get(ch.id, (0, None, 0))
+        out[ch.id] = {
+            "character_id": ch.id,
+            **_xp_numbers(ch, xp_sum, avg_xp or 0, today_xp),
+            "log": logs.get(ch.id, []),
+        }
+    return out
+
+
+def xp_delta(ch, dates=(), reset=False, config=False, info=None) -> dict:
+    """
+    Atualização compacta do dashboard (evento "xp_update"): os totais saem de uma
+    agregação no banco e o log leva só os dias em `dates`, não o histórico inteiro.
+    reset=True: o cliente descarta o log antes de aplicar; config/info: inclui a
+    configuração do personagem e os dados do TibiaData.
+    """
+    delta = xp_deltas([ch], {ch.id: dates} if dates else None)[ch.id]
+    if reset:
+        delta["reset"] = True
+    if config:
+        delta["config"] = _xp_config(ch)
+    if info:
+        delta["character"] = info
+    return delta
+
+
+def user_room(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def push_xp_update(ch, delta):
+    """Manda a atualização para todas as abas/dispositivos do dono (depois do commit)."""
+    try:
+        socketio.emit("xp_update", delta, to=user_room(ch.user_id))
+    except Exception:
+        # o dado já foi gravado; quem perder o push se acerta no próximo /metrics
+        current_app.logger.exception("falha ao enviar xp_update")
+
+
+@web.route("/add_xp", methods=["POST"])
 @login_required
 def add_xp():
     ch = get_current_character()
     if not ch:
         return jsonify({"error": "Nenhum personagem cadastrado."}), 400
+    if ch.auto_xp:
+        return jsonify({"error": AUTO_XP_LOCKED}), 409
 
 
     xp = int(request.json["xp"])
@@ -682,11 +901,183 @@ def add_xp():
 
 
     db.session.commit()
-    return jsonify({"status": "ok"})
+    delta = xp_delta(ch, dates=[today])
+    push_xp_update(ch, delta)
+    return jsonify({"status": "ok", "metrics": delta})
+
+
+
+@web.route("/xp/sync", methods=["POST"])
+@login_required
+@query_budget(14)  # constante no tamanho do lote: o xp_update de todos sai em 2 queries (xp_deltas)
+def xp_sync():
+    """
+    Recebe em lote os lançamentos da fila offline do navegador (static/js/xp-queue.js).
+
+    Cada entrada traz uma chave gerada no cliente; chave já vista é ignorada, então
+    reenviar o mesmo lote (rede caiu antes da resposta) não soma XP duas vezes.
+    Responde com o que foi aceito/duplicado/rejeitado e os números atualizados do
+    personagem ativo, para o dashboard reconciliar o que mostrou de forma otimista.
+    """
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get("entries")
+    if not isinstance(entries, list) or len(entries) > current_app.config["XP_SYNC_MAX_BATCH"]:
+        return jsonify({"error": "Lote inválido."}), 400
+    # a fila é por navegador: lote de outra conta (ou sem dono) fica lá até o dono logar
+    if payload.get("user_id") != current_user.id:
+        return jsonify({"error": "Fila de outro usuário."}), 409
+
+    today = date.today()
+    oldest = today.toordinal() - current_app.config["XP_SYNC_MAX_AGE_DAYS"]
+    own_ids = {c.id for c in current_user.characters}
+    auto_ids = {c.id for c in current_user.characters if c.auto_xp}
+
+    valid, rejected = {}, []
+    for e in entries:
+        e = e if isinstance(e, dict) else {}
+        key = str(e.get("key") or "")
+        try:
+            xp = int(e.get("xp"))
+            day = date.fromisoformat(str(e.get("date")))
+            char_id = int(e.get("character_id"))
+        except (TypeError, ValueError):
+            rejected.append({"key": key, "error": "Entrada inválida."})
+            continue
+        if not 8 <= len(key) <= 64 or xp == 0:
+            rejected.append({"key": key, "error": "Entrada inválida."})
+        elif char_id not in own_ids:
+            rejected.append({"key": key, "error": "Personagem não encontrado."})
+        elif char_id in auto_ids:
+            rejected.append({"key": key, "error": AUTO_XP_LOCKED})
+        elif not oldest <= day.toordinal() <= today.toordinal() + 1:  # +1: fuso do navegador
+            rejected.append({"key": key, "error": "Data fora do intervalo aceito."})
+        else:
+            valid[key] = (char_id, min(day, today).isoformat(), xp)
+
+    for attempt in range(2):
+        seen = set()
+        keys = list(valid)
+        for i in range(0, len(keys), 500):
+            seen.update(db.session.execute(
+                select(XpEntry.key).where(XpEntry.key.in_(keys[i:i + 500]))
+            ).scalars())
+        fresh = {k: v for k, v in valid.items() if k not in seen}
+
+        deltas = {}
+        for char_id, day, xp in fresh.values():
+            deltas[(char_id, day)] = deltas.get((char_id, day), 0) + xp
+        if fresh:
+            db.session.execute(insert(XpEntry), [
+                {"key": k, "character_id": c, "date": d, "xp": xp} for k, (c, d, xp) in fresh.items()
+            ])
+            add_xp_bulk(deltas)
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            # outra aba/o service worker mandou a mesma chave ao mesmo tempo: refaz a leitura
+            db.session.rollback()
+            if attempt:
+                raise
+
+    ch = get_current_character()
+    if fresh:
+        by_char = {}
+        for char_id, day in deltas:
+            by_char.setdefault(char_id, []).append(day)
+        changed = [c for c in current_user.characters if c.id in by_char]
+        updates = xp_deltas(changed, by_char)
+        for c in changed:
+            push_xp_update(c, updates[c.id])
+
+    return jsonify({
+        "accepted": list(fresh),
+        "duplicates": sorted(seen),
+        "rejected": rejected,
+        "metrics": xp_summary(ch) if ch else None,
+    })
+
 
 
+@web.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def job_status(job_id):
+    """Situação de um job (validação de cadastro/config), para quem não tem Socket.IO."""
+    job = db.session.get(Job, job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job não encontrado."}), 404
+    return jsonify(serialize_job(job))
+
+
+
+@web.route("/xp/export", methods=["GET"])
+@login_required
+def xp_export_download():
+    """
+    Histórico de XP em CSV/JSONL, em streaming.
+    ?format=csv|jsonl  ?character=all|<id> (padrão: o ativo)  ?from=&to=YYYY-MM-DD  ?gzip=1
+    """
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in xp_export.FORMATS:
+        return jsonify({"error": "Formato inválido (use csv ou jsonl)."}), 400
+
+    bounds = []
+    for key in ("from", "to"):
+        raw = (request.args.get(key) or "").strip()
+        try:
+            bounds.append(date.fromisoformat(raw).isoformat() if raw else None)
+        except ValueError:
+            return jsonify({"error": f"Data inválida em '{key}' (use YYYY-MM-DD)."}), 400
+    start, end = bounds
+
+    which = (request.args.get("character") or "").strip().lower()
+    q = select(Character.id, Character.char_name, Character.xp_start).where(Character.user_id == current_user.id)
+    if which == "all":
+        label = "all"
+    else:
+        if which.isdigit():
+            ch = db.session.get(Character, int(which))
+            ch = ch if ch and ch.user_id == current_user.id else None
+        else:
+            ch = get_current_character()
+        if not ch:
+            return jsonify({"error": "Personagem não encontrado."}), 404
+        q = q.where(Character.id == ch.id)
+        label = ch.char_name
+    characters = db.session.execute(q.order_by(Character.id)).all()
+
+    compress = request.args.get("gzip") == "1"
+    rows = xp_export.iter_xp_rows(characters, start, end, chunk_size=current_app.config["XP_EXPORT_CHUNK"])
+    body = xp_export.encode(rows, fmt)
+    if compress:
+        body = xp_export.gzip_stream(body)
+
+    parts = ["xp", re.sub(r"\W+", "_", label).strip("_") or "char"]
+    if start or end:
+        parts.append(f"{start or 'inicio'}_a_{end or 'hoje'}")
+    filename = "_".join(parts) + f".{fmt}" + (".gz" if compress else "")
+
+    response = Response(
+        stream_with_context(body),
+        mimetype="application/gzip" if compress else xp_export.FORMATS[fmt],
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: repassa os blocos sem acumular
+    return response
+
+
+
+@web.route("/sw.js")
+def service_worker():
+    # servido da raiz para o service worker poder controlar /xp-tracker
+    response = send_from_directory(os.path.join(BASE_DIR, "static", "js"), "xp-sync-sw.js",
+                                   mimetype="application/javascript", max_age=0)
+    response.headers["Service-Worker-Allowed"] = "/"
+    return response
+
 
-@app.route("/reset-xp-history", methods=["POST"])
+
+@web.route("/reset-xp-history", methods=["POST"])
 @login_required
 def reset_xp_history():
     ch = get_current_character()
@@ -696,11 +1087,13 @@ def reset_xp_history():
 
     XpLog.query.filter_by(character_id=ch.id).delete()
     db.session.commit()
-    return jsonify({"status": "ok"})
+    delta = xp_delta(ch, reset=True)
+    push_xp_update(ch, delta)
+    return jsonify({"status": "ok", "metrics": delta})
 
 
 
-@app.route("/config", methods=["GET", "POST"])
+@web.route("/config", methods=["GET", "POST"])
 @login_required
 def config():
     ch = get_current_character()
@@ -716,12 +1109,12 @@ def config():
             "xp_goal": ch.xp_goal,
             "daily_goal": ch.daily_goal,
             "goal_level": ch.goal_level,
+            "auto_xp": ch.auto_xp,
             "can_edit_xp_start": not has_history
         })
 
 
     data = request.json or {}
-    old_name = ch.char_name
     new_name = (data.get("char_name") or ch.char_name or "").strip()
 
 
@@ -729,130 +1122,298 @@ def config():
         return jsonify({"error": "Nome do personagem é obrigatório."}), 400
 
 
-    try:
-        info = get_character_info(new_name)
-        current_level = int(info["level"])
-    except Exception:
-        return jsonify({"error": "Não foi possível validar esse personagem na API agora. Tente novamente."}), 400
-
-
+    # =========================
+    # Entradas: o que dá para validar sem o TibiaData responde na hora
+    # =========================
+    changes = {"char_name": new_name}
     has_history = XpLog.query.filter_by(character_id=ch.id).first() is not None
 
 
-    # =========================
-    # XP inicial: só valida/atualiza se vier no payload
-    # =========================
     if "xp_start" in data and str(data.get("xp_start")).strip() != "":
         try:
-            requested_xp_start = int(data.get("xp_start"))
+            changes["xp_start"] = int(data.get("xp_start"))
         except Exception:
             return jsonify({"error": "XP inicial inválida."}), 400
+        if has_history and changes["xp_start"] != ch.xp_start:
+            return jsonify({"error": XP_START_LOCKED}), 400
 
 
-        if has_history and requested_xp_start != ch.xp_start:
-            return jsonify({
-                "error": "XP inicial só pode ser alterado quando não houver histórico de XP. "
-                         "Zere o histórico ou selecione outro personagem."
-            }), 400
+    if "daily_goal" in data and str(data.get("daily_goal")).strip() != "":
+        try:
+            changes["daily_goal"] = int(data.get("daily_goal"))
+        except Exception:
+            return jsonify({"error": "Meta diária inválida."}), 400
 
 
+    if "goal_level" in data and str(data.get("goal_level")).strip() != "":
         try:
-            xp_min = int(xp_for_level(current_level))
+            changes["goal_level"] = int(data.get("goal_level"))
         except Exception:
-            return jsonify({"error": "Tabela de XP não possui o nível atual do personagem."}), 400
+            return jsonify({"error": "Nível meta inválido."}), 400
 
 
-        if requested_xp_start < xp_min:
-            return jsonify({"error": f"XP inicial não pode ser menor que {xp_min} (mínimo do nível {current_level})."}), 400
+    # coleta automática não depende do TibiaData: vale já, nos dois caminhos abaixo
+    if "auto_xp" in data and bool(data.get("auto_xp")) != ch.auto_xp:
+        ch.auto_xp = bool(data.get("auto_xp"))
+        # sem snapshot, a próxima coleta só grava a base: o XP lançado à mão até
+        # agora não volta como delta do highscore
+        XpSnapshot.query.filter_by(character_id=ch.id).delete()
 
 
-        ch.xp_start = requested_xp_start
-    # Se não vier xp_start, não mexe nele e nem valida nada.
+    renamed = (ch.char_name or "").strip().lower() != new_name.lower()
+    if not renamed and not ch.validation and not {"xp_start", "goal_level"} & changes.keys():
+        # só a meta diária: não depende do nível atual, grava direto
+        ch.daily_goal = changes.get("daily_goal", ch.daily_goal)
+        db.session.commit()
+        delta = xp_delta(ch, config=True)
+        push_xp_update(ch, delta)
+        return jsonify({"status": "saved", "metrics": delta})
 
 
-    # daily_goal (pode vir ou não)
-    if "daily_goal" in data and str(data.get("daily_goal")).strip() != "":
-        try:
-            new_daily_goal = int(data.get("daily_goal"))
-        except Exception:
-            return jsonify({"error": "Meta diária inválida."}), 400
-    else:
-        new_daily_goal = ch.daily_goal
+    # nome, XP inicial e nível meta dependem do nível no TibiaData: job "character_config"
+    try:
+        job = job_queue.enqueue("character_config", changes, user_id=current_user.id, character_id=ch.id)
+    except QueueFull:
+        return jsonify({"error": "Muitas validações na fila agora. Tente novamente em instantes."}), 503
+    db.session.commit()
+    job_queue.wake()
+    return jsonify({"status": "pending", "job": serialize_job(job)}), 202
 
 
-    # goal_level (pode vir ou não)
-    if "goal_level" in data and str(data.get("goal_level")).strip() != "":
-        try:
-            desired_goal_level = int(data.get("goal_level"))
-        except Exception:
-            return jsonify({"error": "Nível meta inválido."}), 400
-    else:
-        desired_goal_level = ch.goal_level
 
+# =========================
+# Chat (página + histórico REST) - DESATIVADO (Opção B)
+# =========================
+@web.route("/chat")
+@login_required
+def chat():
+    return redirect(url_for("web.xp_tracker"))
 
-    # Se goal_level não veio, mantém o atual; se estiver vazio no banco, cria um padrão
-    if desired_goal_level is None:
-        desired_goal_level = current_level + 10
+
+@web.route("/chat/api/messages", methods=["GET"])
+@login_required
+def chat_messages_list():
+    """
+    Histórico paginado por id (ordem crescente).
+
+    ?limit=50              → mais recentes
+    ?before_id=<id>        → página anterior (rolar para cima)
+    ?after_id=<id>         → catch-up a partir do último id visto
+    ?channel=world&world=X → canal de mundo
+    """
+    try:
+        limit = int(request.args.get("limit", 50))
+        before_id = request.args.get("before_id", type=int)
+        after_id = request.args.get("after_id", type=int)
+    except Exception:
+        return jsonify({"error": "Parâmetros inválidos."}), 400
+
+
+    limit = max(1, min(limit, current_app.config["CHAT_PAGE_MAX"]))
+    channel_type = "world" if request.args.get("channel") == "world" else "global"
+    world = (request.args.get("world") or "").strip() or None
 
 
-    if desired_goal_level <= current_level:
-        return jsonify({"error": "O nível meta deve ser maior que o nível atual do personagem."}), 400
+    if channel_type == "world" and not world:
+        world = current_character_world()
+        if not world:
+            return jsonify({"error": "Informe o mundo."}), 400
+
+
+    rows = chat_history.page(
+        channel_type=channel_type,
+        world=world,
+        limit=limit,
+        before_id=before_id,
+        after_id=after_id,
+    )
+    return jsonify(rows)
+
+
+
+@web.route("/chat/api/search", methods=["GET"])
+@login_required
+def chat_search_api():
+    """
+    Busca full-text (FTS5) no histórico do chat (janela quente; meses arquivados saem do índice).
+
+    ?q=texto&sort=rank|recent&limit=&offset=  (rank: bm25 + offset)
+    ?sort=recent&before_id=<id>              (recent: keyset por id)
+    Filtros: channel=global|world, world=, user=, from=YYYY-MM-DD, to=YYYY-MM-DD
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "Informe o texto da busca."}), 400
+
+
+    sort = request.args.get("sort", "rank")
+    if sort not in ("rank", "recent"):
+        sort = "rank"
 
 
     try:
-        new_xp_goal = int(xp_for_level(desired_goal_level))
+        limit = max(1, min(int(request.args.get("limit", 20)), current_app.config["CHAT_PAGE_MAX"]))
+        offset = max(0, int(request.args.get("offset", 0)))
+        before_id = request.args.get("before_id", type=int)
+        start, end = date_bounds(request.args.get("from") or None, request.args.get("to") or None)
     except Exception:
-        return jsonify({"error": "Nível meta inválido (não existe na tabela)."}), 400
+        return jsonify({"error": "Parâmetros inválidos."}), 400
 
 
-    ch.char_name = new_name
-    ch.daily_goal = new_daily_goal
-    ch.goal_level = desired_goal_level
-    ch.xp_goal = new_xp_goal
+    channel_type = request.args.get("channel") or None
+    if channel_type not in (None, "global", "world"):
+        channel_type = None
 
 
-    if (old_name or "").strip().lower() != (new_name or "").strip().lower():
-        XpLog.query.filter_by(character_id=ch.id).delete()
+    sql, params = chat_search.build_search_query(
+        q,
+        channel_type=channel_type,
+        world=(request.args.get("world") or "").strip() or None,
+        username=(request.args.get("user") or "").strip().lower() or None,
+        start=start,
+        end=end,
+        sort=sort,
+        limit=limit + 1,  # uma a mais para saber se há próxima página
+        offset=offset,
+        before_id=before_id,
+    )
+    if sql is None:
+        return jsonify({"results": [], "next": None})
 
 
-    db.session.commit()
-    return jsonify({"status": "saved"})
+    rows = db.session.execute(
+        sql_text(sql), params, bind_arguments={"bind": db.engines["chat"]}
+    ).mappings().all()
 
 
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = [{
+        "id": r["id"],
+        "username": r["username"],
+        "channel_type": r["channel_type"],
+        "world": r["world"],
+        "text": r["text"],
+        "snippet": r["snippet"],
+        "score": round(-r["score"], 4),
+        "created_at": str(r["created_at"]).replace(" ", "T") + "Z",
+    } for r in rows]
 
-# =========================
-# Chat (página + histórico REST) - DESATIVADO (Opção B)
-# =========================
-@app.route("/chat")
-@login_required
-def chat():
-    return redirect(url_for("xp_tracker"))
 
+    if not has_more:
+        nxt = None
+    elif sort == "recent":
+        nxt = {"before_id": results[-1]["id"]}
+    else:
+        nxt = {"offset": offset + limit}
 
-@app.route("/chat/api/messages", methods=["GET"])
-@login_required
-def chat_messages_list():
-    return jsonify({"error": "Chat desativado."}), 404
+
+    return jsonify({"results": results, "next": nxt})
+
+
+
+def _chat_metrics():
+    flood = flood_control.stats()
+    writer = chat_writer.stats()
+    return {
+        "yonexus_chat_flood_rejected_total": {
+            ("user",): flood["rejected_user"],
+            ("conn",): flood["rejected_conn"],
+        },
+        "yonexus_chat_write_queue_depth": {(): writer["queue_depth"]},
+        "yonexus_chat_write_rows_total": {
+            ("flushed",): writer["flushed_total"],
+            ("dropped",): writer["dropped_total"],
+            ("rejected",): writer["rejected_total"],
+        },
+        "yonexus_chat_write_errors_total": {(): writer["flush_errors"]},
+    }
+
+
+@web.route("/chat/api/stats", methods=["GET"])
+def chat_stats():
+    # limites e internos do chat: mesmo acesso do /internal/metrics, ou admin logado.
+    # Números só deste worker; o total entre workers está no /internal/metrics.
+    if not (profiler.is_admin(current_user) or _internal_access_allowed()):
+        abort(403)
+    return jsonify({
+        "pid": os.getpid(),
+        "flood": flood_control.stats(),
+        "writer": chat_writer.stats(),
+        "history": {
+            "ring_hits": chat_history.ring_hits,
+            "db_queries": chat_history.db_queries,
+            "archive_reads": chat_history.archive_reads,
+        },
+        "batching": chat_batcher.stats() if chat_batcher is not None else None,
+    })
 
 
 
 # =========================
 # Socket.IO events
 # =========================
+def current_character_world():
+    ch = get_current_character()
+    if not ch:
+        return None
+    try:
+        return get_character_info(ch.char_name).get("world")
+    except Exception:
+        return None
+
+
+
 @socketio.on("connect")
-def socket_connect():
+@telemetry.track_event
+@query_stats.track_event
+def socket_connect(auth=None):
     if not current_user.is_authenticated:
         return False  # recusa conexão sem login
-    emit("status", {"ok": True})
+
+
+    # sala do usuário: atualizações do dashboard (xp_update) para todas as abas dele
+    join_room(user_room(current_user.id))
+    world = None
+    dashboard = isinstance(auth, dict) and auth.get("scope") == "dashboard"
+    if not dashboard:  # o dashboard não recebe o chat
+        join_room(chat_room("global"))
+        world = current_character_world()
+        if world:
+            SOCKET_WORLDS[request.sid] = world
+            join_room(chat_room("world", world))
+
+
+    telemetry.gauge_add("yonexus_socketio_connections", 1)
+    emit("status", {"ok": True, "world": world})
+
+
+
+@socketio.on("disconnect")
+@telemetry.track_event
+@query_stats.track_event
+def socket_disconnect():
+    SOCKET_WORLDS.pop(request.sid, None)
+    flood_control.forget_connection(request.sid)
+    telemetry.gauge_add("yonexus_socketio_connections", -1)
 
 
 
 @socketio.on("chat_send")
+@telemetry.track_event
+@query_stats.track_event
+@query_budget(2)  # gravação fica com o write-behind; aqui só o load_user
 def socket_chat_send(data):
     if not current_user.is_authenticated:
         return
 
 
+    # anti-flood antes de qualquer outro trabalho (validação, id, fila, emit)
+    if not flood_control.allow(current_user.id, request.sid):
+        emit("chat_error", {"error": "Você está enviando mensagens rápido demais. Aguarde um pouco."})
+        return
+
+
     text = (data or {}).get("text", "")
     text = (text or "").strip()
 
@@ -867,27 +1428,242 @@ def socket_chat_send(data):
         return
 
 
-    msg = ChatMessage(
-        username=current_user.username,
-        channel_type="global",
-        world=None,
-        text=text
-    )
-    db.session.add(msg)
-    db.session.commit()
+    channel_type = "world" if (data or {}).get("channel") == "world" else "global"
+    world = None
+    if channel_type == "world":
+        world = SOCKET_WORLDS.get(request.sid)
+        if not world:
+            emit("chat_error", {"error": "Não foi possível identificar o mundo do seu personagem."})
+            return
+
+
+    # id gerado na hora; a gravação no chat.db fica para o próximo lote
+    msg = {
+        "id": chat_writer.next_id(),
+        "username": current_user.username,
+        "channel_type": channel_type,
+        "world": world,
+        "text": text,
+        "created_at": datetime.utcnow(),
+    }
+    if not chat_writer.enqueue(msg):
+        emit("chat_error", {"error": "Chat sobrecarregado no momento. Tente de novo em instantes."})
+        return
+    telemetry.inc("yonexus_chat_messages_total", (channel_type,))
 
 
     payload = serialize_chat_row(msg)
-    emit("chat_message", payload, broadcast=True)
+    chat_history.append(msg["channel_type"], msg["world"], payload)
+    room = chat_room(channel_type, world)
+    if chat_batcher is not None:
+        chat_batcher.add(room, payload)
+    else:
+        emit("chat_message", payload, to=room)
+
+
+
+def _internal_access_allowed() -> bool:
+    # token (Bearer) ou IP liberado explicitamente; sem nenhum dos dois configurado, nega
+    token = current_app.config["METRICS_TOKEN"]
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    return request.remote_addr in current_app.config["METRICS_ALLOW_IPS"]
+
+
+@web.route("/internal/metrics", methods=["GET"])
+def internal_metrics():
+    if not _internal_access_allowed():
+        abort(403)
+    return Response(telemetry.render(), mimetype="text/plain; version=0.0.4")
+
+
+
+@web.route("/internal/profiles", methods=["GET"])
+@login_required
+def internal_profiles():
+    if not profiler.is_admin(current_user):
+        abort(403)
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))  # ?limit=abc → padrão
+    return jsonify(profiler.list_profiles(limit=limit))
 
 
 
-@app.route("/bestiary")
+@web.route("/internal/profiles/<profile_id>", methods=["GET"])
+@login_required
+def internal_profile(profile_id):
+    # ?format=json (metadados + top do pstats) | folded (flamegraph) | prof (cProfile) | txt
+    if not profiler.is_admin(current_user):
+        abort(403)
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "folded", "prof", "txt") or not profiler.path_for(profile_id, ".json"):
+        abort(404)
+
+    if fmt == "folded":
+        return send_file(profiler.path_for(profile_id, ".folded"), mimetype="text/plain",
+                         as_attachment=True, download_name=f"{profile_id}.folded")
+    if fmt == "prof":
+        return send_file(profiler.path_for(profile_id, ".prof"), mimetype="application/octet-stream",
+                         as_attachment=True, download_name=f"{profile_id}.prof")
+    top = profiler.top_text(profile_id, limit=int(request.args.get("limit", 40)),
+                            sort=request.args.get("sort", "cumulative"))
+    if fmt == "txt":
+        return Response(top, mimetype="text/plain")
+    with open(profiler.path_for(profile_id, ".json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return jsonify(meta=meta, top=top)
+
+
+
+@web.route("/api/compression/stats", methods=["GET"])
+@login_required
+def compression_stats():
+    return jsonify(compression.stats())
+
+
+
+@web.route("/bestiary")
 @login_required
 def bestiary():
     return render_template("bestiary.html")
 
 
 
-if __name__ == "__main__":
-    socketio.run(app, debug=True)
+@web.route("/api/bestiary/categories")
+@login_required
+def bestiary_categories():
+    return jsonify(bestiary_index.category_list())
+
+
+
+@web.route("/api/bestiary/search")
+@login_required
+def bestiary_search():
+    """
+    ?q=texto (prefixo, substring ou aproximado)
+    &category=dragon &min_hp= &max_hp= &min_exp= &max_exp=
+    &sort=relevance|name|hp|exp|ratio &order=asc|desc &page=1 &per_page=30
+    """
+    try:
+        filters = {
+            k: request.args.get(k, type=int)
+            for k in ("min_hp", "max_hp", "min_exp", "max_exp")
+        }
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 30))
+    except Exception:
+        return jsonify({"error": "Parâmetros inválidos."}), 400
+
+
+    return jsonify(bestiary_index.search(
+        q=request.args.get("q", ""),
+        category=(request.args.get("category") or "").strip() or None,
+        sort=request.args.get("sort", "relevance"),
+        order=request.args.get("order"),
+        page=page,
+        per_page=per_page,
+        **filters,
+    ))
+
+
+
+
+@web.route("/api/hunt/plan")
+@login_required
+def hunt_plan():
+    """
+    Kills de cada monstro para a meta diária e para a meta de level do personagem ativo.
+
+    ?boost=1 &stamina=green|normal|orange &mult=2 (evento)
+    &category=dragon &sort=kills|name|hp|exp|ratio &order=asc|desc &page=1 &per_page=30
+    """
+    ch = get_current_character()
+    if not ch:
+        return jsonify({"error": "Nenhum personagem cadastrado."}), 400
+
+    try:
+        mult = hunt_multiplier(
+            boost=request.args.get("boost") in ("1", "true", "on"),
+            stamina=request.args.get("stamina", "normal"),
+            extra=request.args.get("mult", 1.0),
+        )
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 30))
+    except Exception:
+        return jsonify({"error": "Parâmetros inválidos."}), 400
+
+    today = date.today().isoformat()
+    xp_logged, today_xp = db.session.query(
+        db.func.coalesce(db.func.sum(XpLog.xp), 0),
+        db.func.coalesce(db.func.sum(db.case((XpLog.date == today, XpLog.xp), else_=0)), 0),
+    ).filter(XpLog.character_id == ch.id).one()
+
+    daily_needed = max(0, ch.daily_goal - today_xp)
+    level_needed = max(0, ch.xp_goal - (ch.xp_start + xp_logged))
+
+    result = hunt_planner.plan(
+        daily_needed,
+        level_needed,
+        mult=mult,
+        category=(request.args.get("category") or "").strip() or None,
+        sort=request.args.get("sort", "kills"),
+        order=request.args.get("order"),
+        page=page,
+        per_page=per_page,
+    )
+    result.update({
+        "multiplier": mult,
+        "daily_needed": daily_needed,
+        "level_needed": level_needed,
+        "goal_level": ch.goal_level,
+    })
+    return jsonify(result)
+
+
+
+# =========================
+# App factory
+# =========================
+def create_app(config=None):
+    """
+    Monta o app. Nada disso roda no import do módulo: o servidor chama
+    create_app() pelo wsgi.py (gunicorn "wsgi:app"), os scripts de admin nem
+    importam este arquivo (usam models.create_cli_app()).
+
+    O schema não é criado aqui: `python manage.py init-db` / `flask --app app:create_app init-db`.
+    """
+    app = Flask(__name__)
+    configure(app)
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(web)
+    telemetry.init_app(app)
+    query_stats.init_app(app)  # antes da compressão: o app;dur do Server-Timing inclui o gzip
+    compression.init_app(app)
+    profiler.init_app(app)  # por último: o perfil cobre só a view, não os outros hooks
+
+    socket_queue = make_client_manager(
+        app.config["SOCKETIO_MESSAGE_QUEUE"],
+        channel=app.config["SOCKETIO_CHANNEL"],
+        on_emit=_on_socket_emit,
+    )
+    # SocketIO (cors_allowed_origins="*" para simplificar; pode restringir depois)
+    socketio_options = {"cors_allowed_origins": "*", "async_mode": app.config["SOCKETIO_ASYNC_MODE"]}
+    if socket_queue is not None:
+        socketio_options["client_manager"] = socket_queue
+    socketio.init_app(app, **socketio_options)
+
+    _init_chat(app)
+
+    # validação de cadastro/config em segundo plano (jobs.py)
+    job_queue.init_app(app)
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Cria as tabelas e o índice de busca do chat."""
+        init_schema()
+        print("✅ Schema criado/atualizado.")
+
+    return app
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização: quanto custa importar/montar cada ponto de entrada.
+
+Cada cenário roda num processo Python novo (nada em cache de import), N vezes:
+
+  cli         → import models + create_cli_app()   (manage.py, grant_vip.py)
+  import_app  → import app                         (não deve montar nada)
+  create_app  → import app + create_app()          (testes)
+  wsgi        → import wsgi                        (servidor: monkey_patch + create_app)
+
+Uso:
+  python bench_startup.py [--runs 10] [--top 15]
+
+--top mostra os módulos mais caros de cada cenário (python -X importtime).
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "cli": "import models; models.create_cli_app()",
+    "import_app": "import app",
+    "create_app": "import app; app.create_app()",
+    "wsgi": "import wsgi",
+}
+
+_TIMER = (
+    "import time; _t = time.perf_counter(); {code}; "
+    "print('__ELAPSED__', (time.perf_counter() - _t) * 1000)"
+)
+
+
+def run_once(code: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(code=code)],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    m = re.search(r"__ELAPSED__ ([\d.]+)", out)
+    return float(m.group(1))
+
+
+def top_imports(code: str, top: int):
+    """Módulos (e pacotes pais) com maior tempo acumulado segundo `-X importtime`."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if m:
+            rows.append((int(m.group(1)) / 1000, m.group(2)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização do Yonexus.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'cenário':<12} {'mediana':>10} {'mínimo':>10} {'máximo':>10}")
+    for name, code in SCENARIOS.items():
+        times = [run_once(code) for _ in range(max(1, args.runs))]
+        print(f"{name:<12} {statistics.median(times):>8.1f}ms {min(times):>8.1f}ms {max(times):>8.1f}ms")
+        for ms, module in top_imports(code, args.top) if args.top else ():
+            print(f"    {ms:>8.1f}ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
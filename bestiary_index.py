@@ -0,0 +1,279 @@
+"""
+Índice de busca do bestiário (static/data/bestiary.json).
+
+Montado uma única vez por processo, no primeiro uso (o JSON só é lido quando
+alguém pesquisa). Duas estruturas:
+
+- trie de prefixos: sobre o nome inteiro e sobre o início de cada palavra
+  ("lord" encontra "Dragon Lord");
+- trigramas: candidatos para busca por substring e por aproximação (erros de
+  digitação), ranqueados pela sobreposição de trigramas.
+
+A ordem de relevância é: nome exato > prefixo do nome > prefixo de palavra >
+substring > aproximado.
+
+Se existir o mapa de atlas (build_sprites.py), cada monstro sai com `sprite`
+(url do atlas + recorte); senão, ou para monstros fora do último build, só com
+`icon_url` (o PNG individual).
+"""
+
+import json
+import os
+import threading
+
+# Ordem fixa para ficar igual ao jogo (mesma de templates/bestiary.html)
+CATEGORY_ORDER = [
+    "amphibic", "aquatic", "bird", "construct", "demon",
+    "dragon", "elemental", "extra_dimensional", "fey", "giant",
+    "human", "humanoid", "inborn", "lycanthrope", "magical",
+]
+
+SORT_KEYS = ("relevance", "name", "hp", "exp", "ratio")
+
+_EXACT, _PREFIX, _WORD_PREFIX, _SUBSTRING, _FUZZY = range(5)
+
+
+def category_label(key: str) -> str:
+    return key.replace("_", " ").title()
+
+
+def _trigrams(s: str, pad=True):
+    # nomes indexados levam espaços nas bordas (trigramas de início/fim de palavra);
+    # a consulta, para achar candidatos, vai sem — senão só casaria com o começo
+    if pad:
+        s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class BestiaryIndex:
+    def __init__(self, path, atlas_path=None, icons_dir=None, icons_url="/static/img/bestiary/monsters"):
+        self.path = path
+        self.atlas_path = atlas_path
+        self.icons_dir = icons_dir
+        self.icons_url = icons_url
+        self.atlas_version = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.monsters = []
+        self.categories = []
+        self._trie = _TrieNode()
+        self._trigrams = {}
+
+    # ---------- construção ----------
+    def _insert_prefix(self, text: str, mid: int):
+        node = self._trie
+        for ch in text:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ids.add(mid)
+
+    def _load_atlas(self):
+        if not self.atlas_path or not os.path.exists(self.atlas_path):
+            return {}
+        with open(self.atlas_path, "r", encoding="utf-8") as f:
+            atlas = json.load(f)
+        self.atlas_version = atlas.get("version")
+        sprites = {}
+        for name, s in (atlas.get("sprites") or {}).items():
+            sheet = (atlas.get("atlases") or {}).get(s["atlas"])
+            if sheet:
+                sprites[name] = {
+                    "url": sheet["url"],
+                    "x": s["x"],
+                    "y": s["y"],
+                    "w": s["w"],
+                    "h": s["h"],
+                    "atlas_w": sheet["width"],
+                    "atlas_h": sheet["height"],
+                }
+        return sprites
+
+    def _icon_files(self):
+        if not self.icons_dir or not os.path.isdir(self.icons_dir):
+            return {}
+        return {fn.lower(): fn for fn in os.listdir(self.icons_dir)}
+
+    def _icon_url(self, m: dict, files: dict):
+        # o JSON usa "dragon_lord.png"; os arquivos, "Dragon_Lord.png"
+        candidates = [m.get("icon"), (m.get("name") or "").strip().replace(" ", "_") + ".png"]
+        for c in candidates:
+            found = files.get((c or "").lower())
+            if found:
+                mtime = int(os.path.getmtime(os.path.join(self.icons_dir, found)))
+                return f"{self.icons_url}/{found}?v={mtime}"
+        return f"{self.icons_url}/{m['icon']}" if m.get("icon") else None
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        sprites = self._load_atlas()
+        files = self._icon_files()
+
+        keys = [k for k in CATEGORY_ORDER if k in data] + [k for k in data if k not in CATEGORY_ORDER]
+        for key in keys:
+            items = data.get(key) or []
+            self.categories.append({"key": key, "label": category_label(key), "total": len(items)})
+            for m in items:
+                name = (m.get("name") or "").strip()
+                if not name:
+                    continue
+                hp = m.get("hp") if isinstance(m.get("hp"), (int, float)) else None
+                exp = m.get("exp") if isinstance(m.get("exp"), (int, float)) else None
+                mid = len(self.monsters)
+                self.monsters.append({
+                    "name": name,
+                    "hp": hp,
+                    "exp": exp,
+                    "ratio": round(exp / hp, 4) if (hp and exp is not None) else None,
+                    "icon": m.get("icon"),
+                    "icon_url": self._icon_url(m, files),
+                    "sprite": sprites.get(name.lower()),
+                    "category_key": key,
+                    "category_label": category_label(key),
+                    "_lower": name.lower(),
+                })
+
+                lower = name.lower()
+                self._insert_prefix(lower, mid)
+                for word in lower.split()[1:]:
+                    self._insert_prefix(word, mid)
+                for tri in _trigrams(lower):
+                    self._trigrams.setdefault(tri, set()).add(mid)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    # ---------- busca ----------
+    def _prefix_ids(self, q: str):
+        node = self._trie
+        for ch in q:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+
+    def _match(self, q: str, fuzzy_threshold=0.34):
+        """{id: (nível, pontuação)} para o texto q (minúsculo)."""
+        found = {}
+
+        for mid in self._prefix_ids(q):
+            lower = self.monsters[mid]["_lower"]
+            if lower == q:
+                found[mid] = (_EXACT, 1.0)
+            elif lower.startswith(q):
+                found[mid] = (_PREFIX, 1.0)
+            else:
+                found[mid] = (_WORD_PREFIX, 1.0)
+
+        # candidatos: qualquer trigrama do texto ("olf" → "Werewolf"); com 2 letras
+        # não há trigrama, e o catálogo é pequeno o bastante para varrer (1 letra: só prefixo)
+        q_tris = _trigrams(q, pad=False)
+        if q_tris:
+            candidates = set()
+            for tri in q_tris:
+                candidates.update(self._trigrams.get(tri, ()))
+        elif len(q) == 2:
+            candidates = range(len(self.monsters))
+        else:
+            candidates = ()
+
+        padded = _trigrams(q)
+        for mid in candidates:
+            if mid in found:
+                continue
+            lower = self.monsters[mid]["_lower"]
+            if q in lower:
+                found[mid] = (_SUBSTRING, 1.0)
+                continue
+            # similaridade de Jaccard entre os trigramas (tolera erros de digitação)
+            name_tris = _trigrams(lower)
+            score = len(padded & name_tris) / len(padded | name_tris)
+            if score >= fuzzy_threshold:
+                found[mid] = (_FUZZY, score)
+
+        return found
+
+    def search(
+        self,
+        q="",
+        category=None,
+        min_hp=None,
+        max_hp=None,
+        min_exp=None,
+        max_exp=None,
+        sort="relevance",
+        order=None,
+        page=1,
+        per_page=30,
+    ):
+        self.ensure_loaded()
+        q = (q or "").strip().lower()
+
+        if q:
+            matched = self._match(q)
+        else:
+            matched = {mid: (_EXACT, 1.0) for mid in range(len(self.monsters))}
+
+        rows = []
+        for mid, rank in matched.items():
+            m = self.monsters[mid]
+            if category and m["category_key"] != category:
+                continue
+            if min_hp is not None and (m["hp"] is None or m["hp"] < min_hp):
+                continue
+            if max_hp is not None and (m["hp"] is None or m["hp"] > max_hp):
+                continue
+            if min_exp is not None and (m["exp"] is None or m["exp"] < min_exp):
+                continue
+            if max_exp is not None and (m["exp"] is None or m["exp"] > max_exp):
+                continue
+            rows.append((mid, rank))
+
+        if sort not in SORT_KEYS:
+            sort = "relevance"
+        if sort == "relevance" and not q:
+            sort = "name"  # sem texto, relevância = ordem alfabética
+
+        if sort == "relevance":
+            rows.sort(key=lambda r: (r[1][0], -r[1][1], self.monsters[r[0]]["_lower"]))
+        elif sort == "name":
+            rows.sort(key=lambda r: self.monsters[r[0]]["_lower"], reverse=(order == "desc"))
+        else:
+            # números: padrão decrescente (maior exp/hp/razão primeiro); sem valor vai pro fim
+            desc = order != "asc"
+            with_value = [r for r in rows if self.monsters[r[0]][sort] is not None]
+            without = [r for r in rows if self.monsters[r[0]][sort] is None]
+            with_value.sort(key=lambda r: self.monsters[r[0]][sort], reverse=desc)
+            rows = with_value + without
+
+        total = len(rows)
+        per_page = max(1, min(int(per_page), 200))
+        page = max(1, int(page))
+        start = (page - 1) * per_page
+        results = []
+        for mid, _ in rows[start:start + per_page]:
+            results.append({k: v for k, v in self.monsters[mid].items() if not k.startswith("_")})
+
+        return {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page,
+            "results": results,
+        }
+
+    def category_list(self):
+        self.ensure_loaded()
+        return list(self.categories)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Gera os atlas de sprites do bestiário (uma imagem por categoria).
+
+Em vez de um PNG por monstro (um request cada), cada categoria do
+static/data/bestiary.json vira uma única imagem com todos os seus monstros,
+mais os mapas de coordenadas:
+
+  static/img/bestiary/atlas/<categoria>.png   → atlas da categoria
+  static/data/bestiary_atlas.json             → {nome do monstro: atlas, x, y, w, h}
+  static/css/bestiary_atlas.css               → classes .bsprite-<monstro> (tamanho original)
+
+As URLs dos atlas levam ?v=<hash do conteúdo>, então podem ser cacheadas para
+sempre: rodar o build de novo muda o hash. Monstros sem entrada no mapa (adicionados
+depois do último build) continuam aparecendo pelo PNG individual.
+
+Requer Pillow só para rodar o build (pip install Pillow); o site não depende dele.
+
+Uso:
+  python build_sprites.py
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BESTIARY_FILE = os.path.join(BASE_DIR, "static", "data", "bestiary.json")
+MONSTERS_DIR = os.path.join(BASE_DIR, "static", "img", "bestiary", "monsters")
+ATLAS_DIR = os.path.join(BASE_DIR, "static", "img", "bestiary", "atlas")
+MAP_FILE = os.path.join(BASE_DIR, "static", "data", "bestiary_atlas.json")
+CSS_FILE = os.path.join(BASE_DIR, "static", "css", "bestiary_atlas.css")
+
+STATIC_URL = "/static"
+PADDING = 2  # px entre sprites (evita vazamento do vizinho ao escalar)
+
+
+def css_class(name: str) -> str:
+    return "bsprite-" + re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def static_url(path: str) -> str:
+    rel = os.path.relpath(path, os.path.join(BASE_DIR, "static")).replace(os.sep, "/")
+    return f"{STATIC_URL}/{rel}"
+
+
+def find_icon(monster: dict, files: dict):
+    """
+    Resolve o PNG do monstro em static/img/bestiary/monsters. O JSON usa nomes
+    minúsculos ("dragon_lord.png") e os arquivos seguem a wiki ("Dragon_Lord.png"),
+    então a busca ignora maiúsculas; sem ícone, tenta pelo nome do monstro.
+    """
+    candidates = []
+    if monster.get("icon"):
+        candidates.append(monster["icon"])
+    if monster.get("name"):
+        candidates.append(monster["name"].replace(" ", "_") + ".png")
+    for c in candidates:
+        found = files.get(c.lower())
+        if found:
+            return os.path.join(MONSTERS_DIR, found)
+    return None
+
+
+def pack(sizes):
+    """
+    Empacotamento em prateleiras: ordena por altura e preenche linhas até a
+    largura alvo (~quadrado). Retorna ([(x, y)], largura, altura).
+    """
+    if not sizes:
+        return [], 0, 0
+    area = sum((w + PADDING) * (h + PADDING) for w, h in sizes)
+    max_w = max(w for w, _ in sizes) + PADDING
+    target = max(max_w, int(area ** 0.5) + 1)
+
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], i))
+    pos = [None] * len(sizes)
+    x = y = shelf_h = width = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > target:
+            y += shelf_h + PADDING
+            x = shelf_h = 0
+        pos[i] = (x, y)
+        x += w + PADDING
+        shelf_h = max(shelf_h, h)
+        width = max(width, x - PADDING)
+    return pos, width, y + shelf_h
+
+
+def build(bestiary_file=BESTIARY_FILE):
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("❌ Pillow não instalado: pip install Pillow")
+
+    with open(bestiary_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    files = {fn.lower(): fn for fn in os.listdir(MONSTERS_DIR) if fn.lower().endswith(".png")}
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+
+    atlases, sprites, missing = {}, {}, []
+    for category, items in data.items():
+        entries = []
+        for m in items or []:
+            name = (m.get("name") or "").strip()
+            path = find_icon(m, files) if name else None
+            if not path:
+                if name:
+                    missing.append(name)
+                continue
+            img = Image.open(path).convert("RGBA")
+            entries.append((name, img))
+
+        if not entries:
+            continue
+
+        positions, width, height = pack([img.size for _, img in entries])
+        sheet = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        for (name, img), (x, y) in zip(entries, positions):
+            sheet.paste(img, (x, y))
+
+        buf = io.BytesIO()
+        sheet.save(buf, format="PNG", optimize=True)
+        raw = buf.getvalue()
+        version = hashlib.sha1(raw).hexdigest()[:10]
+        out = os.path.join(ATLAS_DIR, f"{category}.png")
+        with open(out, "wb") as f:
+            f.write(raw)
+
+        atlases[category] = {
+            "url": f"{static_url(out)}?v={version}",
+            "width": width,
+            "height": height,
+            "sprites": len(entries),
+            "bytes": len(raw),
+        }
+        for (name, img), (x, y) in zip(entries, positions):
+            w, h = img.size
+            sprites[name.lower()] = {"atlas": category, "x": x, "y": y, "w": w, "h": h}
+
+    version = hashlib.sha1(
+        json.dumps([atlases, sprites], sort_keys=True).encode("utf-8")
+    ).hexdigest()[:10]
+    atlas_map = {"version": version, "atlases": atlases, "sprites": sprites}
+    with open(MAP_FILE, "w", encoding="utf-8") as f:
+        json.dump(atlas_map, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+    css = ["/* Gerado por build_sprites.py — não editar à mão */",
+           ".bsprite{display:inline-block;background-repeat:no-repeat;}"]
+    for name, s in sorted(sprites.items()):
+        a = atlases[s["atlas"]]
+        css.append(
+            f".{css_class(name)}{{background-image:url({a['url']});"
+            f"background-position:{-s['x']}px {-s['y']}px;width:{s['w']}px;height:{s['h']}px;}}"
+        )
+    with open(CSS_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(css) + "\n")
+
+    return atlas_map, missing
+
+
+def main():
+    atlas_map, missing = build()
+    total = sum(a["bytes"] for a in atlas_map["atlases"].values())
+    print(f"✅ {len(atlas_map['sprites'])} sprites em {len(atlas_map['atlases'])} atlas "
+          f"({total / 1024:.1f} KB) — versão {atlas_map['version']}")
+    if missing:
+        print(f"⚠️ Sem imagem ({len(missing)}), ficam no fallback: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
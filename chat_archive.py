@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Retenção do chat: janela quente no chat.db + arquivos mensais compactados.
+
+O chat_message guarda só os últimos CHAT_HOT_DAYS dias (padrão 30). Meses inteiros
+mais antigos que a janela são movidos para data/chat_archive/ como JSONL gzip
+imutáveis (um arquivo por mês; se aparecerem linhas atrasadas de um mês já
+arquivado, vira uma nova parte). O index.json lista as partes com contagem,
+faixa de ids e de datas, e é o que permite pular meses fora do filtro.
+
+iter_messages() percorre arquivo + tabela viva de forma transparente, em ordem
+de id — é o que export_chat.py, debug_chat_db.py e o histórico do app usam.
+
+Uso:
+
+  python chat_archive.py archive              → arquiva meses fora da janela (30 dias)
+  python chat_archive.py archive --hot-days 60
+  python chat_archive.py archive --vacuum     → idem + VACUUM no chat.db
+  python chat_archive.py list                 → lista as partes arquivadas
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.engine import make_url
+
+from config import chat_database_url
+
+BASE = Path(__file__).parent
+
+
+def sqlite_path(url, instance_path=BASE / "instance"):
+    """Caminho do arquivo de uma URL sqlite:///. Relativo → pasta instance/, como o Flask-SQLAlchemy."""
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        return None
+    path = Path(database)
+    return path if path.is_absolute() else Path(instance_path) / path
+
+
+# mesmo chat.db do app (CHAT_DATABASE_URL), nunca um caminho à parte
+DB_PATH = sqlite_path(chat_database_url(BASE))
+ARCHIVE_DIR = Path(os.environ.get("CHAT_ARCHIVE_DIR", BASE / "data" / "chat_archive"))
+HOT_DAYS = int(os.environ.get("CHAT_HOT_DAYS", "30"))
+
+COLUMNS = ("id", "username", "channel_type", "world", "text", "created_at")
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _row_matches(row, channel_type=None, world=None, username=None, start=None, end=None):
+    if channel_type and row["channel_type"] != channel_type:
+        return False
+    if channel_type == "world" and world and row["world"] != world:
+        return False
+    if username and row["username"] != username:
+        return False
+    if start and row["created_at"] < start:
+        return False
+    if end and row["created_at"] >= end:
+        return False
+    return True
+
+
+class ChatArchive:
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.dir = Path(archive_dir)
+        self.index_path = self.dir / "index.json"
+
+    # ---------- índice ----------
+    def parts(self):
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("parts", [])
+
+    def _save_parts(self, parts):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"parts": parts}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def _select_parts(self, start=None, end=None):
+        """Partes cujo mês cruza [start, end) — start/end no formato de created_at."""
+        out = []
+        for p in self.parts():
+            if start and p["last_at"] < start:
+                continue
+            if end and p["first_at"] >= end:
+                continue
+            out.append(p)
+        return out
+
+    # ---------- leitura ----------
+    def _read_part(self, part):
+        with gzip.open(self.dir / part["file"], "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def iter_rows(self, start=None, end=None, **filters):
+        """Linhas arquivadas (dicts) em ordem crescente de id."""
+        for part in self._select_parts(start, end):
+            for row in self._read_part(part):
+                if _row_matches(row, start=start, end=end, **filters):
+                    yield row
+
+    def page(self, channel_type="global", world=None, limit=50, before_id=None, after_id=None):
+        """Mesma semântica de ChatHistory.page, só sobre o arquivo."""
+        filters = {"channel_type": channel_type, "world": world}
+        parts = self.parts()
+
+        if after_id is not None:
+            out = []
+            for part in parts:
+                if part["max_id"] <= after_id:
+                    continue
+                for row in self._read_part(part):
+                    if row["id"] > after_id and _row_matches(row, **filters):
+                        out.append(row)
+                        if len(out) >= limit:
+                            return out
+            return out
+
+        out = []
+        for part in reversed(parts):
+            if before_id is not None and part["min_id"] >= before_id:
+                continue
+            found = [
+                row for row in self._read_part(part)
+                if (before_id is None or row["id"] < before_id) and _row_matches(row, **filters)
+            ]
+            out = found[-(limit - len(out)):] + out if found else out
+            if len(out) >= limit:
+                break
+        return out
+
+    # ---------- escrita ----------
+    def archive_month(self, conn, month: date) -> int:
+        start = month.isoformat()
+        end = _next_month(month).isoformat()
+        cur = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM chat_message "
+            "WHERE created_at >= ? AND created_at < ? ORDER BY id ASC",
+            (start, end),
+        )
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        label = month.strftime("%Y-%m")
+        existing = [p for p in self.parts() if p["month"] == label]
+        name = f"chat_{label}.jsonl.gz" if not existing else f"chat_{label}.part{len(existing) + 1}.jsonl.gz"
+        tmp = self.dir / (name + ".tmp")
+
+        count = 0
+        min_id = max_id = None
+        first_at = last_at = None
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as f:
+            while True:
+                chunk = cur.fetchmany(5000)
+                if not chunk:
+                    break
+                for values in chunk:
+                    row = dict(zip(COLUMNS, values))
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    count += 1
+                    min_id = row["id"] if min_id is None else min(min_id, row["id"])
+                    max_id = row["id"] if max_id is None else max(max_id, row["id"])
+                    first_at = row["created_at"] if first_at is None else min(first_at, row["created_at"])
+                    last_at = row["created_at"] if last_at is None else max(last_at, row["created_at"])
+
+        if count == 0:
+            tmp.unlink()
+            return 0
+
+        digest = hashlib.sha256(tmp.read_bytes()).hexdigest()
+        os.replace(tmp, self.dir / name)
+
+        parts = self.parts()
+        parts.append({
+            "month": label,
+            "file": name,
+            "count": count,
+            "min_id": min_id,
+            "max_id": max_id,
+            "first_at": first_at,
+            "last_at": last_at,
+            "sha256": digest,
+            "archived_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        })
+        parts.sort(key=lambda p: (p["min_id"], p["file"]))
+        self._save_parts(parts)
+
+        # só apaga da tabela viva depois que o arquivo e o índice estão no disco
+        with conn:
+            conn.execute(
+                "DELETE FROM chat_message WHERE created_at >= ? AND created_at < ? AND id <= ?",
+                (start, end, max_id),
+            )
+        return count
+
+    def archive_old(self, db_path=DB_PATH, hot_days=HOT_DAYS, vacuum=False):
+        """Arquiva todos os meses que terminam antes de hoje - hot_days."""
+        cutoff_month = _month_start(date.today() - timedelta(days=hot_days))
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute("SELECT MIN(created_at) FROM chat_message").fetchone()
+            if not row or not row[0]:
+                return {}
+
+            month = _month_start(date.fromisoformat(row[0][:10]))
+            moved = {}
+            while month < cutoff_month:
+                n = self.archive_month(conn, month)
+                if n:
+                    moved[month.strftime("%Y-%m")] = n
+                month = _next_month(month)
+
+            if vacuum and moved:
+                conn.execute("VACUUM")
+            return moved
+        finally:
+            conn.close()
+
+
+def date_bounds(start_date=None, end_date=None):
+    """YYYY-MM-DD inclusivos → limites [start, end) comparáveis com created_at."""
+    start = start_date or None
+    end = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat() if end_date else None
+    return start, end
+
+
+def iter_messages(
+    start_date=None,
+    end_date=None,
+    username=None,
+    channel_type="global",
+    world=None,
+    db_path=DB_PATH,
+    archive=None,
+    chunk_size=5000,
+):
+    """
+    Mensagens (dicts) do arquivo + tabela viva, em ordem de id.
+
+    É um gerador: a tabela viva é lida em blocos de chunk_size (fetchmany), então
+    a memória não cresce com o tamanho do resultado.
+    """
+    archive = archive or ChatArchive()
+    start, end = date_bounds(start_date, end_date)
+    filters = {"channel_type": channel_type, "world": world, "username": username}
+
+    yield from archive.iter_rows(start=start, end=end, **filters)
+
+    query = f"SELECT {', '.join(COLUMNS)} FROM chat_message WHERE 1=1"
+    params = []
+    if channel_type:
+        query += " AND channel_type = ?"
+        params.append(channel_type)
+        if channel_type == "world" and world:
+            query += " AND world = ?"
+            params.append(world)
+    if start:
+        query += " AND created_at >= ?"
+        params.append(start)
+    if end:
+        query += " AND created_at < ?"
+        params.append(end)
+    if username:
+        query += " AND username = ?"
+        params.append(username)
+    # com filtro de data, a ordem (created_at, id) vem pronta do índice de created_at
+    # (id é o rowid) — sem ordenar o resultado inteiro num B-tree temporário
+    query += " ORDER BY created_at ASC, id ASC" if (start or end) else " ORDER BY id ASC"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(query, params)
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for values in chunk:
+                yield dict(zip(COLUMNS, values))
+    finally:
+        conn.close()
+
+
+def main(argv):
+    archive = ChatArchive()
+    cmd = argv[0] if argv else "list"
+
+    if cmd == "archive":
+        hot_days = HOT_DAYS
+        if "--hot-days" in argv:
+            hot_days = int(argv[argv.index("--hot-days") + 1])
+        moved = archive.archive_old(hot_days=hot_days, vacuum="--vacuum" in argv)
+        if not moved:
+            print("Nada para arquivar.")
+        for month, n in moved.items():
+            print(f"✅ {month}: {n} mensagens arquivadas")
+    elif cmd == "list":
+        parts = archive.parts()
+        if not parts:
+            print("Nenhum mês arquivado.")
+        for p in parts:
+            size = (archive.dir / p["file"]).stat().st_size
+            print(f"- {p['month']} {p['file']} mensagens={p['count']} ids={p['min_id']}..{p['max_id']} bytes={size}")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
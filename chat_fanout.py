@@ -0,0 +1,140 @@
+"""
+Fan-out do chat entre workers (gunicorn/eventlet) via fila de mensagens.
+
+SOCKETIO_MESSAGE_QUEUE escolhe o backend:
+
+    redis://host:6379/0   → socketio.RedisManager
+    local://<nome>        → LocalQueueManager (barramento em memória, mesmo processo)
+    amqp://..., etc.      → socketio.KombuManager
+
+O local:// é o stand-in para testes: vários servidores Socket.IO no mesmo processo
+compartilham o barramento exatamente como workers compartilham o Redis.
+
+Todos os managers daqui chamam `on_emit(event, data, room)` para cada emit
+recebido (local ou de outro worker) — é assim que o ring buffer do histórico
+enxerga as mensagens enviadas por outros processos.
+
+EmitCoalescer é o modo opcional de micro-lotes: em vez de um frame por mensagem
+para cada cliente, junta as mensagens de cada sala durante uma janela curta
+(CHAT_BATCH_WINDOW_MS) e emite um único evento `chat_batch` com a lista.
+"""
+
+import json
+import queue
+import threading
+
+import socketio
+
+
+class _EmitHookMixin:
+    on_emit = None
+
+    def _handle_emit(self, message):
+        super()._handle_emit(message)
+        if self.on_emit is None or message.get("binary"):
+            return
+        data = message.get("data")
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        try:
+            self.on_emit(message.get("event"), data, message.get("room"))
+        except Exception:
+            self._get_logger().exception("Falha no hook de emit do chat")
+
+
+class LocalQueueManager(_EmitHookMixin, socketio.PubSubManager):
+    """Pub/sub em memória: cada instância é um 'worker' inscrito no canal."""
+
+    name = "local"
+
+    _buses = {}
+    _buses_lock = threading.Lock()
+
+    def __init__(self, url="local://", channel="socketio", write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = url.split("://", 1)[-1] or "default"
+        self._inbox = queue.Queue()
+        with self._buses_lock:
+            self._buses.setdefault((self.bus, channel), []).append(self._inbox)
+
+    def _publish(self, data):
+        raw = json.dumps(data)
+        with self._buses_lock:
+            inboxes = list(self._buses.get((self.bus, self.channel), []))
+        for inbox in inboxes:
+            inbox.put(raw)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+
+class _RedisManager(_EmitHookMixin, socketio.RedisManager):
+    pass
+
+
+class _KombuManager(_EmitHookMixin, socketio.KombuManager):
+    pass
+
+
+class EmitCoalescer:
+    def __init__(self, socketio, window_ms=50, max_batch=200, event="chat_batch"):
+        self.socketio = socketio
+        self.window = max(1, int(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.event = event
+        self._pending = {}  # sala -> lista de payloads
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.messages = 0
+
+    def add(self, room, payload):
+        with self._lock:
+            buf = self._pending.setdefault(room, [])
+            buf.append(payload)
+            first = len(buf) == 1
+            full = len(buf) >= self.max_batch
+            if full:
+                batch = self._pending.pop(room)
+
+        if full:
+            self._emit(room, batch)
+        elif first:
+            # a primeira mensagem da janela agenda o envio; as seguintes só entram no lote
+            self.socketio.start_background_task(self._flush_later, room)
+
+    def _flush_later(self, room):
+        self.socketio.sleep(self.window)
+        with self._lock:
+            batch = self._pending.pop(room, None)
+        if batch:
+            self._emit(room, batch)
+
+    def _emit(self, room, batch):
+        self.batches += 1
+        self.messages += len(batch)
+        self.socketio.emit(self.event, batch, to=room)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": round(self.window * 1000),
+            "batches": self.batches,
+            "messages": self.messages,
+            "avg_batch": round(self.messages / self.batches, 2) if self.batches else 0,
+            "pending_rooms": len(self._pending),
+        }
+
+
+def make_client_manager(url, channel="flask-socketio", on_emit=None):
+    """Cria o client manager para a URL da fila (ou None sem fila = um processo só)."""
+    if not url:
+        return None
+    if url.startswith("local://"):
+        manager = LocalQueueManager(url, channel=channel)
+    elif url.startswith(("redis://", "rediss://")):
+        manager = _RedisManager(url, channel=channel)
+    else:
+        manager = _KombuManager(url, channel=channel)
+    manager.on_emit = on_emit
+    return manager
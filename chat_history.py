@@ -0,0 +1,170 @@
+"""
+Histórico do chat: paginação por keyset (ChatMessage.id) + ring buffer em memória.
+
+As últimas N mensagens de cada canal ficam num deque por processo. O caso comum
+(carregar as últimas 50 ao abrir a página ou ao reconectar) é servido só da
+memória; o chat.db só é consultado quando o pedido vai além do que o buffer cobre.
+
+O buffer também guarda as mensagens que ainda estão na fila do write-behind, então
+o resultado do banco é sempre mesclado com ele (dedupe por id). Quando a tabela
+viva não tem linhas suficientes, a página continua nos meses arquivados
+(chat_archive.ChatArchive).
+"""
+
+import bisect
+import threading
+
+
+def channel_key(channel_type: str, world=None):
+    if channel_type == "world":
+        return ("world", world or "")
+    return ("global", None)
+
+
+def _from_archive(row: dict) -> dict:
+    created = str(row["created_at"]).replace(" ", "T")
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "channel_type": row["channel_type"],
+        "world": row["world"],
+        "text": row["text"],
+        "created_at": created + "Z",
+    }
+
+
+class _Ring:
+    __slots__ = ("ids", "rows", "complete")
+
+    def __init__(self):
+        self.ids = []      # ordenado (asc)
+        self.rows = []     # payloads serializados, na mesma ordem de ids
+        self.complete = False  # True = contém todo o histórico do canal
+
+
+class ChatHistory:
+    def __init__(self, app, db, model, serialize, size=200, archive=None):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.serialize = serialize
+        self.size = max(1, int(size))
+        self.archive = archive
+        self._rings = {}
+        self._lock = threading.Lock()
+
+        self.ring_hits = 0
+        self.db_queries = 0
+        self.archive_reads = 0
+
+    # ---------- buffer ----------
+    def _archive_page(self, key, limit, before_id=None, after_id=None):
+        if self.archive is None or limit <= 0:
+            return []
+        parts = self.archive.parts()
+        if not parts:
+            return []
+        if after_id is not None and after_id >= max(p["max_id"] for p in parts):
+            return []
+        self.archive_reads += 1
+        channel_type, world = key
+        rows = self.archive.page(
+            channel_type=channel_type,
+            world=world,
+            limit=limit,
+            before_id=before_id,
+            after_id=after_id,
+        )
+        return [_from_archive(r) for r in rows]
+
+    def _query(self, key, limit, before_id=None, after_id=None):
+        self.db_queries += 1
+        channel_type, world = key
+        q = self.model.query.filter(self.model.channel_type == channel_type)
+        if channel_type == "world":
+            q = q.filter(self.model.world == world)
+        if before_id is not None:
+            q = q.filter(self.model.id < before_id)
+
+        # meses arquivados são sempre mais antigos que a tabela viva
+        if after_id is not None:
+            archived = self._archive_page(key, limit, after_id=after_id)
+            if len(archived) >= limit:
+                return archived
+            rows = q.filter(self.model.id > after_id).order_by(self.model.id.asc()).limit(limit - len(archived)).all()
+            return archived + [self.serialize(r) for r in rows]
+
+        rows = q.order_by(self.model.id.desc()).limit(limit).all()
+        rows.reverse()
+        out = [self.serialize(r) for r in rows]
+        if len(out) < limit:
+            out = self._archive_page(key, limit - len(out), before_id=out[0]["id"] if out else before_id) + out
+        return out
+
+    def _ring(self, key) -> _Ring:
+        ring = self._rings.get(key)
+        if ring is not None:
+            return ring
+
+        with self.app.app_context():
+            rows = self._query(key, self.size)
+
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = _Ring()
+                for row in rows:
+                    ring.ids.append(row["id"])
+                    ring.rows.append(row)
+                ring.complete = len(rows) < self.size
+                self._rings[key] = ring
+        return ring
+
+    def append(self, channel_type: str, world, payload: dict):
+        ring = self._ring(channel_key(channel_type, world))
+        with self._lock:
+            i = bisect.bisect_left(ring.ids, payload["id"])
+            if i < len(ring.ids) and ring.ids[i] == payload["id"]:
+                return
+            ring.ids.insert(i, payload["id"])
+            ring.rows.insert(i, payload)
+            if len(ring.ids) > self.size:
+                del ring.ids[0]
+                del ring.rows[0]
+                ring.complete = False
+
+    # ---------- leitura ----------
+    def page(self, channel_type="global", world=None, limit=50, before_id=None, after_id=None):
+        """
+        Mensagens do canal em ordem crescente de id.
+
+        - sem cursores: as `limit` mais recentes
+        - before_id: as `limit` imediatamente anteriores a before_id (rolar para cima)
+        - after_id: as `limit` seguintes a after_id (catch-up após reconexão)
+        """
+        key = channel_key(channel_type, world)
+        ring = self._ring(key)
+
+        with self._lock:
+            lo = 0 if after_id is None else bisect.bisect_right(ring.ids, after_id)
+            hi = len(ring.ids) if before_id is None else bisect.bisect_left(ring.ids, before_id)
+            selected = ring.rows[lo:hi] if lo < hi else []
+            oldest = ring.ids[0] if ring.ids else None
+            complete = ring.complete
+
+        if after_id is not None:
+            covered = complete or (oldest is not None and oldest <= after_id)
+            if covered:
+                self.ring_hits += 1
+                return selected[:limit]
+        else:
+            if complete or len(selected) >= limit:
+                self.ring_hits += 1
+                return selected[-limit:]
+
+        rows = self._query(key, limit, before_id=before_id, after_id=after_id)
+        merged = {r["id"]: r for r in rows}
+        for r in selected:
+            merged.setdefault(r["id"], r)
+        ordered = [merged[i] for i in sorted(merged)]
+        return ordered[:limit] if after_id is not None else ordered[-limit:]
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Busca full-text no chat com SQLite FTS5 (tabela chat_message_fts no chat.db).
+
+O índice guarda o texto e os metadados (username, canal, mundo, data) de cada
+mensagem, com rowid = ChatMessage.id. Triggers AFTER INSERT / AFTER DELETE em
+chat_message mantêm o índice em dia — inclusive para os lotes do write-behind e
+para os meses que o chat_archive.py move para fora da tabela viva: a busca cobre
+a janela quente, e o índice não cresce para sempre nem devolve mensagem apagada.
+
+Uso:
+
+  python chat_search.py rebuild     → recria o índice a partir da tabela viva
+  python chat_search.py "dragon lord" [--user fulano] [--world Yonabra] [--limit 20]
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+
+FTS_TABLE = "chat_message_fts"
+
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        username UNINDEXED,
+        channel_type UNINDEXED,
+        world UNINDEXED,
+        created_at UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, text, username, channel_type, world, created_at)
+        VALUES (new.id, new.text, new.username, new.channel_type, new.world, new.created_at);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_message BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+]
+
+SORTS = ("rank", "recent", "oldest")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_schema(execute):
+    """Cria tabela FTS + triggers. `execute(sql)` é sqlite3 ou SQLAlchemy (exec_driver_sql)."""
+    for sql in SCHEMA:
+        execute(sql)
+
+
+def to_match_query(q: str):
+    """
+    Texto livre → expressão MATCH segura: cada palavra vira um termo com prefixo
+    ("drag"* encontra "dragon"), todos obrigatórios. Nunca repassa sintaxe FTS crua.
+    """
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " AND ".join(f'"{t}"*' for t in tokens[:16])
+
+
+def build_search_query(
+    q,
+    channel_type=None,
+    world=None,
+    username=None,
+    start=None,
+    end=None,
+    sort="rank",
+    limit=50,
+    offset=0,
+    before_id=None,
+    after_id=None,
+):
+    """
+    Monta (sql, params) com parâmetros nomeados (:x), válidos em sqlite3 e em
+    sqlalchemy.text(). start/end são limites [start, end) no formato de created_at.
+
+    sort="rank" ordena por bm25 (paginação por offset); sort="recent" ordena por id
+    decrescente e aceita before_id (keyset) para páginas profundas sem OFFSET;
+    sort="oldest" ordena por id crescente com after_id (usado no export).
+    limit=None → sem LIMIT.
+    """
+    match = to_match_query(q)
+    if match is None:
+        return None, None
+
+    sql = (
+        f"SELECT rowid AS id, username, channel_type, world, text, created_at, "
+        f"bm25({FTS_TABLE}) AS score, "
+        f"snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    )
+    params = {"match": match}
+
+    if channel_type:
+        sql += " AND channel_type = :channel_type"
+        params["channel_type"] = channel_type
+        if channel_type == "world" and world:
+            sql += " AND world = :world"
+            params["world"] = world
+    if username:
+        sql += " AND username = :username"
+        params["username"] = username
+    if start:
+        sql += " AND created_at >= :start"
+        params["start"] = start
+    if end:
+        sql += " AND created_at < :end"
+        params["end"] = end
+
+    if sort == "recent":
+        if before_id is not None:
+            sql += " AND rowid < :before_id"
+            params["before_id"] = before_id
+        sql += " ORDER BY rowid DESC"
+    elif sort == "oldest":
+        if after_id is not None:
+            sql += " AND rowid > :after_id"
+            params["after_id"] = after_id
+        sql += " ORDER BY rowid ASC"
+    else:
+        sql += " ORDER BY rank"
+
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = max(1, int(limit))
+        if sort == "rank":
+            sql += " OFFSET :offset"
+            params["offset"] = max(0, int(offset or 0))
+    return sql, params
+
+
+def rebuild(conn):
+    """Recria o índice a partir da tabela viva (descarta linhas de mensagens já arquivadas)."""
+    ensure_schema(conn.execute)
+    with conn:
+        conn.execute(f"DELETE FROM {FTS_TABLE}")
+        conn.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, text, username, channel_type, world, created_at) "
+            "SELECT id, text, username, channel_type, world, created_at FROM chat_message"
+        )
+        conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}").fetchone()[0]
+
+
+def search(conn, q, **kwargs):
+    """Executa a busca numa conexão sqlite3; retorna lista de dicts."""
+    sql, params = build_search_query(q, **kwargs)
+    if sql is None:
+        return []
+    cur = conn.execute(sql, params)
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def iter_search(conn, q, chunk_size=5000, **filters):
+    """Todas as mensagens que batem com a busca, em ordem de id, lidas em blocos."""
+    sql, params = build_search_query(q, sort="oldest", limit=None, **filters)
+    if sql is None:
+        return
+    cur = conn.execute(sql, params)
+    cols = [c[0] for c in cur.description]
+    while True:
+        chunk = cur.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for row in chunk:
+            yield dict(zip(cols, row))
+
+
+def main(argv):
+    from chat_archive import DB_PATH, date_bounds
+
+    if argv and argv[0] == "rebuild":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            print(f"✅ Índice recriado: {rebuild(conn)} mensagens")
+        finally:
+            conn.close()
+        return
+
+    parser = argparse.ArgumentParser(description="Busca no chat Yonexus (FTS5).")
+    parser.add_argument("query")
+    parser.add_argument("--user", dest="username")
+    parser.add_argument("--world")
+    parser.add_argument("--from", dest="start_date")
+    parser.add_argument("--to", dest="end_date")
+    parser.add_argument("--sort", choices=SORTS, default="rank")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start, end = date_bounds(args.start_date, args.end_date)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        ensure_schema(conn.execute)
+        rows = search(
+            conn,
+            args.query,
+            channel_type="world" if args.world else None,
+            world=args.world,
+            username=args.username,
+            start=start,
+            end=end,
+            sort=args.sort,
+            limit=args.limit,
+            offset=args.offset,
+        )
+    finally:
+        conn.close()
+
+    if not rows:
+        print("Nada encontrado.")
+    for r in rows:
+        canal = "GLOBAL" if r["channel_type"] == "global" else (r["world"] or "WORLD")
+        print(f"[{str(r['created_at'])[:19]}] [{canal}] {r['username']}: {r['snippet']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
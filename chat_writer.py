@@ -0,0 +1,329 @@
+"""
+Write-behind das mensagens do chat (data/chat.db).
+
+O socket_chat_send não grava mais mensagem por mensagem: cada mensagem recebe um
+id na hora (ChatIdGenerator), é transmitida imediatamente e entra numa fila em
+memória. Uma thread (green, com eventlet) grava a fila em lotes, numa única
+transação, a cada N mensagens ou M milissegundos — o que vier primeiro.
+
+Os ids são crescentes no tempo mesmo com vários workers:
+
+    id = (ms desde CHAT_ID_EPOCH_MS) << 10 | nó (6 bits) << 4 | sequência (4 bits)
+
+O nó de cada processo é um lease no próprio chat.db (tabela chat_writer_lease),
+renovado pela thread de gravação. Um nó só passa para outro processo quando o
+dono anterior morreu (mesma máquina) ou parou de renovar por CHAT_NODE_LEASE_SECONDS;
+sem nó livre o processo falha em vez de repetir o nó de um worker vivo. O valor
+cabe em 53 bits (seguro no JS).
+
+A fila é limitada (CHAT_QUEUE_MAX: enqueue() recusa acima disso). Um lote com
+linha inválida (IntegrityError) é dividido ao meio até isolar as linhas ruins,
+que são descartadas com log; outros erros devolvem o lote à fila, com espera
+crescente, até CHAT_FLUSH_MAX_RETRIES tentativas seguidas.
+"""
+
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+
+log = logging.getLogger(__name__)
+
+CHAT_ID_EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+_NODE_BITS = 6
+_SEQ_BITS = 4
+
+
+class ChatIdGenerator:
+    def __init__(self, node: int):
+        self.node = node & ((1 << _NODE_BITS) - 1)
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._seq = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = int(time.time() * 1000) - CHAT_ID_EPOCH_MS
+            if now < self._last_ms:
+                now = self._last_ms  # relógio voltou: continua do último ms
+            if now == self._last_ms:
+                self._seq += 1
+                if self._seq >= (1 << _SEQ_BITS):
+                    # sequência esgotada neste ms: avança para o próximo
+                    now = self._last_ms + 1
+                    self._seq = 0
+            else:
+                self._seq = 0
+            self._last_ms = now
+            return (now << (_NODE_BITS + _SEQ_BITS)) | (self.node << _SEQ_BITS) | self._seq
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, só é de outro usuário
+    return True
+
+
+def reserve_node(engine, lease_seconds=60.0) -> int:
+    """
+    Reserva um nó livre para este processo. Livre = sem dono, dono parado há mais
+    de `lease_seconds` ou dono na mesma máquina com o processo morto. Cada tomada
+    é condicional (INSERT na chave / UPDATE comparando o dono lido), então dois
+    processos disputando o mesmo nó não ficam ambos com ele.
+    """
+    host, pid = socket.gethostname(), os.getpid()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS chat_writer_lease ("
+            "node INTEGER PRIMARY KEY, host TEXT, pid INTEGER, heartbeat REAL)"
+        ))
+        held = {r.node: r for r in conn.execute(text("SELECT node, host, pid, heartbeat FROM chat_writer_lease"))}
+
+    now = time.time()
+    me = {"host": host, "pid": pid, "now": now}
+    for node in range(1 << _NODE_BITS):
+        row = held.get(node)
+        try:
+            with engine.begin() as conn:
+                if row is None:
+                    conn.execute(
+                        text("INSERT INTO chat_writer_lease (node, host, pid, heartbeat) VALUES (:node, :host, :pid, :now)"),
+                        {**me, "node": node},
+                    )
+                    return node
+                free = row.heartbeat < now - lease_seconds or (
+                    row.host == host and (row.pid == pid or not _pid_alive(row.pid))
+                )
+                if free and conn.execute(
+                    text(
+                        "UPDATE chat_writer_lease SET host = :host, pid = :pid, heartbeat = :now "
+                        "WHERE node = :node AND host = :old_host AND pid = :old_pid AND heartbeat = :old_hb"
+                    ),
+                    {**me, "node": node, "old_host": row.host, "old_pid": row.pid, "old_hb": row.heartbeat},
+                ).rowcount == 1:
+                    return node
+        except IntegrityError:
+            continue  # outro processo inseriu este nó primeiro
+    raise RuntimeError(
+        f"chat: nenhum dos {1 << _NODE_BITS} nós de id está livre (tabela chat_writer_lease); "
+        "aguarde os leases expirarem ou reduza o número de workers"
+    )
+
+
+def renew_node(engine, node) -> bool:
+    """Renova o lease. False se outro processo tomou o nó (este parou por tempo demais)."""
+    with engine.begin() as conn:
+        return conn.execute(
+            text("UPDATE chat_writer_lease SET heartbeat = :now WHERE node = :node AND host = :host AND pid = :pid"),
+            {"now": time.time(), "node": node, "host": socket.gethostname(), "pid": os.getpid()},
+        ).rowcount == 1
+
+
+def release_node(engine, node):
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM chat_writer_lease WHERE node = :node AND host = :host AND pid = :pid"),
+            {"node": node, "host": socket.gethostname(), "pid": os.getpid()},
+        )
+
+
+class ChatWriteBehind:
+    def __init__(self, app, db, model, max_batch=200, interval_ms=250, max_queue=10000,
+                 max_retries=5, node_lease_s=60.0):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.interval = max(1, int(interval_ms)) / 1000.0
+        self.max_queue = max(self.max_batch, int(max_queue))
+        self.max_retries = max(1, int(max_retries))
+        self.node_lease_s = float(node_lease_s)
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._ids = None
+        self._engine = None
+        self._node = None
+        self._node_pid = None
+        self._last_renew = 0.0
+        self._failures = 0  # falhas seguidas de gravação (fora IntegrityError)
+
+        # observabilidade
+        self.enqueued_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.dropped_total = 0   # linhas inválidas ou lotes que esgotaram as tentativas
+        self.rejected_total = 0  # recusadas por fila cheia
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.oldest_pending_at = None
+
+    # ---------- ids ----------
+    def next_id(self) -> int:
+        # pid diferente: processo filho de um fork depois da reserva, precisa do próprio nó
+        if self._ids is None or self._node_pid != os.getpid():
+            with self.app.app_context():  # contexto próprio: fora da conta de queries do request
+                self._engine = self.db.engines[self.model.__bind_key__]
+                self._node = reserve_node(self._engine, self.node_lease_s)
+            self._node_pid = os.getpid()
+            self._last_renew = time.monotonic()
+            self._ids = ChatIdGenerator(self._node)
+        return self._ids.next_id()
+
+    def _renew(self):
+        if self._node is None or self._node_pid != os.getpid():
+            return
+        if time.monotonic() - self._last_renew < self.node_lease_s / 4:
+            return
+        try:
+            if renew_node(self._engine, self._node):
+                self._last_renew = time.monotonic()
+            else:
+                log.error("chat: lease do nó %d foi tomado por outro processo; reservando outro", self._node)
+                self._ids = None
+        except Exception:
+            log.exception("chat: falha ao renovar o lease do nó %d", self._node)
+
+    # ---------- fila ----------
+    def enqueue(self, row: dict) -> bool:
+        """False (mensagem não aceita) com a fila cheia: o banco não está dando conta."""
+        self.start()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.rejected_total += 1
+                return False
+            if not self._queue:
+                self.oldest_pending_at = time.monotonic()
+            self._queue.append(row)
+            self.enqueued_total += 1
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify()
+        return True
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        pending_age = (
+            round((time.monotonic() - self.oldest_pending_at) * 1000, 1)
+            if self._queue and self.oldest_pending_at else 0.0
+        )
+        return {
+            "queue_depth": self.depth(),
+            "oldest_pending_ms": pending_age,
+            "enqueued_total": self.enqueued_total,
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "dropped_total": self.dropped_total,
+            "rejected_total": self.rejected_total,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    # ---------- gravação ----------
+    def flush(self) -> int:
+        """Grava tudo o que está na fila numa transação. Retorna quantas linhas gravou."""
+        with self._flush_lock:
+            with self._cond:
+                if not self._queue:
+                    return 0
+                batch = list(self._queue)
+                self._queue.clear()
+                self.oldest_pending_at = None
+
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    written, dropped = self._insert(batch)
+            except Exception:
+                self.flush_errors += 1
+                self._failures += 1
+                if self._failures >= self.max_retries:
+                    # erro que não passa: descarta o lote para não travar as mensagens seguintes
+                    log.exception("Falha ao gravar lote do chat (%d mensagens) %d vezes seguidas; descartando",
+                                  len(batch), self._failures)
+                    self.dropped_total += len(batch)
+                    self._failures = 0
+                    return 0
+                log.exception("Falha ao gravar lote do chat (%d mensagens); recolocando na fila", len(batch))
+                with self._cond:
+                    self._queue.extendleft(reversed(batch))
+                    self.oldest_pending_at = self.oldest_pending_at or time.monotonic()
+                return 0
+
+            self._failures = 0
+            self.dropped_total += dropped
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.flushed_total += written
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            log.debug("chat flush: %d mensagens em %.1f ms", written, elapsed)
+            return written
+
+    def _insert(self, rows):
+        """
+        Grava `rows` numa transação. Em IntegrityError divide ao meio até isolar as
+        linhas ruins, que são descartadas. Devolve (gravadas, descartadas).
+        """
+        try:
+            self.db.session.execute(insert(self.model), rows)
+            self.db.session.commit()
+            return len(rows), 0
+        except IntegrityError:
+            self.db.session.rollback()
+            if len(rows) == 1:
+                log.error("Mensagem do chat descartada (id repetido ou inválida): id=%s", rows[0].get("id"))
+                return 0, 1
+        mid = len(rows) // 2
+        w1, d1 = self._insert(rows[:mid])
+        w2, d2 = self._insert(rows[mid:])
+        return w1 + w2, d1 + d2
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._failures:
+                    # depois de uma falha espera mesmo com a fila cheia (sem laço quente)
+                    self._cond.wait(min(5.0, self.interval * 2 ** self._failures))
+                elif not self._stopping and len(self._queue) < self.max_batch:
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            self.flush()
+            self._renew()
+            if stopping:
+                return
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        # garante a gravação final mesmo se a thread já tiver morrido com o processo
+        self.flush()
+        if self._node is not None and self._node_pid == os.getpid():
+            try:
+                release_node(self._engine, self._node)
+            except Exception:
+                log.exception("chat: falha ao liberar o nó %d", self._node)
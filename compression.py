@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Compressão das respostas HTTP (gzip / brotli negociados por Accept-Encoding).
+
+Duas partes:
+
+- respostas dinâmicas (JSON, HTML, texto) acima de COMPRESS_MIN_SIZE bytes são
+  comprimidas no after_request, com brotli quando o cliente aceita e o pacote
+  `brotli` está instalado, senão gzip;
+- arquivos de static/ são servidos a partir de irmãos pré-comprimidos
+  (`main.js.br`, `main.js.gz`) gerados no build — nenhuma compressão por request.
+  Sem irmão (ou com irmão mais velho que o original), sai o arquivo normal.
+
+Gerar os irmãos (rode de novo após mudar JS/CSS/JSON):
+
+  python compression.py build      → cria .gz (e .br, se `brotli` estiver instalado)
+  python compression.py clean      → apaga os .gz/.br gerados
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+import threading
+
+from flask import request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # dependência opcional: sem ela, só gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/",
+    "image/svg+xml",
+)
+STATIC_EXTENSIONS = (".js", ".css", ".json", ".svg", ".html", ".txt", ".map")
+SIBLINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _compressible(mimetype) -> bool:
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def gzip_bytes(data: bytes, level=6) -> bytes:
+    # mtime=0 deixa a saída determinística (mesmo arquivo → mesmo .gz / ETag)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Compression:
+    def __init__(self, app=None):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.br_quality = 4
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.min_size = int(app.config.get("COMPRESS_MIN_SIZE", self.min_size))
+        self.gzip_level = int(app.config.get("COMPRESS_GZIP_LEVEL", self.gzip_level))
+        self.br_quality = int(app.config.get("COMPRESS_BR_QUALITY", self.br_quality))
+        app.before_request(self._serve_precompressed)
+        app.after_request(self._compress_response)
+
+    # ---------- métricas ----------
+    def _count(self, kind, encoding, before, after):
+        with self._lock:
+            s = self._stats.setdefault(f"{kind}:{encoding}", {"responses": 0, "bytes_in": 0, "bytes_out": 0})
+            s["responses"] += 1
+            s["bytes_in"] += before
+            s["bytes_out"] += after
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {k: dict(v, bytes_saved=v["bytes_in"] - v["bytes_out"]) for k, v in self._stats.items()}
+        return {
+            "brotli_available": brotli is not None,
+            "min_size": self.min_size,
+            "bytes_saved": sum(v["bytes_saved"] for v in out.values()),
+            "by_kind": out,
+        }
+
+    # ---------- negociação ----------
+    def _accepted(self):
+        accept = request.accept_encodings
+        for encoding, _ in SIBLINGS:
+            if accept[encoding] > 0:
+                yield encoding
+
+    # ---------- static ----------
+    def _serve_precompressed(self):
+        if request.endpoint != "static" or request.method not in ("GET", "HEAD"):
+            return None
+        filename = (request.view_args or {}).get("filename") or ""
+        path = safe_join(self.app.static_folder, filename)
+        if not path or not path.endswith(STATIC_EXTENSIONS) or not os.path.isfile(path):
+            return None
+
+        accepted = set(self._accepted())
+        for encoding, ext in SIBLINGS:
+            if encoding not in accepted:
+                continue
+            sibling = path + ext
+            try:
+                original = os.stat(path)
+                compressed = os.stat(sibling)
+            except OSError:
+                continue
+            if compressed.st_mtime < original.st_mtime:
+                continue  # irmão desatualizado: melhor servir o original do que JS velho
+
+            mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            response = send_file(sibling, mimetype=mimetype, conditional=True, max_age=None)
+            response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+            if response.status_code == 200:
+                self._count("static", encoding, original.st_size, compressed.st_size)
+            return response
+        return None
+
+    # ---------- dinâmico ----------
+    def _compress_response(self, response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not _compressible(response.mimetype)
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        accepted = list(self._accepted())
+        if "br" in accepted and brotli is not None:
+            encoding, body = "br", brotli.compress(data, quality=self.br_quality)
+        elif "gzip" in accepted:
+            encoding, body = "gzip", gzip_bytes(data, self.gzip_level)
+        else:
+            return response
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if response.headers.get("ETag"):
+            # ETag forte identifica os bytes exatos; o corpo mudou
+            response.set_etag(f"{response.get_etag()[0]}-{encoding}", weak=True)
+        self._count("dynamic", encoding, len(data), len(body))
+        return response
+
+
+# =========================
+# Build dos irmãos pré-comprimidos
+# =========================
+def build_static(static_dir, min_size=512):
+    """Cria .gz/.br ao lado de cada arquivo comprimível; pula o que não encolhe."""
+    written, saved = 0, 0
+    for root, _, files in os.walk(static_dir):
+        for fn in files:
+            if not fn.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(root, fn)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+
+            variants = [(".gz", gzip_bytes(data, 9))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for ext, body in variants:
+                target = path + ext
+                if len(body) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                with open(target, "wb") as f:
+                    f.write(body)
+                written += 1
+                saved += len(data) - len(body)
+    return written, saved
+
+
+def clean_static(static_dir):
+    removed = 0
+    for root, _, files in os.walk(static_dir):
+        for fn in files:
+            base, ext = os.path.splitext(fn)
+            if ext in (".gz", ".br") and base.endswith(STATIC_EXTENSIONS):
+                os.remove(os.path.join(root, fn))
+                removed += 1
+    return removed
+
+
+def main(argv):
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    cmd = argv[0] if argv else "build"
+    if cmd == "build":
+        written, saved = build_static(static_dir)
+        print(f"✅ {written} arquivos pré-comprimidos ({saved / 1024:.1f} KB a menos por visita sem cache)")
+        if brotli is None:
+            print("ℹ️ Pacote `brotli` não instalado: gerados só os .gz")
+    elif cmd == "clean":
+        print(f"🧹 {clean_static(static_dir)} arquivos removidos")
+    else:
+        sys.exit("Uso: python compression.py [build|clean]")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+"""
+Configuração do app (variáveis de ambiente → app.config).
+
+Separada do app.py para que os scripts de administração (manage.py, grant_vip.py)
+montem só o banco, sem SocketIO, login, sessão HTTP etc. Ver models.create_cli_app().
+"""
+
+import os
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def chat_database_url(root_path) -> str:
+    """URL do banco do chat. Única fonte: o bind "chat" do app e os scripts
+    (chat_archive.py, export_chat.py, chat_search.py, debug_chat_db.py) leem daqui."""
+    return os.environ.get(
+        "CHAT_DATABASE_URL",
+        "sqlite:///" + os.path.join(root_path, "data", "chat.db"),
+    )
+
+
+def configure(app):
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
+
+    # Banco principal (app)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+        "DATABASE_URL",
+        "sqlite:///" + os.path.join(app.root_path, "data", "app.db"),
+    )
+
+    # Banco separado do chat (bind)
+    app.config["SQLALCHEMY_BINDS"] = {
+        "chat": chat_database_url(app.root_path),
+    }
+
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # HTTP de saída (TibiaData): tamanho do pool e limite de requisições simultâneas por host
+    app.config["HTTP_POOL_CONNECTIONS"] = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))
+    app.config["HTTP_POOL_MAXSIZE"] = int(os.environ.get("HTTP_POOL_MAXSIZE", "50"))
+    app.config["HTTP_MAX_PER_HOST"] = int(os.environ.get("HTTP_MAX_PER_HOST", "20"))
+    app.config["HTTP_TIMEOUT"] = float(os.environ.get("HTTP_TIMEOUT", "10"))
+
+    # API do TibiaData (trocável por um servidor local nos testes de carga)
+    app.config["TIBIADATA_URL"] = os.environ.get("TIBIADATA_URL", "https://api.tibiadata.com").rstrip("/")
+
+    # Fila offline de XP (/xp/sync): entradas por lote e idade máxima aceita
+    app.config["XP_SYNC_MAX_BATCH"] = int(os.environ.get("XP_SYNC_MAX_BATCH", "100"))
+    app.config["XP_SYNC_MAX_AGE_DAYS"] = int(os.environ.get("XP_SYNC_MAX_AGE_DAYS", "30"))
+    app.config["XP_EXPORT_CHUNK"] = int(os.environ.get("XP_EXPORT_CHUNK", "1000"))
+
+    # Jobs em segundo plano (jobs.py): threads por processo, tentativas, espera entre elas e fila máxima
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", "2"))
+    app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+    app.config["JOB_RETRY_BASE"] = float(os.environ.get("JOB_RETRY_BASE", "2"))
+    app.config["JOB_RETRY_MAX"] = float(os.environ.get("JOB_RETRY_MAX", "300"))
+    app.config["JOB_QUEUE_MAX"] = int(os.environ.get("JOB_QUEUE_MAX", "500"))
+
+    # Coleta automática de XP pelo highscore (xp_collector.py)
+    app.config["XP_COLLECTOR_CONCURRENCY"] = int(os.environ.get("XP_COLLECTOR_CONCURRENCY", "4"))
+    app.config["XP_COLLECTOR_MAX_PAGES"] = int(os.environ.get("XP_COLLECTOR_MAX_PAGES", "20"))
+    app.config["XP_COLLECTOR_INTERVAL"] = float(os.environ.get("XP_COLLECTOR_INTERVAL", "1800"))
+
+    # Chat: gravação em lote (write-behind) a cada N mensagens ou M milissegundos
+    app.config["CHAT_FLUSH_MAX_BATCH"] = int(os.environ.get("CHAT_FLUSH_MAX_BATCH", "200"))
+    app.config["CHAT_FLUSH_INTERVAL_MS"] = int(os.environ.get("CHAT_FLUSH_INTERVAL_MS", "250"))
+    # fila limitada (acima disso a mensagem é recusada) e tentativas antes de descartar um lote
+    app.config["CHAT_QUEUE_MAX"] = int(os.environ.get("CHAT_QUEUE_MAX", "10000"))
+    app.config["CHAT_FLUSH_MAX_RETRIES"] = int(os.environ.get("CHAT_FLUSH_MAX_RETRIES", "5"))
+    # lease do nó de ids de cada worker (renovado pela thread de gravação)
+    app.config["CHAT_NODE_LEASE_SECONDS"] = float(os.environ.get("CHAT_NODE_LEASE_SECONDS", "60"))
+
+    # Chat: mensagens recentes mantidas em memória por canal e limite por página
+    app.config["CHAT_RING_SIZE"] = int(os.environ.get("CHAT_RING_SIZE", "200"))
+    app.config["CHAT_PAGE_MAX"] = int(os.environ.get("CHAT_PAGE_MAX", "200"))
+
+    # Chat: anti-flood (token bucket) — mensagens/segundo e rajada, por usuário e por conexão
+    app.config["CHAT_RATE_USER"] = float(os.environ.get("CHAT_RATE_USER", "1.0"))
+    app.config["CHAT_BURST_USER"] = float(os.environ.get("CHAT_BURST_USER", "8"))
+    app.config["CHAT_RATE_CONN"] = float(os.environ.get("CHAT_RATE_CONN", "1.0"))
+    app.config["CHAT_BURST_CONN"] = float(os.environ.get("CHAT_BURST_CONN", "5"))
+
+    # Chat: micro-lotes de emit (0 = desligado, um evento chat_message por mensagem)
+    app.config["CHAT_BATCH_WINDOW_MS"] = int(os.environ.get("CHAT_BATCH_WINDOW_MS", "0"))
+
+    # Chat: meses fora da janela quente ficam em arquivos compactados (ver chat_archive.py)
+    app.config["CHAT_ARCHIVE_DIR"] = os.environ.get(
+        "CHAT_ARCHIVE_DIR",
+        os.path.join(app.root_path, "data", "chat_archive"),
+    )
+
+    # Compressão (gzip/brotli) de respostas dinâmicas a partir deste tamanho (bytes)
+    app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+    app.config["COMPRESS_GZIP_LEVEL"] = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+    app.config["COMPRESS_BR_QUALITY"] = int(os.environ.get("COMPRESS_BR_QUALITY", "4"))
+
+    # Queries SQL por request/evento: Server-Timing, log e orçamento (ver query_stats.py)
+    app.config["SQL_STATS"] = _env_flag("SQL_STATS", "1")
+    app.config["SQL_STATS_LOG"] = _env_flag("SQL_STATS_LOG", "0")
+    app.config["SQL_QUERY_BUDGET"] = int(os.environ.get("SQL_QUERY_BUDGET", "30"))
+    app.config["SQL_REPEAT_LIMIT"] = int(os.environ.get("SQL_REPEAT_LIMIT", "5"))
+    if "SQL_STATS_STRICT" in os.environ:
+        app.config["SQL_STATS_STRICT"] = _env_flag("SQL_STATS_STRICT", "0")
+
+    # /internal/metrics (Prometheus): token exigido (Bearer) e pasta compartilhada entre workers.
+    # Sem token e sem METRICS_ALLOW_IPS ninguém acessa. METRICS_ALLOW_IPS compara com o
+    # remote_addr da conexão: atrás de um proxy na mesma máquina (nginx → gunicorn) todo
+    # request externo vem de 127.0.0.1, então não libere loopback nesse caso; use o token.
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN") or None
+    app.config["METRICS_ALLOW_IPS"] = frozenset(
+        ip.strip() for ip in os.environ.get("METRICS_ALLOW_IPS", "").split(",") if ip.strip()
+    )
+    app.config["METRICS_DIR"] = os.environ.get("METRICS_DIR") or None
+    app.config["METRICS_FLUSH_INTERVAL"] = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+    # Profiler por request (ver profiler.py): admins por username e amostragem em produção
+    app.config["PROFILER_ADMINS"] = tuple(
+        u.strip() for u in os.environ.get("PROFILER_ADMINS", "").split(",") if u.strip()
+    )
+    app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR", os.path.join(app.root_path, "data", "profiles"))
+    app.config["PROFILE_KEEP"] = int(os.environ.get("PROFILE_KEEP", "200"))
+    app.config["PROFILE_SAMPLE_PERCENT"] = float(os.environ.get("PROFILE_SAMPLE_PERCENT", "0"))
+    app.config["PROFILE_SAMPLE_ENDPOINTS"] = tuple(
+        e.strip() for e in os.environ.get("PROFILE_SAMPLE_ENDPOINTS", "web.metrics").split(",") if e.strip()
+    )
+
+    # Modo assíncrono do Socket.IO; com "eventlet" o wsgi.py aplica o monkey_patch antes do import do app
+    app.config["SOCKETIO_ASYNC_MODE"] = os.environ.get("SOCKETIO_ASYNC_MODE", "eventlet")
+
+    # Fila de mensagens do Socket.IO (vários workers): redis://..., amqp://... ou local:// (testes)
+    app.config["SOCKETIO_MESSAGE_QUEUE"] = os.environ.get("SOCKETIO_MESSAGE_QUEUE") or None
+    app.config["SOCKETIO_CHANNEL"] = os.environ.get("SOCKETIO_CHANNEL", "flask-socketio")
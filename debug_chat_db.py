@@ -1,8 +1,8 @@
 import sqlite3
-from pathlib import Path
 
-BASE = Path(__file__).parent
-db_path = BASE / "data" / "chat.db"
+from chat_archive import DB_PATH, ChatArchive
+
+db_path = DB_PATH
 
 print("DB esperado:", db_path.resolve())
 print("Existe?:", db_path.exists())
@@ -36,3 +36,11 @@ else:
     print("\nNenhuma tabela candidata encontrada. Veja a lista acima.")
 
 conn.close()
+
+# meses movidos para data/chat_archive (ver chat_archive.py)
+parts = ChatArchive().parts()
+print("\nMeses arquivados:", len(parts))
+for p in parts:
+    print(f"- {p['month']} ({p['file']}): {p['count']} mensagens, ids {p['min_id']}..{p['max_id']}")
+if parts:
+    print("Total arquivado:", sum(p["count"] for p in parts))
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
-Exporta mensagens do chat (data/chat.db) para um arquivo .txt
+Exporta mensagens do chat (data/chat.db + meses arquivados em data/chat_archive)
+para .txt, .jsonl ou .csv (opcionalmente .gz), em streaming: as linhas são lidas
+em blocos e escritas direto no arquivo, então a memória não cresce com o período.
 
 Filtros disponíveis (via input interativo ou argumentos):
 
@@ -21,54 +23,92 @@ Uso rápido (CLI):
   python export_chat.py                            → pergunta opções no terminal
   python export_chat.py 2026-01-01                → desde 2026-01-01, canal global
   python export_chat.py 2026-01-01 2026-01-17     → período específico, canal global
+  python export_chat.py 2026-01-01 --format jsonl --gzip
+  python export_chat.py --format csv --world Yonabra --user fulano
+  python export_chat.py --query "dragon lord" --format jsonl
 """
 
+import argparse
+import csv
+import gzip
+import json
+import re
 import sqlite3
 import sys
 from datetime import datetime
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "data" / "chat.db"
+from chat_archive import DB_PATH, date_bounds, iter_messages
+import chat_search
+
 OUTPUT_DIR = Path(__file__).parent / "exports"
 
 
-def build_query(
-    start_date=None,
-    end_date=None,
-    username=None,
-    channel_type="global",
-    world=None,
-):
-    query = "SELECT username, text, created_at, channel_type, world FROM chat_message WHERE 1=1"
-    params = []
+FORMATS = ("txt", "jsonl", "csv")
+CSV_COLUMNS = ("id", "created_at", "channel_type", "world", "username", "text")
 
-    # Canal
-    if channel_type == "global":
-        query += " AND channel_type = 'global'"
-    elif channel_type == "world":
-        query += " AND channel_type = 'world'"
-        if world:
-            query += " AND world = ?"
-            params.append(world)
 
-    # Período
-    if start_date and end_date:
-        query += " AND created_at BETWEEN ? AND ?"
-        params.extend([start_date + " 00:00:00", end_date + " 23:59:59"])
-    elif start_date:
-        query += " AND created_at >= ?"
-        params.append(start_date + " 00:00:00")
-    elif end_date:
-        query += " AND created_at <= ?"
-        params.append(end_date + " 23:59:59")
+def _timestamp(created_at) -> str:
+    # created_at já vem como "YYYY-MM-DD HH:MM:SS[.ffffff]": basta cortar, sem parse por linha
+    return str(created_at)[:19].replace("T", " ")
+
+
+def _open_output(path: Path, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _write_txt(f, rows, header):
+    f.write("=== Chat Yonexus ===\n")
+    for line in header:
+        f.write(line + "\n")
+    f.write("\n")
+
+    count = 0
+    for r in rows:
+        canal_label = "GLOBAL" if r["channel_type"] == "global" else (r["world"] or "WORLD")
+        f.write(f"[{_timestamp(r['created_at'])}] [{canal_label}] {r['username']}: {r['text']}\n")
+        count += 1
+
+    # o total só é conhecido no fim (o export é em streaming)
+    f.write(f"\nTotal de mensagens: {count}\n")
+    return count
+
+
+def _write_jsonl(f, rows, header):
+    count = 0
+    for r in rows:
+        f.write(json.dumps({
+            "id": r["id"],
+            "created_at": _timestamp(r["created_at"]),
+            "channel_type": r["channel_type"],
+            "world": r["world"],
+            "username": r["username"],
+            "text": r["text"],
+        }, ensure_ascii=False) + "\n")
+        count += 1
+    return count
 
-    # Usuário
-    if username:
-        query += " AND username = ?"
-        params.append(username)
 
-    query += " ORDER BY id ASC"
-    return query, params
+def _write_csv(f, rows, header):
+    writer = csv.writer(f)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+    for r in rows:
+        writer.writerow((
+            r["id"],
+            _timestamp(r["created_at"]),
+            r["channel_type"],
+            r["world"] or "",
+            r["username"],
+            r["text"],
+        ))
+        count += 1
+    return count
+
+
+WRITERS = {"txt": _write_txt, "jsonl": _write_jsonl, "csv": _write_csv}
 
 
 def export_messages(
@@ -77,26 +117,15 @@ def export_messages(
     username=None,
     channel_type="global",
     world=None,
+    fmt="txt",
+    compress=False,
+    chunk_size=5000,
+    query=None,
 ):
-    OUTPUT_DIR.mkdir(exist_ok=True)
-
-    query, params = build_query(
-        start_date=start_date,
-        end_date=end_date,
-        username=username,
-        channel_type=channel_type,
-        world=world,
-    )
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt} (use {', '.join(FORMATS)})")
 
-    if not rows:
-        print("❌ Nenhuma mensagem encontrada com os filtros especificados.")
-        return
+    OUTPUT_DIR.mkdir(exist_ok=True)
 
     # Nome do arquivo
     parts = []
@@ -111,6 +140,10 @@ def export_messages(
     if username:
         parts.append(f"user_{username}")
 
+    # busca
+    if query:
+        parts.append("q_" + "_".join(re.findall(r"\w+", query))[:40])
+
     # datas
     if start_date and end_date:
         parts.append(f"{start_date}_to_{end_date}")
@@ -121,28 +154,61 @@ def export_messages(
     else:
         parts.append(datetime.now().strftime("%Y%m%d_%H%M%S"))
 
-    filename = "chat_" + "_".join(parts) + ".txt"
+    filename = "chat_" + "_".join(parts) + "." + fmt + (".gz" if compress else "")
     output_path = OUTPUT_DIR / filename
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(f"=== Chat Yonexus ===\n")
-        f.write(f"Canal: {channel_type.upper()}" + (f" ({world})" if channel_type == "world" and world else "") + "\n")
-        if username:
-            f.write(f"Usuário: {username}\n")
-        f.write(f"Exportado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total de mensagens: {len(rows)}\n\n")
-
-        for uname, text, created_at, ch_type, w in rows:
-            try:
-                dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-            except Exception:
-                timestamp = created_at
-
-            canal_label = "GLOBAL" if ch_type == "global" else (w or "WORLD")
-            f.write(f"[{timestamp}] [{canal_label}] {uname}: {text}\n")
+    header = [f"Canal: {channel_type.upper()}" + (f" ({world})" if channel_type == "world" and world else "")]
+    if username:
+        header.append(f"Usuário: {username}")
+    if query:
+        header.append(f"Busca: {query}")
+    header.append(f"Exportado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # meses arquivados (data/chat_archive) + tabela viva, lidos em blocos e gravados
+    # direto no arquivo: a memória fica constante, independente do período
+    conn = None
+    if query:
+        # --query: usa o índice FTS5 (chat_search.py), que cobre só a tabela viva
+        conn = sqlite3.connect(DB_PATH)
+        chat_search.ensure_schema(conn.execute)
+        start, end = date_bounds(start_date, end_date)
+        rows = chat_search.iter_search(
+            conn,
+            query,
+            chunk_size=chunk_size,
+            channel_type=channel_type,
+            world=world,
+            username=username,
+            start=start,
+            end=end,
+        )
+    else:
+        rows = iter_messages(
+            start_date=start_date,
+            end_date=end_date,
+            username=username,
+            channel_type=channel_type,
+            world=world,
+            db_path=DB_PATH,
+            chunk_size=chunk_size,
+        )
+
+    try:
+        with _open_output(tmp_path, compress) as f:
+            count = WRITERS[fmt](f, rows, header)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if not count:
+        tmp_path.unlink()
+        print("❌ Nenhuma mensagem encontrada com os filtros especificados.")
+        return None
 
-    print(f"✅ {len(rows)} mensagens exportadas para: {output_path}")
+    tmp_path.replace(output_path)
+    print(f"✅ {count} mensagens exportadas para: {output_path}")
+    return output_path
 
 
 def interactive():
@@ -179,26 +245,52 @@ def interactive():
         channel_type = "world"
         world = input("Nome do mundo (ex: Yonabra): ").strip() or None
 
+    # Formato
+    fmt = (input(f"\nFormato ({'/'.join(FORMATS)}) [txt]: ").strip() or "txt").lower()
+    if fmt not in FORMATS:
+        fmt = "txt"
+    compress = input("Compactar com gzip? [s/N]: ").strip().lower() in ("s", "sim", "y", "yes")
+
     export_messages(
         start_date=start_date,
         end_date=end_date,
         username=username,
         channel_type=channel_type,
         world=world,
+        fmt=fmt,
+        compress=compress,
     )
 
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Exporta mensagens do chat Yonexus.")
+    parser.add_argument("dates", nargs="*", help="data inicial e (opcional) final, YYYY-MM-DD")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="txt")
+    parser.add_argument("--gzip", action="store_true", help="grava o arquivo compactado (.gz)")
+    parser.add_argument("--user", dest="username", default=None)
+    parser.add_argument("--world", default=None, help="exporta o canal do mundo em vez do global")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--query", default=None, help="exporta só as mensagens que batem com a busca (FTS5)")
+    args = parser.parse_args(argv)
+    if len(args.dates) > 2:
+        parser.error("informe no máximo duas datas")
+    return args
+
+
 if __name__ == "__main__":
-    # Se passar datas na linha de comando, assume canal global e não pergunta nada
-    args = sys.argv[1:]
-    if len(args) == 0:
+    # Com argumentos, não pergunta nada (canal global, a menos que venha --world)
+    if len(sys.argv) == 1:
         interactive()
-    elif len(args) == 1:
-        export_messages(start_date=args[0])
-    elif len(args) == 2:
-        export_messages(start_date=args[0], end_date=args[1])
     else:
-        print("Uso rápido:")
-        print("  python export_chat.py")
-        print("  python export_chat.py 2026-01-01")
-        print("  python export_chat.py 2026-01-01 2026-01-17")
+        args = parse_args(sys.argv[1:])
+        export_messages(
+            start_date=args.dates[0] if args.dates else None,
+            end_date=args.dates[1] if len(args.dates) > 1 else None,
+            username=args.username,
+            channel_type="world" if args.world else "global",
+            world=args.world,
+            fmt=args.fmt,
+            compress=args.gzip,
+            chunk_size=args.chunk_size,
+            query=args.query,
+        )
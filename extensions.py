@@ -0,0 +1,44 @@
+"""
+Extensões do Flask, criadas sem app e ligadas em create_app() (app.py).
+
+Importar este módulo não abre conexão nem lê config: os handlers do Socket.IO e
+o user_loader podem ser registrados antes do app existir.
+"""
+
+from flask_login import LoginManager
+from flask_socketio import SocketIO
+
+from compression import Compression
+from jobs import JobQueue
+from profiler import RequestProfiler
+from query_stats import QueryStats
+from telemetry import Telemetry
+
+
+socketio = SocketIO()
+
+
+login_manager = LoginManager()
+login_manager.login_view = "web.index"
+login_manager.login_message = "Faça login para acessar esta página."
+login_manager.login_message_category = "error"
+
+
+# gzip/brotli negociado; static/ servido dos irmãos .br/.gz (python compression.py build)
+compression = Compression()
+
+
+# contagem/tempo de queries por request e evento do Socket.IO (Server-Timing, N+1)
+query_stats = QueryStats()
+
+
+# métricas Prometheus em /internal/metrics (latência, TibiaData, cache, sockets, commits)
+telemetry = Telemetry()
+
+
+# cProfile por request: admins sob demanda (X-Profile: 1) e amostragem do /metrics
+profiler = RequestProfiler()
+
+
+# jobs em segundo plano (tabela job): validação de cadastro e do /config no TibiaData
+job_queue = JobQueue()
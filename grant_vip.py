@@ -1,17 +1,23 @@
 # scripts/grant_vip.py
-from datetime import date, timedelta
-from app import app, db, User
+# Uso: python grant_vip.py <username|email|id> [dias]   (em lote: python manage.py vip --help)
+import sys
+
+from manage import grant_vip, select_user_ids
+from models import create_cli_app, db, User
 
-USERNAME = "gabneitor"
 DAYS_TO_ADD = 30
 
-with app.app_context():
-    u = User.query.filter_by(username=USERNAME).first()
-    if not u:
-        raise RuntimeError(f"Usuário não encontrado: {USERNAME}")
+if len(sys.argv) < 2:
+    sys.exit("Uso: python grant_vip.py <username|email|id> [dias]")
+
+key = sys.argv[1]
+days = int(sys.argv[2]) if len(sys.argv) > 2 else DAYS_TO_ADD
 
-    base = u.vip_until if (u.vip_until and u.vip_until >= date.today()) else date.today()
-    u.vip_until = base + timedelta(days=DAYS_TO_ADD)
-    db.session.commit()
+with create_cli_app().app_context():
+    ids = select_user_ids([key])
+    if not ids:
+        raise RuntimeError(f"Usuário não encontrado: {key}")
 
+    grant_vip(ids, days)
+    u = db.session.get(User, ids[0])
     print(f"VIP de {u.username} agora vai até: {u.vip_until}")
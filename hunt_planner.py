@@ -0,0 +1,159 @@
+"""
+Planejador de hunt: quantos de cada monstro faltam para a meta.
+
+Para uma quantidade de XP (meta diária ou meta de level) e um multiplicador
+(XP boost, stamina, eventos), calcula as kills necessárias para todos os
+monstros do bestiário de uma vez:
+
+    kills = ceil(xp_restante / (exp_base * multiplicador))
+
+O bestiário vira colunas (exp, hp, ...) uma única vez; cada par
+(xp_restante, multiplicador) é calculado sobre a coluna inteira e guardado num
+LRU, então paginar/reordenar a mesma meta não recalcula nada.
+
+Como kills é decrescente em exp, a ordem "menos kills primeiro" é a mesma para
+qualquer meta: ela é calculada uma vez, junto com as colunas.
+"""
+
+import math
+import threading
+from array import array
+from collections import OrderedDict
+
+# Multiplicadores do jogo (sobre a exp base do monstro)
+XP_BOOST = 1.5           # XP boost da loja: +50%
+STAMINA = {
+    "green": 1.5,        # stamina verde (premium, acima de 39h)
+    "normal": 1.0,
+    "orange": 0.5,       # stamina laranja (abaixo de 14h)
+}
+
+SORT_KEYS = ("kills", "name", "hp", "exp", "ratio")
+
+
+def multiplier(boost=False, stamina="normal", extra=1.0) -> float:
+    """Multiplicador total; `extra` cobre eventos (ex.: 2.0 em double XP)."""
+    if stamina not in STAMINA:
+        raise ValueError("stamina inválida")
+    extra = float(extra)
+    if not (0 < extra <= 10):
+        raise ValueError("multiplicador inválido")
+    return round((XP_BOOST if boost else 1.0) * STAMINA[stamina] * extra, 4)
+
+
+class HuntPlanner:
+    def __init__(self, index, cache_size=256):
+        self.index = index
+        self.cache_size = max(1, int(cache_size))
+        self._lock = threading.Lock()
+        self._columns = None
+        self._cache = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- colunas ----------
+    def _build_columns(self):
+        self.index.ensure_loaded()
+        monsters = self.index.monsters
+        exp = array("d", ((m["exp"] or 0) for m in monsters))
+        # índices por exp decrescente (= menos kills primeiro); sem exp vai pro fim
+        by_kills = sorted(range(len(monsters)), key=lambda i: (exp[i] <= 0, -exp[i], monsters[i]["_lower"]))
+        return {"exp": exp, "by_kills": by_kills}
+
+    def columns(self):
+        if self._columns is None:
+            with self._lock:
+                if self._columns is None:
+                    self._columns = self._build_columns()
+        return self._columns
+
+    # ---------- cálculo ----------
+    def kills(self, xp_needed: int, mult: float):
+        """Lista (um item por monstro do índice) de kills para xp_needed; None sem exp."""
+        key = (int(xp_needed), float(mult))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        exp = self.columns()["exp"]
+        need = max(0, key[0])
+        result = [math.ceil(need / (e * key[1])) if e > 0 else None for e in exp]
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def plan(
+        self,
+        daily_needed,
+        level_needed,
+        mult=1.0,
+        category=None,
+        sort="kills",
+        order=None,
+        page=1,
+        per_page=30,
+    ):
+        cols = self.columns()
+        monsters = self.index.monsters
+        daily = self.kills(daily_needed, mult)
+        level = self.kills(level_needed, mult)
+
+        if sort not in SORT_KEYS:
+            sort = "kills"
+        if sort == "kills":
+            ids = list(cols["by_kills"])
+            if order == "desc":
+                with_value = [i for i in ids if cols["exp"][i] > 0]
+                ids = with_value[::-1] + ids[len(with_value):]
+        elif sort == "name":
+            ids = sorted(range(len(monsters)), key=lambda i: monsters[i]["_lower"], reverse=(order == "desc"))
+        else:
+            desc = order != "asc"
+            with_value = [i for i in range(len(monsters)) if monsters[i][sort] is not None]
+            without = [i for i in range(len(monsters)) if monsters[i][sort] is None]
+            with_value.sort(key=lambda i: monsters[i][sort], reverse=desc)
+            ids = with_value + without
+
+        if category:
+            ids = [i for i in ids if monsters[i]["category_key"] == category]
+
+        total = len(ids)
+        per_page = max(1, min(int(per_page), 200))
+        page = max(1, int(page))
+        start = (page - 1) * per_page
+
+        results = []
+        for i in ids[start:start + per_page]:
+            m = monsters[i]
+            results.append({
+                "name": m["name"],
+                "hp": m["hp"],
+                "exp": m["exp"],
+                "ratio": m["ratio"],
+                "category_key": m["category_key"],
+                "category_label": m["category_label"],
+                "sprite": m.get("sprite"),
+                "icon_url": m.get("icon_url"),
+                "exp_effective": round(cols["exp"][i] * mult) if cols["exp"][i] > 0 else None,
+                "kills_daily": daily[i],
+                "kills_level": level[i],
+            })
+
+        return {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page,
+            "results": results,
+        }
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,251 @@
+"""
+Fila de jobs em segundo plano, persistida na tabela `job` (models.Job).
+
+Usada para o que depende do TibiaData e não precisa segurar a resposta: validar o
+personagem de um cadastro novo (/register, /characters/add) e as mudanças do
+/config que dependem do nível atual. A rota grava o job na mesma transação do
+que criou, responde na hora e o cliente fica sabendo do resultado pelo evento
+"job_done" do Socket.IO ou consultando /jobs/<id>.
+
+- JOB_WORKERS threads (green, com eventlet) por processo, iniciadas no primeiro
+  request, pegam jobs da tabela; o UPDATE condicional (status queued → running)
+  garante que dois workers, mesmo de processos diferentes, não peguem o mesmo
+  job. 0 = roda na própria request (sem thread; útil em testes; retries só rodam
+  no próximo wake()).
+- Erro de entrada (JobError) falha na hora; qualquer outro erro (rede, 5xx) volta
+  para a fila com espera exponencial (JOB_RETRY_BASE · 2^tentativa, até
+  JOB_RETRY_MAX segundos), até JOB_MAX_ATTEMPTS tentativas.
+- Jobs "running" de um processo que morreu voltam para a fila depois de
+  JOB_STALE_SECONDS; jobs terminados são apagados após JOB_KEEP_DAYS dias.
+- JOB_QUEUE_MAX limita os jobs pendentes: acima disso enqueue() levanta QueueFull.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, update
+
+from models import Job, db
+
+log = logging.getLogger(__name__)
+
+PENDING = ("queued", "running")
+
+
+class JobError(Exception):
+    """Falha definitiva (entrada inválida): não tenta de novo; a mensagem vai para o usuário."""
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, app=None):
+        self.app = None
+        self._handlers = {}   # kind -> (função, on_failure)
+        self._listeners = []  # on_finish: chamados ao fim de cada tentativa
+        self._cond = threading.Condition()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._last_maintenance = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOB_WORKERS", 2)
+        app.config.setdefault("JOB_MAX_ATTEMPTS", 5)
+        app.config.setdefault("JOB_RETRY_BASE", 2.0)
+        app.config.setdefault("JOB_RETRY_MAX", 300.0)
+        app.config.setdefault("JOB_QUEUE_MAX", 500)
+        app.config.setdefault("JOB_POLL_INTERVAL", 1.0)
+        app.config.setdefault("JOB_STALE_SECONDS", 300)
+        app.config.setdefault("JOB_KEEP_DAYS", 7)
+        self.app = app
+        # threads sobem no primeiro request (depois do fork do gunicorn, com o schema
+        # pronto) e pegam também o que ficou na fila antes de um restart
+        app.before_request(self.start)
+
+    # ---------- registro ----------
+    def handler(self, kind, on_failure=None):
+        """
+        @job_queue.handler("tipo") registra a função que processa o job (recebe o
+        models.Job, devolve um dict serializável ou None). A função não faz commit:
+        o que ela alterou e o status do job são gravados juntos. on_failure(job, erro)
+        roda quando o job falha de vez, na transação que marca o job como failed.
+        """
+        def decorator(fn):
+            self._handlers[kind] = (fn, on_failure)
+            return fn
+        return decorator
+
+    def on_finish(self, fn):
+        """
+        fn(job, segundos) depois do commit de cada tentativa: status "done", "failed"
+        ou "queued" (vai tentar de novo). Para notificação e métricas.
+        """
+        self._listeners.append(fn)
+        return fn
+
+    # ---------- fila ----------
+    def enqueue(self, kind, payload=None, user_id=None, character_id=None) -> Job:
+        """
+        Adiciona o job à sessão, sem commit: entra na mesma transação do que a rota
+        grava. Depois do commit, chame wake().
+        """
+        if self.depth() >= self.app.config["JOB_QUEUE_MAX"]:
+            raise QueueFull()
+        job = Job(kind=kind, payload=json.dumps(payload or {}), user_id=user_id, character_id=character_id)
+        db.session.add(job)
+        return job
+
+    def wake(self):
+        if self.app.config["JOB_WORKERS"] <= 0:
+            while self.run_one():
+                pass
+            return
+        self.start()
+        with self._cond:
+            self._cond.notify()
+
+    def depth(self) -> int:
+        return db.session.execute(
+            select(func.count()).select_from(Job).where(Job.status.in_(PENDING))
+        ).scalar()
+
+    # ---------- execução ----------
+    def _claim(self):
+        now = datetime.utcnow()
+        for _ in range(3):  # outro worker pode pegar o candidato antes
+            job_id = db.session.execute(
+                select(Job.id)
+                .where(Job.status == "queued", Job.run_after <= now)
+                .order_by(Job.run_after, Job.id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                db.session.rollback()
+                return None
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", attempts=Job.attempts + 1, locked_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id, populate_existing=True)
+        return None
+
+    def run_one(self) -> bool:
+        """Processa um job da fila (precisa de app context). False se não havia nenhum."""
+        job = self._claim()
+        if job is None:
+            return False
+
+        fn, on_failure = self._handlers.get(job.kind, (None, None))
+        t0 = time.perf_counter()
+        try:
+            if fn is None:
+                raise JobError(f"Tipo de job desconhecido: {job.kind}")
+            result = fn(job)
+        except JobError as e:
+            db.session.rollback()
+            self._fail(job, on_failure, str(e))
+        except Exception as e:
+            db.session.rollback()
+            cfg = self.app.config
+            if job.attempts >= cfg["JOB_MAX_ATTEMPTS"]:
+                log.warning("job %s (%s) falhou após %d tentativas: %s", job.id, job.kind, job.attempts, e)
+                self._fail(job, on_failure, "Serviço externo indisponível. Tente novamente mais tarde.")
+            else:
+                wait = min(cfg["JOB_RETRY_MAX"], cfg["JOB_RETRY_BASE"] * 2 ** (job.attempts - 1))
+                job.status = "queued"
+                job.error = str(e)[:300]
+                job.run_after = datetime.utcnow() + timedelta(seconds=wait)
+                job.locked_at = None
+                job.updated_at = datetime.utcnow()
+                db.session.commit()
+        else:
+            job.status = "done"
+            job.result = json.dumps(result) if result is not None else None
+            job.error = None
+            job.locked_at = None
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+        self._notify(job, time.perf_counter() - t0)
+        return True
+
+    def _fail(self, job, on_failure, message):
+        job.status = "failed"
+        job.error = message[:300]
+        job.locked_at = None
+        job.updated_at = datetime.utcnow()
+        if on_failure is not None:
+            on_failure(job, message)
+        db.session.commit()
+
+    def _notify(self, job, elapsed):
+        for fn in self._listeners:
+            try:
+                fn(job, elapsed)
+            except Exception:
+                log.exception("listener de job falhou (job %s)", job.id)
+
+    def maintenance(self):
+        """Devolve à fila jobs presos em "running" e apaga os terminados antigos."""
+        cfg = self.app.config
+        now = datetime.utcnow()
+        db.session.execute(
+            update(Job)
+            .where(Job.status == "running", Job.locked_at < now - timedelta(seconds=cfg["JOB_STALE_SECONDS"]))
+            .values(status="queued", locked_at=None, updated_at=now)
+        )
+        db.session.execute(
+            delete(Job).where(
+                Job.status.in_(("done", "failed")),
+                Job.updated_at < now - timedelta(days=cfg["JOB_KEEP_DAYS"]),
+            )
+        )
+        db.session.commit()
+
+    # ---------- threads ----------
+    def _run(self):
+        interval = float(self.app.config["JOB_POLL_INTERVAL"])
+        while not self._stopping:
+            ran = False
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - self._last_maintenance > 60:
+                        self._last_maintenance = time.monotonic()
+                        self.maintenance()
+                    ran = self.run_one()
+            except Exception:
+                log.exception("worker de jobs falhou; tentando de novo em 5s")
+                time.sleep(5)
+                continue
+            if not ran:
+                with self._cond:
+                    if not self._stopping:
+                        self._cond.wait(interval)
+
+    def start(self):
+        if self._threads or self.app.config["JOB_WORKERS"] <= 0:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(int(self.app.config["JOB_WORKERS"])):
+                t = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
@@ -0,0 +1,686 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do Yonexus (HTTP + Socket.IO), com dados sintéticos e TibiaData local.
+
+1) Gerar a base sintética (data/loadtest/app.db e chat.db):
+
+  python loadtest.py seed --users 200 --chars 2 --days 365 --messages 50000
+
+2) Rodar os cenários: sobe um TibiaData falso (HTTP local) e o servidor do app
+   (processo separado, apontando para a base sintética), loga N clientes e mede
+   cada cenário por --duration segundos:
+
+  python loadtest.py run --clients 50 --duration 15 --save data/loadtest/baseline.json
+  python loadtest.py run --scenarios metrics,chat --compare data/loadtest/baseline.json
+
+Cenários: metrics, add_xp, config_get, config_post, xp_table, chat, mixed.
+No chat, a latência é o tempo entre o chat_send e a própria mensagem voltar pelo socket.
+
+O relatório traz p50/p95/p99, média, máximo, erros e throughput por cenário.
+--save grava o resultado em JSON; --compare compara com um JSON anterior e sai
+com código 1 se p95 ou throughput piorarem mais que --tolerance (padrão 20%).
+
+Os cenários de escrita (add_xp, config_post, chat) alteram a base sintética;
+rode `seed --reset` para voltar ao estado inicial antes de um baseline.
+
+3) Coleta de XP pelo highscore (xp_collector.py) contra o mesmo TibiaData falso,
+   que também responde /v4/highscores com a XP dos personagens do seed crescendo
+   com o tempo:
+
+  python loadtest.py collect --rounds 3 --pause 2
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data", "loadtest")
+APP_DB = os.path.join(DATA_DIR, "app.db")
+CHAT_DB = os.path.join(DATA_DIR, "chat.db")
+MANIFEST = os.path.join(DATA_DIR, "manifest.json")
+
+PASSWORD = "loadtest"
+WORLDS = ["Antica", "Yonabra", "Belobra", "Bona", "Celesta", "Ferobra", "Honbra", "Lobera"]
+VOCATIONS = ["Knight", "Paladin", "Sorcerer", "Druid"]
+SCENARIOS = ("metrics", "add_xp", "config_get", "config_post", "xp_table", "chat", "mixed")
+
+
+def username(i: int) -> str:
+    return f"lt_user{i}"
+
+
+def char_name(user_i: int, char_j: int) -> str:
+    return f"Lt Char {user_i} {char_j}"
+
+
+# determinísticos: o seed e o TibiaData falso concordam sem trocar estado
+def world_for(name: str) -> str:
+    return WORLDS[sum(map(ord, name)) % len(WORLDS)]
+
+
+def level_for(name: str) -> int:
+    return 50 + sum(ord(ch) * (k + 1) for k, ch in enumerate(name)) % 550
+
+
+# =========================
+# Seed
+# =========================
+def seed(users, chars, days, messages, reset=False, rng_seed=42):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if reset:
+        for path in (APP_DB, CHAT_DB):
+            if os.path.exists(path):
+                os.remove(path)
+    os.environ["DATABASE_URL"] = "sqlite:///" + APP_DB
+    os.environ["CHAT_DATABASE_URL"] = "sqlite:///" + CHAT_DB
+
+    from sqlalchemy import func, insert, select
+    from werkzeug.security import generate_password_hash
+
+    from chat_writer import CHAT_ID_EPOCH_MS
+    from models import ChatMessage, Character, User, XpLog, create_cli_app, db, init_schema
+
+    rng = random.Random(rng_seed)
+    password_hash = generate_password_hash(PASSWORD)  # um hash só: o custo é do scrypt
+    today = date.today()
+    t0 = time.perf_counter()
+
+    app = create_cli_app()
+    with app.app_context():
+        init_schema()
+        if db.session.execute(select(func.count()).select_from(User)).scalar():
+            sys.exit("❌ Base de carga já tem dados: use --reset para recriar.")
+
+        user_rows, char_rows, log_rows = [], [], []
+        char_id = 0
+        for i in range(1, users + 1):
+            user_rows.append({
+                "id": i,
+                "username": username(i),
+                "email": f"{username(i)}@loadtest.local",
+                "password_hash": password_hash,
+                "vip_until": today + timedelta(days=30) if i % 5 == 0 else None,
+                "active_character_id": char_id + 1,
+            })
+            for j in range(1, chars + 1):
+                char_id += 1
+                level = level_for(char_name(i, j))
+                start_xp = (50 * level ** 3 - 150 * level ** 2 + 400 * level) // 3
+                char_rows.append({
+                    "id": char_id,
+                    "user_id": i,
+                    "char_name": char_name(i, j),
+                    "xp_start": start_xp,
+                    "xp_goal": start_xp * 2,
+                    "daily_goal": rng.choice([500_000, 1_000_000, 3_000_000]),
+                    "goal_level": level + 50,
+                })
+                for d in range(days):
+                    if rng.random() < 0.8:  # nem todo dia tem hunt
+                        xp = rng.randint(-200_000, 4_000_000)
+                        log_rows.append({
+                            "character_id": char_id,
+                            "date": (today - timedelta(days=days - d)).isoformat(),
+                            "xp": xp,
+                        })
+
+        for table, rows in ((User, user_rows), (Character, char_rows), (XpLog, log_rows)):
+            for k in range(0, len(rows), 5000):
+                db.session.execute(insert(table), rows[k:k + 5000])
+            db.session.commit()
+
+        # chat: ids no mesmo formato do write-behind, espalhados pelos últimos `days` dias
+        now_ms = int(time.time() * 1000)
+        span_ms = max(1, days) * 86_400_000
+        stamps = sorted(rng.sample(range(now_ms - span_ms, now_ms - 60_000), messages)) if messages else []
+        chat_rows = []
+        for ms in stamps:
+            u = rng.randint(1, users)
+            global_msg = rng.random() < 0.6
+            world = world_for(char_name(u, 1))
+            chat_rows.append({
+                "id": (ms - CHAT_ID_EPOCH_MS) << 10,
+                "username": username(u),
+                "channel_type": "global" if global_msg else "world",
+                "world": None if global_msg else world,
+                "text": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 14))),
+                "created_at": datetime.utcfromtimestamp(ms / 1000),
+            })
+        for k in range(0, len(chat_rows), 5000):
+            db.session.execute(insert(ChatMessage), chat_rows[k:k + 5000])
+        db.session.commit()
+
+    manifest = {
+        "users": users,
+        "chars": chars,
+        "days": days,
+        "messages": messages,
+        "xp_logs": len(log_rows),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+    }
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ {users} usuários, {len(char_rows)} personagens, {len(log_rows)} logs de XP, "
+          f"{messages} mensagens em {time.perf_counter() - t0:.1f}s → {DATA_DIR}")
+
+
+_WORDS = (
+    "hunt dragon lord demon loot exp boost stamina team party quest rashid bless "
+    "roshamuul issavi soul war gnome ferumbras yasir respawn level up death ue sd "
+    "gfb hmm kkk alguém vamos bora hoje amanhã servidor boss drop raro"
+).split()
+
+
+# =========================
+# TibiaData falso
+# =========================
+def experience_for(name: str, elapsed: float) -> int:
+    """XP do personagem no highscore falso: parte do level e cresce com o tempo."""
+    level = level_for(name)
+    base = (50 * level ** 3 - 150 * level ** 2 + 400 * level) // 3
+    return base + int(elapsed * (1000 + sum(map(ord, name)) % 4000))
+
+
+class _TibiaDataHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    started = 0.0
+    names_by_world = {}  # mundo → nomes do seed (para o highscore)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.startswith("/v4/character/"):
+            name = unquote(self.path[len("/v4/character/"):])
+            payload = {"character": {"character": {
+                "name": name,
+                "vocation": VOCATIONS[len(name) % len(VOCATIONS)],
+                "level": level_for(name),
+                "world": world_for(name),
+            }}}
+        elif self.path.startswith("/v4/highscores/"):
+            # /v4/highscores/<mundo>/experience/all/<página>
+            parts = self.path[len("/v4/highscores/"):].split("/")
+            if len(parts) != 4 or parts[1] != "experience" or not parts[3].isdigit():
+                self.send_error(404)
+                return
+            payload = self._highscores(unquote(parts[0]), int(parts[3]))
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _highscores(self, world, page):
+        elapsed = time.time() - self.started
+        ranked = sorted(((experience_for(n, elapsed), n) for n in self.names_by_world.get(world, ())),
+                        reverse=True)[:1000]  # o highscore real só vai até o top 1000
+        total_pages = max(1, -(-len(ranked) // 50))
+        rows = [
+            {"rank": k + 1, "name": n, "vocation": VOCATIONS[len(n) % len(VOCATIONS)],
+             "world": world, "level": level_for(n), "value": xp}
+            for k, (xp, n) in enumerate(ranked)
+        ][(page - 1) * 50:page * 50]
+        return {"highscores": {
+            "world": world,
+            "category": "experience",
+            "vocation": "all",
+            "highscore_list": rows,
+            "highscore_page": {"current_page": page, "total_pages": total_pages,
+                               "total_records": len(ranked)},
+        }}
+
+    def log_message(self, *args):
+        pass
+
+
+def start_tibiadata(port, latency_ms, manifest=None):
+    names_by_world = {}
+    for i in range(1, (manifest or {}).get("users", 0) + 1):
+        for j in range(1, manifest.get("chars", 1) + 1):
+            names_by_world.setdefault(world_for(char_name(i, j)), []).append(char_name(i, j))
+    # relógio da XP preso à criação da base: reiniciar o servidor falso não "tira" XP
+    created = (manifest or {}).get("created_at")
+    started = time.time()
+    if created:
+        started = datetime.fromisoformat(created.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    handler = type("Handler", (_TibiaDataHandler,), {
+        "latency": latency_ms / 1000.0,
+        "started": started,
+        "names_by_world": names_by_world,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =========================
+# Servidor do app
+# =========================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port, tibiadata_url, extra_env=None):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": "sqlite:///" + APP_DB,
+        "CHAT_DATABASE_URL": "sqlite:///" + CHAT_DB,
+        "TIBIADATA_URL": tibiadata_url,
+        "SECRET_KEY": "loadtest",
+        # o teste mede o servidor, não o anti-flood
+        "CHAT_RATE_USER": "10000",
+        "CHAT_BURST_USER": "10000",
+        "CHAT_RATE_CONN": "10000",
+        "CHAT_BURST_CONN": "10000",
+    })
+    env.update(extra_env or {})
+    code = (
+        "import wsgi as m; "
+        f"m.socketio.run(m.app, host='127.0.0.1', port={port}, log_output=False)"
+    )
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit("❌ Servidor do app não subiu:\n" + proc.stderr.read().decode(errors="replace")[-2000:])
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    sys.exit("❌ Timeout esperando o servidor do app")
+
+
+# =========================
+# Clientes e cenários
+# =========================
+class Client:
+    MAX_RECONNECTS = 3  # depois disso o cliente sai do chat (não mede um socket que não sobe)
+
+    def __init__(self, base_url, user_i):
+        import requests
+
+        self.base_url = base_url
+        self.user_i = user_i
+        self.http = requests.Session()
+        self.sio = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.reconnects = 0
+        self.chat_dropped = False
+
+    def login(self):
+        r = self.http.post(f"{self.base_url}/login",
+                           data={"username": username(self.user_i), "password": PASSWORD},
+                           allow_redirects=False, timeout=30)
+        if r.status_code != 302 or "session" not in self.http.cookies:
+            raise RuntimeError(f"login falhou para {username(self.user_i)}")
+
+    # ---------- HTTP ----------
+    def get(self, path):
+        return self.http.get(self.base_url + path, timeout=30)
+
+    def post(self, path, payload):
+        return self.http.post(self.base_url + path, json=payload, timeout=30)
+
+    # ---------- Socket.IO ----------
+    def connect_socket(self):
+        import socketio
+
+        self.sio = socketio.Client(http_session=self.http, reconnection=False)
+        self.sio.on("chat_message", self._on_message)
+        self.sio.on("chat_batch", lambda batch: [self._on_message(m) for m in batch])
+        # websocket-client é opcional: sem ele, só polling (e sem o aviso a cada conexão)
+        transports = ["polling", "websocket"] if importlib.util.find_spec("websocket") else ["polling"]
+        self.sio.connect(self.base_url, transports=transports, wait_timeout=10)
+
+    def ensure_socket(self):
+        """Reconecta o socket que caiu; depois de MAX_RECONNECTS o cliente sai do chat."""
+        if self.sio is not None and self.sio.connected:
+            return
+        if self.reconnects >= self.MAX_RECONNECTS:
+            self.chat_dropped = True
+            raise ConnectionError(f"socket caiu {self.reconnects + 1} vezes; cliente fora do chat")
+        self.reconnects += 1
+        self.close()
+        self.connect_socket()
+
+    def _on_message(self, msg):
+        with self._pending_lock:
+            done = self._pending.pop(msg.get("text"), None)
+        if done is not None:
+            done.set()
+
+    def chat_roundtrip(self, timeout=10):
+        self.ensure_socket()
+        text = f"lt {self.user_i} {time.perf_counter_ns()}"
+        done = threading.Event()
+        with self._pending_lock:
+            self._pending[text] = done
+        self.sio.emit("chat_send", {"text": text, "channel": "global"})
+        if not done.wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(text, None)
+            raise TimeoutError("mensagem não voltou")
+
+    def close(self):
+        if self.sio is not None:
+            try:
+                self.sio.disconnect()
+            except Exception:
+                pass
+
+
+def _http_ok(r):
+    if r.status_code >= 400:
+        raise RuntimeError(f"HTTP {r.status_code} {r.text[:120]}")
+
+
+def _config_post(c):
+    cfg = c.get("/config").json()
+    _http_ok(c.post("/config", {"char_name": cfg["char_name"], "daily_goal": cfg["daily_goal"]}))
+
+
+ACTIONS = {
+    "metrics": lambda c: _http_ok(c.get("/metrics")),
+    "add_xp": lambda c: _http_ok(c.post("/add_xp", {"xp": random.randint(1, 50_000)})),
+    "config_get": lambda c: _http_ok(c.get("/config")),
+    "config_post": _config_post,
+    "xp_table": lambda c: _http_ok(c.get("/xp-table")),
+    "chat": lambda c: c.chat_roundtrip(),
+}
+MIXED_WEIGHTS = {"metrics": 40, "add_xp": 20, "config_get": 15, "xp_table": 5, "chat": 20}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def run_scenario(name, clients, duration, warmup):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = time.time()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    weights = list(MIXED_WEIGHTS.items())
+
+    reconnects_before = sum(c.reconnects for c in clients)
+
+    def worker(client):
+        rng = random.Random(client.user_i)
+        backoff = 0.0
+        while True:
+            now = time.time()
+            if now >= deadline:
+                return
+            action = name
+            if name == "mixed":
+                action = rng.choices([k for k, _ in weights], [w for _, w in weights])[0]
+            if action == "chat" and client.chat_dropped:
+                if name == "chat":
+                    return  # cliente fora do chat: não conta erro a cada volta
+                continue
+            t = time.perf_counter()
+            try:
+                ACTIONS[action](client)
+                err = None
+            except Exception as e:
+                err = f"{action}: {type(e).__name__}: {e}"
+            elapsed = (time.perf_counter() - t) * 1000
+            if now >= measure_from:
+                with lock:
+                    if err:
+                        errors.append(err)
+                    else:
+                        latencies.append(elapsed)
+            if err:
+                # espera crescente depois de erro: um cliente quebrado não gira em falso
+                backoff = min(2.0, backoff * 2 or 0.05)
+                time.sleep(max(0.0, min(backoff, deadline - time.time())))
+            else:
+                backoff = 0.0
+
+    threads = [threading.Thread(target=worker, args=(c,), daemon=True) for c in clients]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "reconnects": sum(c.reconnects for c in clients) - reconnects_before,
+        "dropped_clients": sum(c.chat_dropped for c in clients),
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "p50_ms": _round(percentile(latencies, 50)),
+        "p95_ms": _round(percentile(latencies, 95)),
+        "p99_ms": _round(percentile(latencies, 99)),
+        "mean_ms": _round(statistics.fmean(latencies) if latencies else None),
+        "max_ms": _round(latencies[-1] if latencies else None),
+    }
+
+
+def _round(v):
+    return None if v is None else round(v, 2)
+
+
+# =========================
+# Relatório / baseline
+# =========================
+def print_report(results):
+    print(f"\n{'cenário':<12} {'req':>7} {'erros':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    for name, r in results.items():
+        def ms(v):
+            return "-" if v is None else f"{v:.1f}ms"
+        print(f"{name:<12} {r['requests']:>7} {r['errors']:>6} {r['throughput_rps']:>8} "
+              f"{ms(r['p50_ms']):>9} {ms(r['p95_ms']):>9} {ms(r['p99_ms']):>9} {ms(r['max_ms']):>9}")
+        if r.get("reconnects") or r.get("dropped_clients"):
+            print(f"    🔌 {r['reconnects']} reconexões, {r['dropped_clients']} clientes fora do chat")
+        for sample in r["error_samples"]:
+            print(f"    ⚠️ {sample}")
+
+
+def compare(results, baseline, tolerance):
+    """Imprime a variação contra o baseline; retorna a lista de regressões."""
+    regressions = []
+    print(f"\nComparação com baseline ({baseline['meta'].get('created_at', '?')}), tolerância {tolerance:.0%}:")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"  {name:<12} (sem baseline)")
+            continue
+        parts = []
+        for key, worse_if_higher in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            old, new = base.get(key), r.get(key)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old
+            parts.append(f"{key} {old}→{new} ({delta:+.0%})")
+            if key in ("p95_ms", "throughput_rps"):
+                if (delta > tolerance) if worse_if_higher else (delta < -tolerance):
+                    regressions.append(f"{name}.{key}")
+        print(f"  {name:<12} " + ", ".join(parts))
+    return regressions
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    if not os.path.exists(APP_DB):
+        sys.exit("❌ Base de carga não encontrada: rode `python loadtest.py seed` antes.")
+    with open(MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        sys.exit(f"❌ Cenário(s) desconhecido(s): {', '.join(unknown)}")
+
+    mock_port = free_port()
+    tibiadata = start_tibiadata(mock_port, args.tibiadata_latency_ms, manifest)
+    proc = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        port = free_port()
+        proc = start_app(port, f"http://127.0.0.1:{mock_port}")
+        base_url = f"http://127.0.0.1:{port}"
+
+    clients = []
+    try:
+        print(f"Logando {args.clients} clientes em {base_url}...")
+        for k in range(args.clients):
+            c = Client(base_url, (k % manifest["users"]) + 1)
+            c.login()
+            clients.append(c)
+        if any(s in ("chat", "mixed") for s in scenarios):
+            for c in clients:
+                c.connect_socket()
+
+        results = {}
+        for name in scenarios:
+            print(f"→ {name} ({args.duration}s, {args.clients} clientes)")
+            results[name] = run_scenario(name, clients, args.duration, args.warmup)
+    finally:
+        for c in clients:
+            c.close()
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        tibiadata.shutdown()
+
+    print_report(results)
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "git": _git_rev(),
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "tibiadata_latency_ms": args.tibiadata_latency_ms,
+            "dataset": manifest,
+        },
+        "results": results,
+    }
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressão: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Dentro da tolerância do baseline")
+
+
+# =========================
+# Coleta de XP (xp_collector.py) contra o TibiaData falso
+# =========================
+def collect_xp(args):
+    if not os.path.exists(APP_DB):
+        sys.exit("❌ Base de carga não encontrada: rode `python loadtest.py seed` antes.")
+    with open(MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    os.environ["DATABASE_URL"] = "sqlite:///" + APP_DB
+    os.environ["CHAT_DATABASE_URL"] = "sqlite:///" + CHAT_DB
+
+    from models import create_cli_app, init_schema
+    from xp_collector import TibiaDataClient, collect, print_stats
+
+    mock_port = free_port()
+    tibiadata = start_tibiadata(mock_port, args.tibiadata_latency_ms, manifest)
+    app = create_cli_app()
+    try:
+        with app.app_context():
+            init_schema()  # XpSnapshot em bases geradas antes do coletor
+            for k in range(args.rounds):
+                if k:
+                    time.sleep(args.pause)
+                client = TibiaDataClient(f"http://127.0.0.1:{mock_port}", pool_size=args.concurrency)
+                print(f"→ coleta {k + 1}/{args.rounds}")
+                # todos os personagens da base, com ou sem coleta ligada: mede as chamadas
+                print_stats(collect(client, args.concurrency, args.max_pages, opted_in_only=False))
+    finally:
+        tibiadata.shutdown()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Teste de carga do Yonexus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="gera a base sintética em data/loadtest/")
+    p_seed.add_argument("--users", type=int, default=200)
+    p_seed.add_argument("--chars", type=int, default=1, help="personagens por usuário")
+    p_seed.add_argument("--days", type=int, default=365, help="dias de XpLog por personagem")
+    p_seed.add_argument("--messages", type=int, default=20000, help="mensagens de chat")
+    p_seed.add_argument("--seed", type=int, default=42)
+    p_seed.add_argument("--reset", action="store_true", help="apaga a base de carga antes")
+
+    p_run = sub.add_parser("run", help="roda os cenários contra o app")
+    p_run.add_argument("--scenarios", default="metrics,add_xp,config_get,xp_table,chat")
+    p_run.add_argument("--clients", type=int, default=20)
+    p_run.add_argument("--duration", type=float, default=10.0, help="segundos medidos por cenário")
+    p_run.add_argument("--warmup", type=float, default=2.0, help="segundos iniciais descartados")
+    p_run.add_argument("--tibiadata-latency-ms", type=float, default=50.0)
+    p_run.add_argument("--url", help="usar um servidor já rodando (com TIBIADATA_URL e a base de carga)")
+    p_run.add_argument("--save", help="grava o resultado (JSON) para virar baseline")
+    p_run.add_argument("--compare", help="JSON de baseline para comparar")
+    p_run.add_argument("--tolerance", type=float, default=0.2)
+
+    p_collect = sub.add_parser("collect", help="roda o xp_collector contra o TibiaData falso")
+    p_collect.add_argument("--rounds", type=int, default=2, help="coletas (a 1ª só grava o snapshot)")
+    p_collect.add_argument("--pause", type=float, default=2.0, help="segundos entre coletas")
+    p_collect.add_argument("--concurrency", type=int, default=4)
+    p_collect.add_argument("--max-pages", type=int, default=20)
+    p_collect.add_argument("--tibiadata-latency-ms", type=float, default=50.0)
+
+    args = parser.parse_args(argv)
+    if args.command == "seed":
+        seed(args.users, args.chars, args.days, args.messages, reset=args.reset, rng_seed=args.seed)
+    elif args.command == "collect":
+        collect_xp(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
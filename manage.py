@@ -1,6 +1,37 @@
+"""
+Administração do Yonexus.
+
+  python manage.py                       → modo interativo (menu)
+  python manage.py init-db               → cria tabelas / índice do chat
+  python manage.py vip --days 30 --file usuarios.txt
+  python manage.py vip --days 7 --expired-within 15 [--dry-run]
+  python manage.py recompute-goals       → recalcula xp_goal após atualizar a tabela de XP
+  python manage.py users --vip active --search gab --page 2
+  python manage.py purge --inactive-days 180 [--include-never-active] [--dry-run]
+  python manage.py purge --file contas.txt --chunk 200 --pause 0.05
+
+As operações em lote rodam como UPDATE/SELECT em conjunto, em transações de
+--chunk linhas, sem carregar objetos do ORM um a um. O purge apaga só a linha do
+usuário; personagens e histórico saem pelo ON DELETE CASCADE do banco.
+"""
+
+import argparse
 import cmd
+import json
+import os
 import shlex
-from app import app, db, User, Character, XpLog
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import case, delete, func, or_, select, update
+
+from models import cascade_ready, create_cli_app, db, delete_users, init_schema, User, Character, XpLog
+
+XP_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "experience_table_tibia.json")
+CHUNK = 500
+PURGE_CHUNK = 200
+VIP_STATES = ("active", "expired", "free")
 
 
 def norm(s: str) -> str:
@@ -32,6 +63,193 @@ def ask_int(prompt: str, default=None):
             print("Valor inválido, precisa ser número inteiro.")
 
 
+def chunks(seq, size=CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def read_keys(path: str):
+    """id/username/email, um por linha ('-' = stdin); ignora vazias e # comentários."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# ---------- operações em lote ----------
+def _user_filters(q, search=None, vip=None, expired_within=None):
+    today = date.today()
+    if search:
+        like = f"%{norm(search)}%"
+        q = q.where(or_(User.username.like(like), User.email.like(like)))
+    if vip == "active":
+        q = q.where(User.vip_until >= today)
+    elif vip == "expired":
+        q = q.where(User.vip_until < today)
+    elif vip == "free":
+        q = q.where(User.vip_until.is_(None))
+    if expired_within is not None:
+        q = q.where(User.vip_until < today, User.vip_until >= today - timedelta(days=expired_within))
+    return q
+
+
+def select_user_ids(keys=None, chunk=CHUNK, **filters):
+    """Ids dos usuários pelos identificadores (id/username/email) e/ou filtros."""
+    if keys is None:
+        return list(db.session.execute(_user_filters(select(User.id), **filters).order_by(User.id)).scalars())
+
+    ids = set()
+    for part in chunks(keys, chunk):
+        numeric = [int(k) for k in part if k.isdigit()]
+        lowered = [norm(k) for k in part]
+        q = select(User.id).where(or_(
+            User.id.in_(numeric),
+            User.username.in_(lowered),
+            User.email.in_(lowered),
+        ))
+        ids.update(db.session.execute(_user_filters(q, **filters)).scalars())
+    return sorted(ids)
+
+
+def grant_vip(user_ids, days: int, chunk=CHUNK) -> int:
+    """
+    Concede/estende VIP: quem ainda é VIP ganha `days` a partir do vencimento atual,
+    quem não é (ou já venceu), a partir de hoje. Um UPDATE por bloco de ids.
+    """
+    today = date.today()
+    base = case((User.vip_until >= today, User.vip_until), else_=today)
+    changed = 0
+    for part in chunks(user_ids, chunk):
+        stmt = (
+            update(User)
+            .where(User.id.in_(part))
+            .values(vip_until=func.date(base, f"+{int(days)} days"))
+            .execution_options(synchronize_session=False)
+        )
+        changed += db.session.execute(stmt).rowcount
+        db.session.commit()
+    return changed
+
+
+def inactive_user_ids(days: int, include_never_active=False):
+    """
+    Usuários sem XP registrado nos últimos `days` dias, VIPs ativos fora.
+    Quem nunca registrou XP só entra com include_never_active.
+    """
+    today = date.today()
+    last = (
+        select(Character.user_id, func.max(XpLog.date).label("last_date"))
+        .join(XpLog, XpLog.character_id == Character.id)
+        .group_by(Character.user_id)
+        .subquery()
+    )
+    cutoff = today - timedelta(days=days)
+    stale = last.c.last_date < cutoff
+    if include_never_active:
+        stale = or_(stale, last.c.last_date.is_(None))
+    q = (
+        select(User.id)
+        .outerjoin(last, last.c.user_id == User.id)
+        .where(stale, or_(User.vip_until.is_(None), User.vip_until < today))
+        .order_by(User.id)
+    )
+    return list(db.session.execute(q).scalars())
+
+
+def purge_users(user_ids, chunk=PURGE_CHUNK, pause=0.05) -> int:
+    """
+    Apaga usuários em blocos: um DELETE por bloco, commit e pausa entre blocos
+    para o lock de escrita do SQLite não segurar o app por muito tempo.
+    """
+    removed = 0
+    for i, part in enumerate(chunks(user_ids, chunk)):
+        if i and pause:
+            time.sleep(pause)
+        removed += db.session.execute(
+            delete(User).where(User.id.in_(part)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+    return removed
+
+
+def load_xp_goals():
+    with open(XP_TABLE_FILE, "r", encoding="utf-8") as f:
+        return {int(r["level"]): int(r["experience"]) for r in json.load(f)["experience_table"]}
+
+
+def recompute_goals(chunk=1000):
+    """
+    xp_goal = XP do goal_level na tabela atual, para todos os personagens com meta.
+    Um UPDATE ... CASE por faixa de ids; só toca linhas cujo valor mudou.
+    Retorna (atualizados, sem_nível_na_tabela).
+    """
+    table = load_xp_goals()
+    levels = db.session.execute(
+        select(Character.goal_level).where(Character.goal_level.is_not(None)).distinct()
+    ).scalars().all()
+    mapping = {lvl: table[lvl] for lvl in levels if lvl in table}
+    missing = db.session.execute(
+        select(func.count()).select_from(Character).where(
+            Character.goal_level.is_not(None),
+            Character.goal_level.not_in(list(mapping) or [-1]),
+        )
+    ).scalar()
+    if not mapping:
+        return 0, missing
+
+    goal = case(mapping, value=Character.goal_level)
+    lo, hi = db.session.execute(select(func.min(Character.id), func.max(Character.id))).one()
+    changed = 0
+    for start in range(lo, hi + 1, chunk):
+        stmt = (
+            update(Character)
+            .where(
+                Character.id >= start,
+                Character.id < start + chunk,
+                Character.goal_level.in_(list(mapping)),
+                Character.xp_goal != goal,
+            )
+            .values(xp_goal=goal)
+            .execution_options(synchronize_session=False)
+        )
+        changed += db.session.execute(stmt).rowcount
+        db.session.commit()
+    return changed, missing
+
+
+def list_users(page=1, per_page=50, **filters):
+    """(total, linhas) com id, username, email, vip_until e nº de personagens."""
+    chars = (
+        select(Character.user_id, func.count().label("n"))
+        .group_by(Character.user_id)
+        .subquery()
+    )
+    q = _user_filters(
+        select(User.id, User.username, User.email, User.vip_until, func.coalesce(chars.c.n, 0).label("chars"))
+        .outerjoin(chars, chars.c.user_id == User.id),
+        **filters,
+    )
+    total = db.session.execute(select(func.count()).select_from(q.subquery())).scalar()
+    per_page = max(1, int(per_page))
+    rows = db.session.execute(
+        q.order_by(User.id.asc()).limit(per_page).offset((max(1, int(page)) - 1) * per_page)
+    ).all()
+    return total, rows
+
+
+def print_users(total, rows, page, per_page):
+    if not rows:
+        print("Nenhum usuário encontrado.")
+        return
+    for r in rows:
+        vip = r.vip_until.isoformat() if r.vip_until else "free"
+        print(f"- id={r.id} username={r.username} email={r.email} vip={vip} chars={r.chars}")
+    pages = (total + per_page - 1) // per_page
+    print(f"Página {page}/{pages} — {total} usuário(s)")
+
+
 class YonexusCLI(cmd.Cmd):
     intro = "Yonexus CLI (digite 'menu')."
     prompt = "(yonexus) "
@@ -145,14 +363,17 @@ class YonexusCLI(cmd.Cmd):
 
     # ---------- commands ----------
     def do_list_users(self, arg):
+        """list_users [por_página] [página] [busca]"""
         args = shlex.split(arg)
-        limit = int(args[0]) if args else 50
-        users = User.query.order_by(User.id.asc()).limit(limit).all()
-        if not users:
-            print("Nenhum usuário encontrado.")
+        try:
+            per_page = int(args[0]) if args else 50
+            page = int(args[1]) if len(args) > 1 else 1
+        except ValueError:
+            print("Uso: list_users [por_página] [página] [busca]")
             return
-        for u in users:
-            self._print_user(u)
+        search = args[2] if len(args) > 2 else None
+        total, rows = list_users(page, per_page, search=search)
+        print_users(total, rows, page, per_page)
 
     def do_list_logs(self, arg):
         u = self._user()
@@ -298,16 +519,133 @@ class YonexusCLI(cmd.Cmd):
             print("Cancelado.")
             return
 
-        db.session.delete(u)
+        # sem ON DELETE CASCADE (init-db não rodou) os filhos saem antes, sem deixar órfão
+        delete_users([u.id])
         db.session.commit()
         print("Usuário removido.")
         self.user_id = None
 
 
-def main():
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Administração do Yonexus (sem argumentos: modo interativo).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("init-db", help="cria tabelas e índice de busca do chat")
+
+    vip = sub.add_parser("vip", help="concede/estende VIP em lote")
+    vip.add_argument("--days", type=int, required=True)
+    who = vip.add_mutually_exclusive_group(required=True)
+    who.add_argument("--users", help="ids/usernames/emails separados por vírgula")
+    who.add_argument("--file", help="arquivo com um id/username/email por linha ('-' = stdin)")
+    who.add_argument("--expired-within", type=int, metavar="DIAS", help="VIP vencido nos últimos N dias")
+    who.add_argument("--active", action="store_true", help="todos os VIPs ativos")
+    who.add_argument("--all", action="store_true", help="todos os usuários")
+    vip.add_argument("--chunk", type=int, default=CHUNK)
+    vip.add_argument("--dry-run", action="store_true", help="só mostra quem seria afetado")
+
+    goals = sub.add_parser("recompute-goals", help="recalcula xp_goal pela tabela de XP atual")
+    goals.add_argument("--chunk", type=int, default=1000)
+
+    users = sub.add_parser("users", help="lista usuários com filtros e paginação")
+    users.add_argument("--page", type=int, default=1)
+    users.add_argument("--per-page", type=int, default=50)
+    users.add_argument("--search")
+    users.add_argument("--vip", choices=VIP_STATES)
+    users.add_argument("--expired-within", type=int, metavar="DIAS")
+
+    purge = sub.add_parser("purge", help="apaga contas em lote (personagens e XP junto)")
+    who = purge.add_mutually_exclusive_group(required=True)
+    who.add_argument("--users", help="ids/usernames/emails separados por vírgula")
+    who.add_argument("--file", help="arquivo com um id/username/email por linha ('-' = stdin)")
+    who.add_argument("--inactive-days", type=int, metavar="DIAS",
+                     help="sem XP registrado há N dias (VIPs ativos ficam de fora)")
+    purge.add_argument("--include-never-active", action="store_true",
+                       help="com --inactive-days, inclui quem nunca registrou XP")
+    purge.add_argument("--chunk", type=int, default=PURGE_CHUNK, help="usuários por DELETE/commit")
+    purge.add_argument("--pause", type=float, default=0.05, help="segundos de pausa entre blocos")
+    purge.add_argument("--dry-run", action="store_true", help="só mostra quem seria apagado")
+    purge.add_argument("--yes", action="store_true", help="não pede confirmação")
+
+    return parser.parse_args(argv)
+
+
+def run_command(args):
+    if args.command == "init-db":
+        init_schema()
+        print("✅ Schema criado/atualizado.")
+
+    elif args.command == "vip":
+        if args.days <= 0:
+            sys.exit("--days precisa ser positivo.")
+        if args.users or args.file:
+            keys = read_keys(args.file) if args.file else [k.strip() for k in args.users.split(",") if k.strip()]
+            ids = select_user_ids(keys, chunk=args.chunk)
+            if len(ids) < len(keys):
+                print(f"⚠️ {len(keys) - len(ids)} identificador(es) sem usuário correspondente")
+        else:
+            ids = select_user_ids(
+                vip="active" if args.active else None,
+                expired_within=args.expired_within,
+            )
+        if args.dry_run:
+            sample = db.session.execute(select(User.username).where(User.id.in_(ids[:20]))).scalars().all()
+            more = f" (+{len(ids) - len(sample)})" if len(ids) > len(sample) else ""
+            print(f"{len(ids)} usuário(s) seriam afetados (+{args.days} dias): {', '.join(sample)}{more}")
+            print("Nada alterado (--dry-run).")
+            return
+        print(f"✅ VIP +{args.days} dias para {grant_vip(ids, args.days, chunk=args.chunk)} usuário(s)")
+
+    elif args.command == "recompute-goals":
+        changed, missing = recompute_goals(chunk=args.chunk)
+        print(f"✅ xp_goal atualizado em {changed} personagem(ns)")
+        if missing:
+            print(f"⚠️ {missing} personagem(ns) com goal_level fora da tabela (não alterados)")
+
+    elif args.command == "users":
+        total, rows = list_users(
+            args.page,
+            args.per_page,
+            search=args.search,
+            vip=args.vip,
+            expired_within=args.expired_within,
+        )
+        print_users(total, rows, args.page, args.per_page)
+
+    elif args.command == "purge":
+        if not cascade_ready():
+            sys.exit("FKs sem ON DELETE CASCADE: rode `python manage.py init-db` antes do purge.")
+        if args.inactive_days is not None:
+            if args.inactive_days <= 0:
+                sys.exit("--inactive-days precisa ser positivo.")
+            ids = inactive_user_ids(args.inactive_days, include_never_active=args.include_never_active)
+        else:
+            keys = read_keys(args.file) if args.file else [k.strip() for k in args.users.split(",") if k.strip()]
+            ids = select_user_ids(keys)
+            if len(ids) < len(keys):
+                print(f"⚠️ {len(keys) - len(ids)} identificador(es) sem usuário correspondente")
+        sample = db.session.execute(select(User.username).where(User.id.in_(ids[:20]))).scalars().all()
+        more = f" (+{len(ids) - len(sample)})" if len(ids) > len(sample) else ""
+        print(f"{len(ids)} usuário(s) seriam apagados: {', '.join(sample)}{more}")
+        if args.dry_run:
+            print("Nada alterado (--dry-run).")
+            return
+        if not ids:
+            return
+        if not args.yes and not confirm("Apagar essas contas, personagens e histórico? [s/N]: "):
+            print("Cancelado.")
+            return
+        print(f"🗑️ {purge_users(ids, chunk=args.chunk, pause=args.pause)} usuário(s) removido(s)")
+
+
+def main(argv):
+    args = parse_args(argv) if argv else None
+    app = create_cli_app()
     with app.app_context():
-        YonexusCLI().cmdloop()
+        if args is None:
+            YonexusCLI().cmdloop()
+        else:
+            run_command(args)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,421 @@
+"""
+Banco de dados: instância do SQLAlchemy e models (app.db + bind "chat").
+
+Não monta app nenhum ao importar. O servidor liga o `db` em create_app() (app.py);
+os scripts de administração usam create_cli_app(), que só carrega a config e o
+banco — sem SocketIO, login, sessão HTTP, índices do chat etc.
+
+O schema não é mais criado no import: rode `python manage.py init-db` (ou
+`flask --app app:create_app init-db`) ao instalar ou depois de criar tabelas novas.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+from flask import Flask, current_app
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, delete, event, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import chat_search
+
+
+db = SQLAlchemy()
+
+
+
+# =========================
+# Models (banco principal)
+# =========================
+class User(db.Model, UserMixin):
+    id = db.Column(db.Integer, primary_key=True)
+
+
+    username = db.Column(db.String(40), unique=True, nullable=False, index=True)
+    email = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    password_hash = db.Column(db.String(255), nullable=False)
+
+
+    vip_until = db.Column(db.Date, nullable=True)  # NULL = free
+    active_character_id = db.Column(db.Integer, nullable=True)
+
+
+    characters = db.relationship(
+        "Character",
+        backref="user",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True,  # o banco apaga os filhos (ON DELETE CASCADE)
+    )
+
+
+    def set_password(self, password_plain: str):
+        self.password_hash = generate_password_hash(password_plain)
+
+
+    def check_password(self, password_plain: str) -> bool:
+        return check_password_hash(self.password_hash, password_plain)
+
+
+    def is_vip(self) -> bool:
+        return self.vip_until is not None and self.vip_until >= date.today()
+
+
+
+class Character(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+
+
+    char_name = db.Column(db.String(80), nullable=False)
+    xp_start = db.Column(db.Integer, nullable=False, default=0)
+    xp_goal = db.Column(db.Integer, nullable=False, default=0)
+    daily_goal = db.Column(db.Integer, nullable=False, default=0)
+    goal_level = db.Column(db.Integer, nullable=True)
+    # None = validado no TibiaData; "pending" = job na fila (jobs.py); "invalid" = falhou
+    validation = db.Column(db.String(16), nullable=True)
+    # XP vem do xp_collector.py (highscore); o lançamento manual fica bloqueado
+    auto_xp = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text("0"))
+
+
+    logs = db.relationship(
+        "XpLog",
+        backref="character",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    xp_entries = db.relationship(
+        "XpEntry",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    xp_snapshot = db.relationship(
+        "XpSnapshot",
+        uselist=False,
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+
+class XpLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    character_id = db.Column(db.Integer, db.ForeignKey("character.id", ondelete="CASCADE"), nullable=False, index=True)
+    date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    xp = db.Column(db.Integer, nullable=False, default=0)
+
+
+
+class XpSnapshot(db.Model):
+    """Última experiência vista no highscore (xp_collector.py): base do próximo delta."""
+    character_id = db.Column(db.Integer, db.ForeignKey("character.id", ondelete="CASCADE"), primary_key=True)
+
+
+    char_name = db.Column(db.String(80), nullable=False)  # nome mudou → snapshot recomeça
+    world = db.Column(db.String(60), nullable=True, index=True)
+    experience = db.Column(db.BigInteger, nullable=True)  # NULL = ainda não achado no highscore
+    level = db.Column(db.Integer, nullable=True)
+    rank = db.Column(db.Integer, nullable=True)
+    observed_at = db.Column(db.DateTime, nullable=True)
+
+
+
+class XpEntry(db.Model):
+    """Lançamento de XP vindo da fila offline do navegador; `key` (gerada no cliente) deduplica o reenvio."""
+    key = db.Column(db.String(64), primary_key=True)
+    character_id = db.Column(db.Integer, db.ForeignKey("character.id", ondelete="CASCADE"), nullable=False, index=True)
+
+
+    date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD (dia em que foi registrado)
+    xp = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+
+class Job(db.Model):
+    """Fila de jobs em segundo plano (jobs.py), no banco para sobreviver a restart."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="queued")  # queued/running/done/failed
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=True, index=True)
+    character_id = db.Column(db.Integer, db.ForeignKey("character.id", ondelete="CASCADE"), nullable=True, index=True)
+
+
+    payload = db.Column(db.Text, nullable=False, default="{}")  # JSON
+    result = db.Column(db.Text, nullable=True)                  # JSON
+    error = db.Column(db.String(300), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+    __table_args__ = (db.Index("ix_job_status_run_after", "status", "run_after"),)
+
+
+    @property
+    def data(self) -> dict:
+        return json.loads(self.payload or "{}")
+
+
+
+# =========================
+# Escrita de XP em lote
+# =========================
+def add_xp_bulk(deltas: dict, chunk=500):
+    """
+    Soma `deltas` ({(character_id, "YYYY-MM-DD"): xp}) no XpLog: uma leitura das
+    linhas existentes + UPDATE xp = xp + delta em lote + INSERT em lote.
+
+    O UPDATE soma no próprio banco, então não perde um /add_xp concorrente.
+    Não faz commit. Devolve (linhas atualizadas, linhas inseridas).
+    """
+    keys = list(deltas)
+    existing = {}
+    for i in range(0, len(keys), chunk):
+        part = keys[i:i + chunk]
+        ids = {c for c, _ in part}
+        dates = {d for _, d in part}
+        rows = db.session.execute(
+            select(XpLog.character_id, XpLog.date, XpLog.id)
+            .where(XpLog.character_id.in_(ids), XpLog.date.in_(dates))
+        )
+        for char_id, day, row_id in rows:
+            existing.setdefault((char_id, day), row_id)
+
+    table = XpLog.__table__
+    updates = [{"row_id": existing[k], "delta": d} for k, d in deltas.items() if k in existing]
+    inserts = [{"character_id": c, "date": day, "xp": d} for (c, day), d in deltas.items() if (c, day) not in existing]
+    if updates:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(xp=table.c.xp + bindparam("delta")),
+            updates,
+        )
+    if inserts:
+        db.session.execute(insert(XpLog), inserts)
+    return len(updates), len(inserts)
+
+
+
+# =========================
+# Model do chat (banco separado)
+# =========================
+class ChatMessage(db.Model):
+    __bind_key__ = "chat"
+
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(40), nullable=False, index=True)
+
+
+    channel_type = db.Column(db.String(12), nullable=False, default="global", index=True)
+    world = db.Column(db.String(60), nullable=True, index=True)
+
+
+    text = db.Column(db.String(500), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+
+# =========================
+# SQLite: chaves estrangeiras
+# =========================
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_conn, connection_record):
+    # o SQLite só respeita FOREIGN KEY / ON DELETE CASCADE com isso ligado, por conexão
+    if isinstance(dbapi_conn, sqlite3.Connection):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+
+# pais antes dos filhos
+CASCADE_TABLES = ("character", "xp_log", "xp_snapshot", "xp_entry")
+
+
+
+def _missing_cascade(conn, table_name) -> bool:
+    fks = conn.exec_driver_sql(f'PRAGMA foreign_key_list("{table_name}")').all()
+    # linhas: (id, seq, tabela, de, para, on_update, on_delete, match)
+    return any(str(fk[6]).upper() != "CASCADE" for fk in fks)
+
+
+
+def cascade_ready(engine=None) -> bool:
+    """False se alguma tabela do SQLite ainda tem FK sem ON DELETE CASCADE (rode init-db)."""
+    engine = engine or db.engine
+    if engine.dialect.name != "sqlite":
+        return True
+    with engine.connect() as conn:
+        return not any(_missing_cascade(conn, name) for name in CASCADE_TABLES)
+
+
+
+def delete_characters(character_ids) -> int:
+    """
+    Apaga personagens e tudo deles. Com as FKs em ON DELETE CASCADE o banco cuida
+    dos filhos; num SQLite ainda não migrado (cascade_ready() False) eles saem
+    antes, na mesma transação, para não sobrar órfão. Não faz commit.
+    """
+    character_ids = list(character_ids)
+    if not character_ids:
+        return 0
+    if not cascade_ready():
+        for model in (XpEntry, XpSnapshot, XpLog, Job):
+            db.session.execute(
+                delete(model).where(model.character_id.in_(character_ids))
+                .execution_options(synchronize_session=False)
+            )
+    return db.session.execute(
+        delete(Character).where(Character.id.in_(character_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+
+def delete_users(user_ids) -> int:
+    """Apaga usuários com personagens e histórico (mesma regra do delete_characters). Não faz commit."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    if not cascade_ready():
+        delete_characters(db.session.execute(
+            select(Character.id).where(Character.user_id.in_(user_ids))
+        ).scalars().all())
+        db.session.execute(
+            delete(Job).where(Job.user_id.in_(user_ids)).execution_options(synchronize_session=False)
+        )
+    return db.session.execute(
+        delete(User).where(User.id.in_(user_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+
+def migrate_cascade_fks(engine=None) -> dict:
+    """
+    Bancos SQLite criados antes do ON DELETE CASCADE: recria cada tabela de
+    CASCADE_TABLES cuja FK ainda não tem cascade (o SQLite não altera constraint),
+    no roteiro da documentação: tabela nova → copia → apaga a velha → renomeia.
+
+    Linhas órfãs (pai já apagado quando as FKs não eram verificadas) ficam de fora.
+    Devolve {tabela: órfãs descartadas} das tabelas recriadas. Outros bancos: nada
+    a fazer aqui (create_all já cria com cascade; bancos antigos, via ALTER manual).
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    rebuilt = {}
+    preparer = engine.dialect.identifier_preparer
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")  # só vale fora de transação
+        conn.commit()
+        try:
+            for name in CASCADE_TABLES:
+                if name not in db.metadata.tables or not _missing_cascade(conn, name):
+                    continue
+                table = db.metadata.tables[name]
+                tmp = f"_new_{name}"
+
+                conn.exec_driver_sql("BEGIN")
+                ddl = str(CreateTable(table).compile(dialect=engine.dialect)).strip()
+                conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {preparer.format_table(table)}",
+                                                 f'CREATE TABLE "{tmp}"', 1))
+                old_cols = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{name}")')}
+                cols = ", ".join(preparer.quote(c.name) for c in table.columns if c.name in old_cols)
+                parents = " AND ".join(
+                    f"{preparer.quote(fk.parent.name)} IN "
+                    f"(SELECT {preparer.quote(fk.column.name)} FROM {preparer.format_table(fk.column.table)})"
+                    for fk in table.foreign_keys
+                )
+                total = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{name}"').scalar()
+                kept = conn.exec_driver_sql(
+                    f'INSERT INTO "{tmp}" ({cols}) SELECT {cols} FROM "{name}" WHERE {parents}'
+                ).rowcount
+                conn.exec_driver_sql(f'DROP TABLE "{name}"')
+                conn.exec_driver_sql(f'ALTER TABLE "{tmp}" RENAME TO "{name}"')
+                for index in table.indexes:
+                    index.create(conn)
+                conn.commit()
+                rebuilt[name] = total - kept
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+    return rebuilt
+
+
+
+# =========================
+# Schema / app mínimo
+# =========================
+def ensure_data_dir():
+    os.makedirs(os.path.join(current_app.root_path, "data"), exist_ok=True)
+
+
+
+def add_missing_columns(engine=None) -> list:
+    """
+    Colunas novas em tabelas que já existem (o create_all não altera tabela): no
+    SQLite, ALTER TABLE ADD COLUMN para cada coluna que falta e seja anulável ou
+    tenha server_default. Devolve ["tabela.coluna", ...] das que foram criadas.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != "sqlite":
+        return []
+
+    added = []
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:  # só o banco principal (o chat tem metadata própria)
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            if not existing:
+                continue  # tabela ainda não existe: o create_all cria completa
+            for column in table.columns:
+                default = column.server_default
+                if column.name in existing or not (column.nullable or default is not None):
+                    continue
+                col_def = f"{preparer.quote(column.name)} {column.type.compile(dialect=engine.dialect)}"
+                if default is not None:
+                    col_def += "" if column.nullable else " NOT NULL"
+                    col_def += f" DEFAULT {getattr(default.arg, 'text', default.arg)}"
+                conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {col_def}")
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+
+def init_schema():
+    """Cria as tabelas que faltam nos dois bancos + índice FTS5 do chat. Idempotente."""
+    ensure_data_dir()
+    db.create_all()
+    for column in add_missing_columns():
+        print(f"➕ {column}: coluna criada")
+    for table, orphans in migrate_cascade_fks().items():
+        print(f"🔁 {table}: FKs recriadas com ON DELETE CASCADE ({orphans} linha(s) órfã(s) descartada(s))")
+    # índice FTS5 + trigger de sincronização do chat (ver chat_search.py)
+    with db.engines["chat"].begin() as conn:
+        chat_search.ensure_schema(conn.exec_driver_sql)
+
+
+
+def create_cli_app():
+    """App só com config + banco, para scripts (use dentro de `with app.app_context()`)."""
+    from config import configure
+
+    app = Flask(__name__)
+    configure(app)
+    db.init_app(app)
+    return app
@@ -0,0 +1,237 @@
+"""
+Profiler por request (cProfile), ligado sob demanda.
+
+Dois modos:
+
+- manual: um admin (username em PROFILER_ADMINS) manda o header `X-Profile: 1`
+  ou `?_profile=1`; a resposta volta com `X-Profile-Id` e o perfil fica em
+  /internal/profiles/<id>;
+- amostrado: PROFILE_SAMPLE_PERCENT% dos requests dos endpoints em
+  PROFILE_SAMPLE_ENDPOINTS (padrão só o /metrics) são perfilados em produção.
+  O custo fica limitado: um perfil por vez no processo (os demais requests
+  passam direto) e só os PROFILE_KEEP mais recentes ficam no disco.
+
+Cada perfil gera, em PROFILE_DIR:
+
+  <id>.prof    → stats do cProfile (pstats, snakeviz, `python -m pstats`)
+  <id>.folded  → pilhas colapsadas para flamegraph (speedscope, flamegraph.pl);
+                 reconstruídas do grafo de chamadas do cProfile, então o tempo de
+                 funções chamadas de vários lugares é dividido na proporção das
+                 chamadas
+  <id>.json    → metadados (endpoint, usuário, duração, modo)
+
+Com eventlet, as greenlets dividem a mesma thread: se o request perfilado ceder
+(I/O), o que outras greenlets rodarem nesse meio tempo entra no perfil.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+
+def _frame_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":  # built-in: name já vem como "<built-in method ...>"
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+def folded_stacks(stats: pstats.Stats, min_fraction=0.001, max_depth=200) -> list:
+    """
+    Pilhas colapsadas ("a;b;c <microssegundos>") a partir do grafo do cProfile.
+
+    O cProfile só guarda arestas caller → callee com o tempo acumulado de cada
+    uma, então a pilha completa é reconstruída descendo das raízes e repartindo o
+    tempo de cada função pelos caminhos na proporção dessas arestas.
+    """
+    raw = stats.stats
+    children = {}
+    roots = []
+    for func, (_cc, _nc, _tt, _ct, callers) in raw.items():
+        known = [c for c in callers if c in raw]
+        if not known:
+            roots.append(func)
+        for caller in known:
+            edge_ct = callers[caller][3]
+            children.setdefault(caller, []).append((func, edge_ct))
+
+    total = sum(raw[f][3] for f in roots) or 1.0
+    threshold = total * min_fraction
+    weights = {}
+
+    def walk(func, labels, on_stack, path_time):
+        tt, ct = raw[func][2], raw[func][3]
+        scale = path_time / ct if ct > 0 else 0.0
+        labels = labels + (_frame_label(func),)
+        self_time = tt * scale
+        if self_time > 0:
+            key = ";".join(labels)
+            weights[key] = weights.get(key, 0.0) + self_time
+        if len(labels) >= max_depth:
+            return
+        for child, edge_ct in children.get(func, ()):
+            child_time = edge_ct * scale
+            if child in on_stack or child_time < threshold:
+                continue  # recursão ou fatia desprezível
+            walk(child, labels, on_stack | {child}, child_time)
+
+    for root in roots:
+        walk(root, (), frozenset((root,)), raw[root][3])
+
+    return [f"{stack} {max(1, round(t * 1_000_000))}" for stack, t in sorted(weights.items())]
+
+
+class RequestProfiler:
+    def __init__(self, app=None):
+        self._busy = threading.Lock()
+        self.profile_dir = None
+        self.keep = 200
+        self.sample_percent = 0.0
+        self.sample_endpoints = ()
+        self.admins = frozenset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PROFILE_DIR", os.path.join(app.root_path, "data", "profiles"))
+        app.config.setdefault("PROFILE_KEEP", 200)
+        app.config.setdefault("PROFILE_SAMPLE_PERCENT", 0.0)
+        app.config.setdefault("PROFILE_SAMPLE_ENDPOINTS", ("web.metrics",))
+        app.config.setdefault("PROFILER_ADMINS", ())
+        self.profile_dir = app.config["PROFILE_DIR"]
+        self.keep = int(app.config["PROFILE_KEEP"])
+        self.sample_percent = float(app.config["PROFILE_SAMPLE_PERCENT"])
+        self.sample_endpoints = tuple(app.config["PROFILE_SAMPLE_ENDPOINTS"])
+        self.admins = frozenset(u.lower() for u in app.config["PROFILER_ADMINS"])
+
+        app.before_request(self._start)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown)
+
+    def is_admin(self, user) -> bool:
+        return bool(getattr(user, "is_authenticated", False)) and user.username.lower() in self.admins
+
+    # ---------- ciclo do request ----------
+    def _mode(self):
+        if request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1":
+            return "manual" if self.is_admin(current_user) else None
+        if (
+            self.sample_percent > 0
+            and request.endpoint in self.sample_endpoints
+            and random.random() * 100 < self.sample_percent
+        ):
+            return "sampled"
+        return None
+
+    def _start(self):
+        if not self.admins and self.sample_percent <= 0:
+            return
+        mode = self._mode()
+        if mode is None or not self._busy.acquire(blocking=False):
+            return  # outro request já está sendo perfilado neste processo
+        profile = cProfile.Profile()
+        g._profile = (profile, mode, time.perf_counter())
+        profile.enable()
+
+    def _stop(self, status):
+        profile, mode, t0 = g.pop("_profile")
+        profile.disable()
+        elapsed = time.perf_counter() - t0
+        try:
+            return self._save(profile, mode, elapsed, status), mode
+        finally:
+            self._busy.release()
+
+    def _finish_request(self, response):
+        if "_profile" in g:
+            profile_id, mode = self._stop(response.status_code)
+            if mode == "manual":
+                response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    def _teardown(self, exc):
+        if "_profile" in g:  # exceção antes do after_request
+            self._stop(500)
+
+    # ---------- armazenamento ----------
+    def _save(self, profile, mode, elapsed, status) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        now = datetime.utcnow()
+        profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        base = os.path.join(self.profile_dir, profile_id)
+
+        stats = pstats.Stats(profile)
+        stats.dump_stats(base + ".prof")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write("\n".join(folded_stacks(stats)) + "\n")
+
+        meta = {
+            "id": profile_id,
+            "mode": mode,
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": status,
+            "user": current_user.username if current_user.is_authenticated else None,
+            "duration_ms": round(elapsed * 1000, 2),
+            "created_at": now.isoformat() + "Z",
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        metas = sorted(fn for fn in os.listdir(self.profile_dir) if fn.endswith(".json"))
+        for fn in metas[:-self.keep] if self.keep > 0 else ():
+            base = os.path.join(self.profile_dir, fn[:-len(".json")])
+            for ext in (".json", ".prof", ".folded"):
+                try:
+                    os.remove(base + ext)
+                except OSError:
+                    pass
+
+    def list_profiles(self, limit=50) -> list:
+        if not os.path.isdir(self.profile_dir):
+            return []
+        metas = sorted((fn for fn in os.listdir(self.profile_dir) if fn.endswith(".json")), reverse=True)
+        out = []
+        for fn in metas[:limit]:
+            try:
+                with open(os.path.join(self.profile_dir, fn), encoding="utf-8") as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def path_for(self, profile_id, ext):
+        """Caminho do arquivo do perfil, ou None se o id não existir."""
+        if not PROFILE_ID_RE.match(profile_id or ""):
+            return None
+        path = os.path.join(self.profile_dir, profile_id + ext)
+        return path if os.path.isfile(path) else None
+
+    def top_text(self, profile_id, limit=40, sort="cumulative") -> str:
+        if sort not in SORT_KEYS:
+            sort = "cumulative"
+        out = io.StringIO()
+        stats = pstats.Stats(self.path_for(profile_id, ".prof"), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,178 @@
+"""
+Contagem e tempo das queries SQL por request e por evento do Socket.IO.
+
+Escuta os eventos before/after_cursor_execute de todas as engines (app.db e
+chat.db) e acumula no `g` do request atual:
+
+- header `Server-Timing: db;dur=12.3;desc="7 queries", app;dur=40.1` (aparece no
+  DevTools do navegador, aba Network → Timing);
+- log estruturado (JSON) no logger "yonexus.sql" — INFO por request quando
+  SQL_STATS_LOG=1, WARNING sempre que um orçamento estoura;
+- orçamento de queries por rota (`@query_budget(n)`, padrão SQL_QUERY_BUDGET) e
+  detecção de N+1: a mesma instrução repetida SQL_REPEAT_LIMIT vezes ou mais.
+
+Em modo estrito (SQL_STATS_STRICT, ligado por padrão quando app.testing) o estouro
+vira QueryBudgetExceeded — o teste falha na hora, com as queries no erro.
+
+Queries feitas dentro de outro app_context (thread do write-behind, aquecimento
+do histórico do chat) não entram na conta do request.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("yonexus.sql")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Orçamento de queries de uma view ou evento do Socket.IO (substitui o padrão)."""
+    def decorator(fn):
+        fn._query_budget = int(max_queries)
+        return fn
+    return decorator
+
+
+class _Collector:
+    __slots__ = ("started", "queries", "db_time", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and "_sql_stats" in g:
+        conn.info.setdefault("_sql_stats_t", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_sql_stats_t")
+    if not stack or not has_app_context():
+        return
+    collector = g.get("_sql_stats")
+    started = stack.pop()
+    if collector is None:
+        return
+    collector.queries += 1
+    collector.db_time += time.perf_counter() - started
+    collector.statements[" ".join(statement.split())] += 1
+
+
+class QueryStats:
+    _listening = False
+    _listen_lock = threading.Lock()
+
+    def __init__(self, app=None):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.violations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQL_STATS", True)
+        app.config.setdefault("SQL_STATS_LOG", False)
+        app.config.setdefault("SQL_QUERY_BUDGET", 30)
+        app.config.setdefault("SQL_REPEAT_LIMIT", 5)
+        app.config.setdefault("SQL_STATS_STRICT", app.testing)
+        if not app.config["SQL_STATS"]:
+            return
+
+        with self._listen_lock:
+            if not QueryStats._listening:
+                event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+                QueryStats._listening = True
+
+        app.before_request(self._start)
+        app.after_request(self._finish_request)
+
+    # ---------- coleta ----------
+    def _start(self):
+        g._sql_stats = _Collector()
+
+    def _finish(self, label, budget):
+        collector = g.pop("_sql_stats", None)
+        if collector is None:
+            return None
+        total = time.perf_counter() - collector.started
+        self.requests += 1
+        self.queries += collector.queries
+        self.db_seconds += collector.db_time
+
+        cfg = current_app.config
+        budget = cfg["SQL_QUERY_BUDGET"] if budget is None else budget
+        problems = []
+        if collector.queries > budget:
+            problems.append(f"{collector.queries} queries (orçamento {budget})")
+        repeat_limit = cfg["SQL_REPEAT_LIMIT"]
+        repeated = [(s, n) for s, n in collector.statements.items() if n >= repeat_limit]
+        for statement, n in repeated:
+            problems.append(f"N+1? {n}x: {statement[:200]}")
+
+        record = {
+            "target": label,
+            "queries": collector.queries,
+            "db_ms": round(collector.db_time * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }
+        if problems:
+            self.violations += 1
+            record["problems"] = problems
+            log.warning(json.dumps(record, ensure_ascii=False))
+            if cfg["SQL_STATS_STRICT"]:
+                raise QueryBudgetExceeded(f"{label}: " + "; ".join(problems))
+        elif cfg["SQL_STATS_LOG"]:
+            log.info(json.dumps(record, ensure_ascii=False))
+        return collector, total
+
+    def _finish_request(self, response):
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "_query_budget", None)
+        result = self._finish(f"{request.method} {request.path} → {response.status_code}", budget)
+        if result is not None:
+            collector, total = result
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={collector.db_time * 1000:.1f};desc="{collector.queries} queries"',
+            )
+            response.headers.add("Server-Timing", f"app;dur={total * 1000:.1f}")
+        return response
+
+    # ---------- Socket.IO ----------
+    def track_event(self, fn):
+        """Decorator para handlers do Socket.IO (abaixo do @socketio.on)."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get("SQL_STATS"):
+                return fn(*args, **kwargs)
+            g._sql_stats = _Collector()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._finish(f"socket {fn.__name__}", getattr(fn, "_query_budget", None))
+        return wrapper
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "avg_queries": round(self.queries / self.requests, 2) if self.requests else 0,
+            "violations": self.violations,
+        }
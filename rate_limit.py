@@ -0,0 +1,147 @@
+"""
+Controle de flood do chat: token buckets por usuário e por conexão.
+
+Cada bucket tem `burst` fichas e recarrega `rate` fichas por segundo; cada envio
+gasta uma. O estado fica no mesmo backend da fila do Socket.IO
+(SOCKETIO_MESSAGE_QUEUE), para que o limite por usuário valha somando todos os
+workers:
+
+    sem fila / amqp://...  → memória do processo
+    local://<nome>         → memória compartilhada pelo barramento <nome> (testes)
+    redis://...            → Redis (script Lua atômico; requer o pacote `redis`)
+"""
+
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class MemoryBucketStore:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name=None):
+        # com nome (local://<nome>), instâncias diferentes enxergam os mesmos buckets
+        if name is None:
+            self._buckets = {}
+            self._lock = threading.Lock()
+        else:
+            with self._shared_lock:
+                self._buckets, self._lock = self._shared.setdefault(name, ({}, threading.Lock()))
+
+    def take(self, key, rate, burst, now=None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens, ts = float(burst), now
+            else:
+                tokens, ts = state
+                tokens = min(float(burst), tokens + (now - ts) * rate)
+            ok = tokens >= 1.0
+            if ok:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > 50_000:
+                self._prune(now)
+            return ok
+
+    def _prune(self, now):
+        # buckets parados há mais de 10 min já estariam cheios: podem sair
+        stale = [k for k, (_, ts) in self._buckets.items() if now - ts > 600]
+        for k in stale:
+            del self._buckets[k]
+
+    def drop(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+_REDIS_TAKE = """
+local s = redis.call('HMGET', KEYS[1], 't', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(s[1]) or burst
+local ts = tonumber(s[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local ok = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  ok = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return ok
+"""
+
+
+class RedisBucketStore:
+    def __init__(self, url, prefix="yonexus:flood:"):
+        import redis  # dependência opcional, só com SOCKETIO_MESSAGE_QUEUE=redis://
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.redis.register_script(_REDIS_TAKE)
+
+    def take(self, key, rate, burst, now=None) -> bool:
+        now = time.time() if now is None else now
+        try:
+            return bool(self._take(keys=[self.prefix + key], args=[rate, burst, now]))
+        except Exception:
+            # Redis fora do ar não pode derrubar o chat: deixa passar e registra
+            log.exception("Falha no rate limit (Redis); liberando envio")
+            return True
+
+    def drop(self, key):
+        try:
+            self.redis.delete(self.prefix + key)
+        except Exception:
+            pass
+
+
+def make_bucket_store(url=None):
+    if url and url.startswith("local://"):
+        return MemoryBucketStore(name=url.split("://", 1)[-1] or "default")
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisBucketStore(url)
+    return MemoryBucketStore()
+
+
+class FloodControl:
+    def __init__(self, store, user_rate=1.0, user_burst=8, conn_rate=1.0, conn_burst=5):
+        self.store = store
+        self.user_rate = float(user_rate)
+        self.user_burst = float(user_burst)
+        self.conn_rate = float(conn_rate)
+        self.conn_burst = float(conn_burst)
+
+        self.allowed = 0
+        self.rejected_user = 0
+        self.rejected_conn = 0
+
+    def allow(self, user_id, conn_id) -> bool:
+        if not self.store.take(f"conn:{conn_id}", self.conn_rate, self.conn_burst):
+            self.rejected_conn += 1
+            return False
+        if not self.store.take(f"user:{user_id}", self.user_rate, self.user_burst):
+            self.rejected_user += 1
+            return False
+        self.allowed += 1
+        return True
+
+    def forget_connection(self, conn_id):
+        self.store.drop(f"conn:{conn_id}")
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "rejected_user": self.rejected_user,
+            "rejected_conn": self.rejected_conn,
+            "user_rate": self.user_rate,
+            "user_burst": self.user_burst,
+            "conn_rate": self.conn_rate,
+            "conn_burst": self.conn_burst,
+        }
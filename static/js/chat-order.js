@@ -0,0 +1,48 @@
+/* =========================
+   Ordem e deduplicação das mensagens do chat (usado pelo chat.js; testado em
+   tests/js/chat-order.test.js).
+   Os ids crescem por worker, mas cada worker usa o próprio relógio
+   (chat_writer.ChatIdGenerator) e tem o próprio micro-lote (chat_fanout): uma
+   mensagem ou um chat_batch inteiro pode chegar depois de um id maior vindo de
+   outro worker. Por isso nada é descartado por "id <= último"; a deduplicação é
+   por id já exibido e cada mensagem entra na posição da ordem de id.
+========================= */
+(function (root) {
+  const ID_MS = 1024; // id = (ms << 10) | nó | sequência: 1 ms = 1024 ids
+
+  function ChatOrder() {
+    this.reset();
+  }
+
+  ChatOrder.prototype.reset = function () {
+    this.ids = [];        // ids exibidos, em ordem crescente (mesma ordem do DOM)
+    this.seen = new Set();
+  };
+
+  /* Registra a mensagem. Devolve a posição onde inseri-la (ordem crescente de
+     id) ou -1 se ela já está na tela. */
+  ChatOrder.prototype.add = function (id) {
+    if (typeof id !== "number") {
+      this.ids.push(Infinity); // sem id: vai para o fim
+      return this.ids.length - 1;
+    }
+    if (this.seen.has(id)) return -1;
+    this.seen.add(id);
+    let i = this.ids.length;
+    while (i > 0 && this.ids[i - 1] > id) i--; // quase sempre já é o fim
+    this.ids.splice(i, 0, id);
+    return i;
+  };
+
+  /* after_id do catch-up após reconexão: o maior id visto menos `overlapMs` de
+     folga, para trazer também ids menores de outros workers que chegaram depois.
+     O que já está na tela é descartado pelo add(). */
+  ChatOrder.prototype.catchUpAfter = function (overlapMs) {
+    const known = this.ids.filter((id) => id !== Infinity);
+    if (!known.length) return null;
+    return Math.max(0, known[known.length - 1] - overlapMs * ID_MS);
+  };
+
+  root.ChatOrder = ChatOrder;
+  if (typeof module !== "undefined" && module.exports) module.exports = { ChatOrder, ID_MS };
+})(typeof self !== "undefined" ? self : globalThis);
@@ -1,8 +1,18 @@
 const CHAT = {
   limit: 80,
   socket: null,
+  order: new ChatOrder(), // ids exibidos: deduplicação e posição (chat-order.js)
+  catchUpOverlapMs: 60000, // folga do catch-up para ids de outros workers (relógio, micro-lote)
+  connectedOnce: false,
+  channel: "global", // "global" ou "world" (mundo do personagem ativo)
+  world: null,
 };
 
+function historyUrl(extra = "") {
+  const channel = CHAT.channel === "world" ? "&channel=world" : "";
+  return `/chat/api/messages?limit=${CHAT.limit}${channel}${extra}`;
+}
+
 function esc(s) {
   return String(s).replace(/[&<>"']/g, (c) => ({
     "&": "&amp;",
@@ -38,6 +48,7 @@ function makeMsgEl(m) {
   const me = (m.username === window.CHAT_USERNAME);
 
   div.className = "chat-msg " + (me ? "me" : "other");
+  if (typeof m.id === "number") div.dataset.id = String(m.id);
   div.innerHTML = `
     <div class="chat-meta">${esc(m.username)} • ${new Date(m.created_at).toLocaleString("pt-BR")}</div>
     <div>${esc(m.text)}</div>
@@ -52,24 +63,44 @@ function renderReplace(allMessages) {
   const keepAtBottom = isNearBottom(box);
 
   box.innerHTML = "";
-  allMessages.forEach((m) => box.appendChild(makeMsgEl(m)));
+  CHAT.order.reset();
+  allMessages.forEach(insertMessage);
 
   if (keepAtBottom) box.scrollTop = box.scrollHeight;
 }
 
+function insertMessage(m) {
+  const box = $("chatMessages");
+  // repetida (catch-up + socket) → -1; senão entra na posição do id, não no fim
+  const i = CHAT.order.add(m.id);
+  if (i < 0) return;
+  box.insertBefore(makeMsgEl(m), box.children[i] || null);
+}
+
 function renderAppend(m) {
   const box = $("chatMessages");
   if (!box) return;
 
   const keepAtBottom = isNearBottom(box);
 
-  box.appendChild(makeMsgEl(m));
+  insertMessage(m);
+
+  if (keepAtBottom) box.scrollTop = box.scrollHeight;
+}
+
+function renderBatch(messages) {
+  const box = $("chatMessages");
+  if (!box || !messages.length) return;
+
+  const keepAtBottom = isNearBottom(box);
+
+  messages.forEach(insertMessage);
 
   if (keepAtBottom) box.scrollTop = box.scrollHeight;
 }
 
 async function loadInitial() {
-  const res = await fetch(`/chat/api/messages?limit=${CHAT.limit}`, {
+  const res = await fetch(historyUrl(), {
     cache: "no-store",
     headers: { "Accept": "application/json" },
   });
@@ -78,6 +109,24 @@ async function loadInitial() {
   renderReplace(data);
 }
 
+async function catchUp() {
+  let afterId = CHAT.order.catchUpAfter(CHAT.catchUpOverlapMs);
+  if (afterId === null) return loadInitial();
+
+  // busca em páginas até alcançar o presente; o que já está na tela é ignorado
+  while (true) {
+    const res = await fetch(historyUrl(`&after_id=${afterId}`), {
+      cache: "no-store",
+      headers: { "Accept": "application/json" },
+    });
+    const data = await res.json().catch(() => ([]));
+    if (!res.ok) throw new Error(data.error || `Falha ao sincronizar (HTTP ${res.status}).`);
+    data.forEach(renderAppend);
+    if (data.length < CHAT.limit) return;
+    afterId = data[data.length - 1].id;
+  }
+}
+
 function connectSocket() {
   // usa o mesmo host (Render) automaticamente
   CHAT.socket = io({
@@ -86,20 +135,44 @@ function connectSocket() {
 
   CHAT.socket.on("connect", () => {
     setError("");
+    if (CHAT.connectedOnce) {
+      catchUp().catch((e) => setError(e?.message || "Falha ao sincronizar chat."));
+    }
+    CHAT.connectedOnce = true;
   });
 
   CHAT.socket.on("disconnect", () => {
     setError("Conexão perdida. Tentando reconectar...");
   });
 
+  CHAT.socket.on("status", (payload) => {
+    CHAT.world = payload?.world || null;
+    const opt = document.querySelector('#chatChannel option[value="world"]');
+    if (opt) {
+      opt.disabled = !CHAT.world;
+      opt.textContent = CHAT.world ? `Mundo (${CHAT.world})` : "Mundo";
+    }
+  });
+
   CHAT.socket.on("chat_error", (payload) => {
     setError(payload?.error || "Erro no chat.");
   });
 
   CHAT.socket.on("chat_message", (msg) => {
+    // o socket está nas duas salas (global + mundo); só mostra o canal aberto
+    if ((msg.channel_type || "global") !== CHAT.channel) return;
     setError("");
     renderAppend(msg);
   });
+
+  // modo de micro-lotes: várias mensagens da mesma sala num único frame. A janela é
+  // por worker: o lote pode trazer ids menores que os já exibidos de outro worker,
+  // então cada mensagem é deduplicada e posicionada sozinha (não contra o lote).
+  CHAT.socket.on("chat_batch", (batch) => {
+    if (!Array.isArray(batch)) return;
+    setError("");
+    renderBatch(batch.filter((msg) => (msg.channel_type || "global") === CHAT.channel));
+  });
 }
 
 function send() {
@@ -112,12 +185,25 @@ function send() {
   input.value = "";
   setError("");
 
-  CHAT.socket.emit("chat_send", { text });
+  CHAT.socket.emit("chat_send", { text, channel: CHAT.channel });
 }
 
 document.addEventListener("DOMContentLoaded", async () => {
   const btn = $("chatSend");
   const input = $("chatText");
+  const channelSel = $("chatChannel");
+
+  if (channelSel) {
+    channelSel.addEventListener("change", async () => {
+      CHAT.channel = channelSel.value === "world" ? "world" : "global";
+      setError("");
+      try {
+        await loadInitial();
+      } catch (e) {
+        setError(e?.message || "Falha ao carregar chat.");
+      }
+    });
+  }
 
   if (btn) btn.addEventListener("click", send);
   if (input) {
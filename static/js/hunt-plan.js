@@ -0,0 +1,29 @@
+/* =========================
+   Plano de caça do bestiário (usado pelo templates/bestiary.html; testado em
+   tests/js/hunt-plan.test.js).
+   O /api/hunt/plan pagina em no máximo 200 monstros por página; o mapa
+   nome → kills precisa do bestiário inteiro, então as páginas são lidas até
+   `pages` (ou até uma página vazia) em vez de parar na primeira.
+========================= */
+(function (root) {
+  const PER_PAGE = 200; // máximo aceito pelo servidor (hunt_planner.plan)
+  const MAX_PAGES = 50; // trava de segurança contra resposta inconsistente
+
+  /* fetchJson(url) → objeto da resposta ou null (erro HTTP). Devolve
+     { nome: { daily, level } }, ou null se alguma página falhar — um plano pela
+     metade não deve ficar em cache. */
+  async function loadHuntPlan(fetchJson, query) {
+    const map = {};
+    for (let page = 1; page <= MAX_PAGES; page++) {
+      const data = await fetchJson(`/api/hunt/plan?${query}&page=${page}&per_page=${PER_PAGE}`);
+      if (!data) return null;
+      const results = data.results || [];
+      results.forEach((r) => { map[r.name] = { daily: r.kills_daily, level: r.kills_level }; });
+      if (!results.length || page >= (data.pages || 1)) break;
+    }
+    return map;
+  }
+
+  root.loadHuntPlan = loadHuntPlan;
+  if (typeof module !== "undefined" && module.exports) module.exports = { loadHuntPlan, PER_PAGE };
+})(typeof self !== "undefined" ? self : globalThis);
@@ -1,5 +1,8 @@
 let chart = null;
 let xpTableCache = null;
+let serverMetrics = null; // última resposta do servidor (/metrics ou /xp/sync)
+let pendingXp = [];       // lançamentos na fila offline, ainda não confirmados
+const USER_ID = Number(document.body.dataset.userId); // dono da fila offline (XpQueue)
 window.__originalCharName = null;
 
 /* =========================
@@ -108,7 +111,11 @@ async function saveGoalLevelInline() {
       return;
     }
 
-    await loadMetrics();
+    const failed = await finishConfigSave(data);
+    if (failed) {
+      showToast(failed, "error");
+      return;
+    }
     showToast("Nível meta atualizado.", "success");
   } catch (e) {
     showToast("Falha ao salvar.", "error");
@@ -140,7 +147,11 @@ async function saveDailyGoalInline() {
       return;
     }
 
-    await loadMetrics();
+    const failed = await finishConfigSave(data);
+    if (failed) {
+      showToast(failed, "error");
+      return;
+    }
     showToast("Meta diária atualizada.", "success");
   } catch (e) {
     showToast("Falha ao salvar.", "error");
@@ -154,137 +165,295 @@ async function saveDailyGoalInline() {
 /* =========================
    Metrics
 ========================= */
-async function loadMetrics() {
-  showLoading("Carregando...");
+async function loadMetrics({ quiet = false } = {}) {
+  if (!quiet) showLoading("Carregando...");
 
   try {
     const res = await fetch("/metrics", { cache: "no-store" });
     const data = await res.json().catch(() => ({}));
 
+    if (res.status === 202 && data.pending) {
+      // personagem recém-cadastrado: espera o job de validação no TibiaData e recarrega
+      if (!quiet) showLoading("Validando personagem no TibiaData...");
+      await waitForJob(data.job && data.job.id);
+      return loadMetrics({ quiet });
+    }
+
     if (!res.ok || data.error) {
       showToast(data.error || "Erro ao carregar métricas.", "error");
       return;
     }
 
-    // Cabeçalho
-    const elChar = document.getElementById("charName");
-    const elInfo = document.getElementById("info");
-    if (elChar) elChar.innerText = data.config.char_name;
-    if (elInfo) {
-      elInfo.innerText = `${data.character.vocation} • Level ${data.character.level} • ${data.character.world}`;
-    }
+    serverMetrics = data;
+    await refreshPendingXp();
+    renderDashboard();
+  } catch (e) {
+    showToast("Falha de conexão.", "error");
+  } finally {
+    if (!quiet) hideLoading();
+  }
+}
 
-    // Cards
-    const elXp = document.getElementById("xp");
-    const elRem = document.getElementById("remaining");
-    const elAvg = document.getElementById("avg");
-    const elEta = document.getElementById("eta");
-
-    if (elXp) elXp.innerText = Number(data.xp_current).toLocaleString("pt-BR");
-    if (elRem) elRem.innerText = Number(data.xp_remaining).toLocaleString("pt-BR");
-    if (elAvg) elAvg.innerText = Number(data.average_xp).toLocaleString("pt-BR");
-    if (elEta) elEta.innerText = data.days_estimate ? `${data.days_estimate} dias` : "—";
-
-    // Preenche inputs inline
-    const goalLevelInline = document.getElementById("goalLevelInline");
-    if (goalLevelInline) goalLevelInline.value = data.config.goal_level ?? "";
-
-    const dailyGoalInline = document.getElementById("dailyGoalInline");
-    if (dailyGoalInline) dailyGoalInline.value = data.config.daily_goal ?? "";
-
-    // ===== Barra geral (progresso até meta)
-    const overallFill = document.getElementById("overallFill");
-    const overallPercent = document.getElementById("overallPercent");
-    const overallText = document.getElementById("overallText");
-    const overallRemaining = document.getElementById("overallRemaining");
-    const overallTitle = document.getElementById("overallTitle");
-
-    const xpStart = Number(data.config.xp_start || 0);
-    const xpGoal = Number(data.config.xp_goal || 0);
-    const xpCurrent = Number(data.xp_current || 0);
-    const goalLevel = data.config.goal_level;
-
-    if (overallTitle) {
-      overallTitle.innerText = goalLevel
-        ? `Progresso até o nível ${goalLevel}`
-        : "Progresso até a meta";
-    }
+/* Aplica um "xp_update" (push do Socket.IO ou resposta de uma gravação): totais
+   novos + só os dias alterados do log. Sem refazer o /metrics. */
+function applyXpUpdate(delta) {
+  if (!serverMetrics || !delta || delta.character_id !== serverMetrics.config.character_id) return;
+
+  const { character_id, log, reset, config, character, ...numbers } = delta;
+  const byDate = new Map((reset ? [] : serverMetrics.daily_log || []).map((d) => [d.date, d.xp]));
+  (log || []).forEach((d) => byDate.set(d.date, d.xp));
+
+  serverMetrics = {
+    ...serverMetrics,
+    ...numbers,
+    config: config || serverMetrics.config,
+    character: character || serverMetrics.character,
+    daily_log: [...byDate.entries()]
+      .sort((a, b) => (a[0] < b[0] ? -1 : 1))
+      .map(([date, xp]) => ({ date, xp }))
+  };
+  renderDashboard();
+}
 
-    const denom = Math.max(1, xpGoal - xpStart);
-    let pct = ((xpCurrent - xpStart) / denom) * 100;
-    pct = Math.max(0, Math.min(100, pct));
+async function applyWriteResult(data) {
+  // sem estado ainda (personagem que acabou de ser validado): carrega tudo uma vez
+  if (data && data.metrics && serverMetrics) applyXpUpdate(data.metrics);
+  else await loadMetrics();
+}
 
-    if (overallFill) {
-      overallFill.style.width = `${pct.toFixed(1)}%`;
-      overallFill.className = pct >= 100 ? "fill success" : "fill";
-    }
-    if (overallPercent) overallPercent.innerText = pct.toFixed(1);
-    if (overallText) {
-      overallText.innerText =
-        `${xpCurrent.toLocaleString("pt-BR")} / ${xpGoal.toLocaleString("pt-BR")} XP`;
-    }
+/* =========================
+   Jobs em segundo plano (validação no TibiaData)
+========================= */
+const jobWaiters = new Map(); // id -> resolve; o evento "job_done" do Socket.IO adianta o polling
+
+function waitForJob(id, { interval = 1500, timeout = 120000 } = {}) {
+  if (!id) return new Promise((resolve) => setTimeout(() => resolve(null), 3000));
+
+  return new Promise((resolve) => {
+    const started = Date.now();
+    let timer = null;
+    const finish = (job) => {
+      clearTimeout(timer);
+      jobWaiters.delete(id);
+      resolve(job);
+    };
+    const poll = async () => {
+      try {
+        const res = await fetch(`/jobs/${id}`, { cache: "no-store" });
+        const job = await res.json().catch(() => null);
+        if (!res.ok) return finish(null);
+        if (job.status === "done" || job.status === "failed") return finish(job);
+      } catch (e) {
+        // rede caiu: tenta de novo no próximo intervalo
+      }
+      if (Date.now() - started > timeout) return finish(null);
+      timer = setTimeout(poll, interval);
+    };
+    jobWaiters.set(id, finish);
+    timer = setTimeout(poll, interval);
+  });
+}
 
-    const remainToGoal = Math.max(0, xpGoal - xpCurrent);
-    if (overallRemaining) {
-      overallRemaining.innerText = remainToGoal > 0
-        ? `${remainToGoal.toLocaleString("pt-BR")} XP para alcançar a meta`
-        : "Meta alcançada.";
-    }
+function onJobDone(job) {
+  const waiter = jobWaiters.get(job.id);
+  if (waiter) waiter(job);
+  else if (job.status === "done" && job.result && job.result.metrics) applyXpUpdate(job.result.metrics); // outra aba
+}
 
-    // ===== Avisos (meta inválida/meta alcançada)
-    const warning = document.getElementById("goalWarning");
-    const reached = document.getElementById("goalReached");
-    const goalLevelNum = Number(data.config.goal_level);
-
-    const invalidGoal = goalLevelNum && goalLevelNum <= Number(data.character.level);
-    const goalReached = goalLevelNum && Number(data.xp_remaining) <= 0;
-
-    if (invalidGoal) {
-      if (warning) warning.style.display = "block";
-      if (reached) reached.style.display = "none";
-    } else if (goalReached) {
-      if (warning) warning.style.display = "none";
-      if (reached) reached.style.display = "block";
-    } else {
-      if (warning) warning.style.display = "none";
-      if (reached) reached.style.display = "none";
-    }
+/* Resposta do POST /config: "saved" (aplicado na hora) ou "pending" (job na fila).
+   Devolve a mensagem de erro, ou null se deu certo. */
+async function finishConfigSave(data) {
+  if (data.status !== "pending") {
+    await applyWriteResult(data);
+    return null;
+  }
+  showLoading("Validando no TibiaData...");
+  const done = data.job.status === "done" || data.job.status === "failed";
+  const job = done ? data.job : await waitForJob(data.job.id);
+  if (!job) return "A validação está demorando. Atualize a página em instantes.";
+  if (job.status === "failed") return job.error || "Erro ao salvar.";
+  await applyWriteResult(job.result);
+  return null;
+}
 
-    // ===== Barra diária
-    const dailyTitle = document.getElementById("dailyTitle");
-    if (dailyTitle) dailyTitle.innerText = "Meta diária";
+/* Socket.IO: as gravações feitas em outras abas/dispositivos chegam como "xp_update" */
+function initLiveUpdates() {
+  if (typeof io === "undefined") return; // sem o cliente do Socket.IO: só o que esta aba faz
 
-    const fill = document.getElementById("progressFill");
-    if (fill) {
-      fill.style.width = `${Number(data.daily_progress).toFixed(1)}%`;
-      fill.className = Number(data.daily_progress) >= 100 ? "fill success" : "fill";
-    }
+  const socket = io({ transports: ["websocket", "polling"], auth: { scope: "dashboard" } });
+  let connectedBefore = false;
+  socket.on("connect", () => {
+    // reconexão: o que foi enviado enquanto estava fora se perdeu, então recarrega uma vez
+    if (connectedBefore) loadMetrics({ quiet: true });
+    connectedBefore = true;
+  });
+  socket.on("xp_update", applyXpUpdate);
+  socket.on("job_done", onJobDone);
+}
 
-    const elDailyPercent = document.getElementById("dailyPercent");
-    const elDailyText = document.getElementById("dailyText");
-    const elDailyRemaining = document.getElementById("dailyRemaining");
+/* Números do servidor + lançamentos da fila local (mesmas contas do xp_summary no app.py) */
+function withPendingXp(data, pending) {
+  const charId = data.config.character_id;
+  const byDate = new Map((data.daily_log || []).map((d) => [d.date, d.xp]));
+  let mine = 0;
+  for (const p of pending) {
+    if (p.character_id !== charId) continue;
+    byDate.set(p.date, (byDate.get(p.date) || 0) + p.xp);
+    mine += 1;
+  }
+  if (!mine) return data;
+
+  const log = [...byDate.entries()]
+    .sort((a, b) => (a[0] < b[0] ? -1 : 1))
+    .map(([date, xp]) => ({ date, xp }));
+  const xpCurrent = Number(data.config.xp_start || 0) + log.reduce((s, d) => s + d.xp, 0);
+  const xpRemaining = Math.max(0, Number(data.config.xp_goal || 0) - xpCurrent);
+  const positives = log.filter((d) => d.xp > 0).map((d) => d.xp);
+  const avg = positives.length ? positives.reduce((s, v) => s + v, 0) / positives.length : 0;
+  const todayXp = byDate.get(XpQueue.localDate()) || 0;
+  const dailyGoal = Number(data.config.daily_goal || 0);
+
+  return {
+    ...data,
+    xp_current: xpCurrent,
+    xp_remaining: xpRemaining,
+    average_xp: Math.round(avg),
+    days_estimate: avg > 0 && xpRemaining > 0 ? Math.round(xpRemaining / avg) : null,
+    today_xp: todayXp,
+    daily_progress: dailyGoal > 0 ? Math.min(100, Math.round((todayXp / dailyGoal) * 1000) / 10) : 0,
+    daily_log: log
+  };
+}
 
-    if (elDailyPercent) elDailyPercent.innerText = Number(data.daily_progress).toFixed(1);
-    if (elDailyText) {
-      elDailyText.innerText =
-        `${Number(data.today_xp).toLocaleString("pt-BR")} / ${Number(data.config.daily_goal).toLocaleString("pt-BR")} XP`;
-    }
+function renderDashboard() {
+  if (!serverMetrics) return;
+  renderMetrics(withPendingXp(serverMetrics, pendingXp));
+  updatePendingBadge();
+}
 
-    const remainingXP = Math.max(0, Number(data.config.daily_goal) - Number(data.today_xp));
-    if (elDailyRemaining) {
-      elDailyRemaining.innerText = remainingXP > 0
-        ? `${remainingXP.toLocaleString("pt-BR")} XP para 100%`
-        : "Meta diária concluída!";
-    }
+function renderMetrics(data) {
+  // Cabeçalho
+  const elChar = document.getElementById("charName");
+  const elInfo = document.getElementById("info");
+  if (elChar) elChar.innerText = data.config.char_name;
+  if (elInfo) {
+    elInfo.innerText = `${data.character.vocation} • Level ${data.character.level} • ${data.character.world}`;
+  }
 
-    // Gráfico
-    renderChart(data.daily_log || []);
+  // Cards
+  const elXp = document.getElementById("xp");
+  const elRem = document.getElementById("remaining");
+  const elAvg = document.getElementById("avg");
+  const elEta = document.getElementById("eta");
+
+  if (elXp) elXp.innerText = Number(data.xp_current).toLocaleString("pt-BR");
+  if (elRem) elRem.innerText = Number(data.xp_remaining).toLocaleString("pt-BR");
+  if (elAvg) elAvg.innerText = Number(data.average_xp).toLocaleString("pt-BR");
+  if (elEta) elEta.innerText = data.days_estimate ? `${data.days_estimate} dias` : "—";
+
+  // Preenche inputs inline
+  const goalLevelInline = document.getElementById("goalLevelInline");
+  if (goalLevelInline) goalLevelInline.value = data.config.goal_level ?? "";
+
+  const dailyGoalInline = document.getElementById("dailyGoalInline");
+  if (dailyGoalInline) dailyGoalInline.value = data.config.daily_goal ?? "";
+
+  // Coleta automática: sem registro manual (contaria a mesma caçada duas vezes)
+  const auto = data.config.auto_xp === true;
+  ["xpInput", "xpSubmitBtn", "deathToggle"].forEach((id) => {
+    const el = document.getElementById(id);
+    if (el) el.disabled = auto;
+  });
+  const xpAutoNote = document.getElementById("xpAutoNote");
+  if (xpAutoNote) xpAutoNote.style.display = auto ? "block" : "none";
+
+  // ===== Barra geral (progresso até meta)
+  const overallFill = document.getElementById("overallFill");
+  const overallPercent = document.getElementById("overallPercent");
+  const overallText = document.getElementById("overallText");
+  const overallRemaining = document.getElementById("overallRemaining");
+  const overallTitle = document.getElementById("overallTitle");
+
+  const xpStart = Number(data.config.xp_start || 0);
+  const xpGoal = Number(data.config.xp_goal || 0);
+  const xpCurrent = Number(data.xp_current || 0);
+  const goalLevel = data.config.goal_level;
+
+  if (overallTitle) {
+    overallTitle.innerText = goalLevel
+      ? `Progresso até o nível ${goalLevel}`
+      : "Progresso até a meta";
+  }
 
-  } catch (e) {
-    showToast("Falha de conexão.", "error");
-  } finally {
-    hideLoading();
+  const denom = Math.max(1, xpGoal - xpStart);
+  let pct = ((xpCurrent - xpStart) / denom) * 100;
+  pct = Math.max(0, Math.min(100, pct));
+
+  if (overallFill) {
+    overallFill.style.width = `${pct.toFixed(1)}%`;
+    overallFill.className = pct >= 100 ? "fill success" : "fill";
+  }
+  if (overallPercent) overallPercent.innerText = pct.toFixed(1);
+  if (overallText) {
+    overallText.innerText =
+      `${xpCurrent.toLocaleString("pt-BR")} / ${xpGoal.toLocaleString("pt-BR")} XP`;
+  }
+
+  const remainToGoal = Math.max(0, xpGoal - xpCurrent);
+  if (overallRemaining) {
+    overallRemaining.innerText = remainToGoal > 0
+      ? `${remainToGoal.toLocaleString("pt-BR")} XP para alcançar a meta`
+      : "Meta alcançada.";
+  }
+
+  // ===== Avisos (meta inválida/meta alcançada)
+  const warning = document.getElementById("goalWarning");
+  const reached = document.getElementById("goalReached");
+  const goalLevelNum = Number(data.config.goal_level);
+
+  const invalidGoal = goalLevelNum && goalLevelNum <= Number(data.character.level);
+  const goalReached = goalLevelNum && Number(data.xp_remaining) <= 0;
+
+  if (invalidGoal) {
+    if (warning) warning.style.display = "block";
+    if (reached) reached.style.display = "none";
+  } else if (goalReached) {
+    if (warning) warning.style.display = "none";
+    if (reached) reached.style.display = "block";
+  } else {
+    if (warning) warning.style.display = "none";
+    if (reached) reached.style.display = "none";
+  }
+
+  // ===== Barra diária
+  const dailyTitle = document.getElementById("dailyTitle");
+  if (dailyTitle) dailyTitle.innerText = "Meta diária";
+
+  const fill = document.getElementById("progressFill");
+  if (fill) {
+    fill.style.width = `${Number(data.daily_progress).toFixed(1)}%`;
+    fill.className = Number(data.daily_progress) >= 100 ? "fill success" : "fill";
+  }
+
+  const elDailyPercent = document.getElementById("dailyPercent");
+  const elDailyText = document.getElementById("dailyText");
+  const elDailyRemaining = document.getElementById("dailyRemaining");
+
+  if (elDailyPercent) elDailyPercent.innerText = Number(data.daily_progress).toFixed(1);
+  if (elDailyText) {
+    elDailyText.innerText =
+      `${Number(data.today_xp).toLocaleString("pt-BR")} / ${Number(data.config.daily_goal).toLocaleString("pt-BR")} XP`;
+  }
+
+  const remainingXP = Math.max(0, Number(data.config.daily_goal) - Number(data.today_xp));
+  if (elDailyRemaining) {
+    elDailyRemaining.innerText = remainingXP > 0
+      ? `${remainingXP.toLocaleString("pt-BR")} XP para 100%`
+      : "Meta diária concluída!";
   }
+
+  // Gráfico
+  renderChart(data.daily_log || []);
 }
 
 /* =========================
@@ -309,6 +478,36 @@ async function addXP() {
 
   const signed = death ? -xp : xp;
 
+  if (!serverMetrics) {
+    showToast("Aguarde carregar o personagem.", "info");
+    return;
+  }
+
+  if (serverMetrics.config.auto_xp) {
+    showToast("XP coletado automaticamente. Desligue a coleta em Configurações para registrar.", "info");
+    return;
+  }
+
+  // vai para a fila local na hora; o dashboard já mostra o valor e o envio é em segundo plano
+  let entry = null;
+  try {
+    entry = await XpQueue.enqueue(USER_ID, serverMetrics.config.character_id, signed);
+  } catch (e) {
+    entry = null; // sem IndexedDB (modo privado etc.): envia direto, como antes
+  }
+
+  if (entry) {
+    pendingXp.push(entry);
+    if (input) input.value = "";
+    renderDashboard();
+    syncXpQueue();
+    return;
+  }
+
+  await postXpDirect(signed, input);
+}
+
+async function postXpDirect(signed, input) {
   showLoading("Salvando XP...");
   try {
     const res = await fetch("/add_xp", {
@@ -324,7 +523,7 @@ async function addXP() {
     }
 
     if (input) input.value = "";
-    await loadMetrics();
+    await applyWriteResult(data);
   } catch (e) {
     showToast("Falha ao registrar XP.", "error");
   } finally {
@@ -332,6 +531,71 @@ async function addXP() {
   }
 }
 
+/* =========================
+   Fila offline de XP
+========================= */
+async function refreshPendingXp() {
+  try {
+    pendingXp = await XpQueue.pending(USER_ID);
+  } catch (e) {
+    pendingXp = [];
+  }
+}
+
+function updatePendingBadge() {
+  const el = document.getElementById("xpPending");
+  if (!el) return;
+  const n = pendingXp.length;
+  el.style.display = n ? "block" : "none";
+  el.textContent = n === 1
+    ? "1 lançamento aguardando envio (fica salvo neste navegador)."
+    : `${n} lançamentos aguardando envio (ficam salvos neste navegador).`;
+}
+
+async function applySyncResult(result) {
+  const { metrics, rejected } = result || {};
+  if (rejected && rejected.length) {
+    showToast(`${rejected.length} lançamento(s) recusado(s): ${rejected[0].error}`, "error", 4000);
+  }
+  // reconcilia com os números do servidor (se ainda for o mesmo personagem na tela)
+  if (metrics && serverMetrics && metrics.config.character_id === serverMetrics.config.character_id) {
+    serverMetrics = { ...metrics, character: serverMetrics.character };
+  }
+  await refreshPendingXp();
+  renderDashboard();
+}
+
+async function requestBackgroundSync() {
+  if (!("serviceWorker" in navigator)) return;
+  try {
+    const reg = await navigator.serviceWorker.ready;
+    if (reg.sync) await reg.sync.register(XpQueue.syncTag(USER_ID));
+  } catch (e) {
+    // sem Background Sync: o evento "online" da página cobre
+  }
+}
+
+async function syncXpQueue() {
+  try {
+    await applySyncResult(await XpQueue.flush(USER_ID));
+  } catch (e) {
+    // offline ou servidor fora: a fila continua no IndexedDB
+    await refreshPendingXp();
+    updatePendingBadge();
+    requestBackgroundSync();
+  }
+}
+
+function initXpQueue() {
+  if ("serviceWorker" in navigator) {
+    navigator.serviceWorker.register("/sw.js").catch(() => {});
+    navigator.serviceWorker.addEventListener("message", (event) => {
+      if (event.data && event.data.type === "xp-synced") applySyncResult(event.data);
+    });
+  }
+  window.addEventListener("online", syncXpQueue);
+}
+
 /* =========================
    Chart
 ========================= */
@@ -346,11 +610,21 @@ function renderChart(log) {
     v >= 0 ? "rgba(59, 130, 246, 1)" : "rgba(239, 68, 68, 1)"
   );
 
-  if (chart) chart.destroy();
-
   const canvas = document.getElementById("chart");
   if (!canvas) return;
 
+  // atualiza o gráfico existente em vez de recriar (sem piscar a cada push)
+  if (chart && chart.canvas === canvas) {
+    chart.data.labels = labels;
+    const ds = chart.data.datasets[0];
+    ds.data = values;
+    ds.backgroundColor = backgroundColors;
+    ds.borderColor = borderColors;
+    chart.update();
+    return;
+  }
+  if (chart) chart.destroy();
+
   chart = new Chart(canvas, {
     type: "bar",
     data: {
@@ -400,6 +674,9 @@ async function openSettings() {
     cfgName.value = cfg.char_name;
     cfgStart.value = cfg.xp_start;
 
+    const cfgAutoXp = document.getElementById("cfgAutoXp");
+    if (cfgAutoXp) cfgAutoXp.checked = cfg.auto_xp === true;
+
     const canEditXp = cfg.can_edit_xp_start === true;
     cfgStart.disabled = !canEditXp;
 
@@ -494,7 +771,8 @@ async function saveSettings() {
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
         char_name: cfgName.value.trim(),
-        xp_start: cfgStart.value
+        xp_start: cfgStart.value,
+        auto_xp: document.getElementById("cfgAutoXp")?.checked === true
       })
     });
 
@@ -504,10 +782,15 @@ async function saveSettings() {
       return;
     }
 
+    const failed = await finishConfigSave(data);
+    if (failed) {
+      showToast(failed, "error");
+      return;
+    }
+
     window.__originalCharName = cfgName.value.trim();
     updateCharChangeWarning();
     closeSettings();
-    await loadMetrics();
 
     showToast(
       changed ? "Configurações salvas. Histórico zerado." : "Configurações salvas.",
@@ -535,7 +818,7 @@ async function resetXpHistory() {
     }
 
     closeSettings();
-    await loadMetrics();
+    await applyWriteResult(data);
     showToast("Histórico zerado.", "success");
   } catch (e) {
     showToast("Falha ao zerar histórico.", "error");
@@ -548,4 +831,8 @@ async function resetXpHistory() {
    Init
 ========================= */
 updateXpMode();
-loadMetrics();
+initXpQueue();
+initLiveUpdates();
+loadMetrics().then(() => {
+  if (pendingXp.length) syncXpQueue();
+});
@@ -0,0 +1,194 @@
+/* =========================
+   Fila offline de XP (IndexedDB)
+   Usada pela página (main.js) e pelo service worker (/sw.js → xp-sync-sw.js).
+   Cada lançamento tem uma chave gerada aqui; o /xp/sync ignora chave repetida,
+   então mandar o mesmo lote duas vezes (aba + service worker, rede caindo no
+   meio) não duplica XP.
+   O banco é do navegador, não da conta: cada registro leva o user_id de quem o
+   criou, tudo aqui filtra por ele, o /xp/sync recusa lote de outro usuário e o
+   logout esvazia a fila de quem saiu (testado em tests/js/xp-queue.test.js).
+========================= */
+(function (root) {
+  const DB_NAME = "yonexus";
+  const STORE = "xpQueue";
+  const SYNC_URL = "/xp/sync";
+  const BATCH = 50;
+  const SYNC_TAG = "xp-sync";
+  const LOGOUT_FLUSH_MS = 3000;
+
+  let dbPromise = null;
+
+  function openDb() {
+    if (dbPromise) return dbPromise;
+    dbPromise = new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NAME, 2);
+      req.onupgradeneeded = (event) => {
+        const db = req.result;
+        if (!db.objectStoreNames.contains(STORE)) {
+          db.createObjectStore(STORE, { keyPath: "key" });
+        } else if (event.oldVersion < 2) {
+          // versão 1 não guardava o dono: não dá para saber de qual conta é cada registro
+          req.transaction.objectStore(STORE).clear();
+        }
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => {
+        dbPromise = null;
+        reject(req.error);
+      };
+    });
+    return dbPromise;
+  }
+
+  async function tx(mode, fn) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+      const t = db.transaction(STORE, mode);
+      const result = fn(t.objectStore(STORE));
+      t.oncomplete = () => resolve(result && "result" in result ? result.result : undefined);
+      t.onerror = () => reject(t.error);
+      t.onabort = () => reject(t.error);
+    });
+  }
+
+  function newKey() {
+    if (root.crypto && crypto.randomUUID) return crypto.randomUUID();
+    const bytes = new Uint8Array(16);
+    crypto.getRandomValues(bytes);
+    return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+
+  function localDate(d = new Date()) {
+    const pad = (n) => String(n).padStart(2, "0");
+    return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+  }
+
+  async function enqueue(userId, characterId, xp) {
+    const entry = {
+      key: newKey(),
+      user_id: userId,
+      character_id: characterId,
+      xp,
+      date: localDate(),
+      created_at: Date.now()
+    };
+    await tx("readwrite", (s) => s.put(entry));
+    return entry;
+  }
+
+  // a fila é pequena (lançamentos manuais): filtrar no getAll basta
+  async function pending(userId) {
+    const all = await tx("readonly", (s) => s.getAll());
+    return (all || []).filter((e) => e.user_id === userId).sort((a, b) => a.created_at - b.created_at);
+  }
+
+  async function remove(keys) {
+    if (!keys.length) return;
+    await tx("readwrite", (s) => keys.forEach((k) => s.delete(k)));
+  }
+
+  async function clear(userId) {
+    await remove((await pending(userId)).map((e) => e.key));
+  }
+
+  // um flush por contexto (aba ou service worker) e usuário de cada vez
+  const flushing = new Map();
+
+  function flush(userId) {
+    if (!flushing.has(userId)) {
+      flushing.set(userId, doFlush(userId).finally(() => {
+        flushing.delete(userId);
+      }));
+    }
+    return flushing.get(userId);
+  }
+
+  /* Envia a fila do usuário em lotes. Devolve { metrics, rejected, sent } do
+     último lote, ou lança erro se a rede/servidor falhar (a fila fica como estava). */
+  async function doFlush(userId) {
+    let metrics = null;
+    let sent = 0;
+    const rejected = [];
+
+    for (;;) {
+      const batch = (await pending(userId)).slice(0, BATCH);
+      if (!batch.length) break;
+
+      const res = await fetch(SYNC_URL, {
+        method: "POST",
+        credentials: "same-origin",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          user_id: userId,
+          entries: batch.map(({ key, character_id, xp, date }) => ({ key, character_id, xp, date }))
+        })
+      });
+      if (!res.ok) {
+        // 4xx do lote inteiro (sessão expirou, outra conta logada, lote inválido):
+        // tenta de novo depois
+        throw new Error(`sync ${res.status}`);
+      }
+
+      const data = await res.json();
+      const done = [...data.accepted, ...data.duplicates, ...data.rejected.map((r) => r.key)];
+      await remove(done);
+      rejected.push(...data.rejected);
+      sent += data.accepted.length;
+      if (data.metrics) metrics = data.metrics;
+      if (!done.length) break; // servidor não reconheceu nada: evita laço infinito
+    }
+    return { metrics, rejected, sent };
+  }
+
+  // tag do Background Sync por usuário: o service worker não tem sessão própria
+  function syncTag(userId) {
+    return `${SYNC_TAG}:${userId}`;
+  }
+
+  function userFromTag(tag) {
+    const m = /^xp-sync:(\d+)$/.exec(tag || "");
+    return m ? Number(m[1]) : null;
+  }
+
+  /* Sair: tenta enviar o que falta e esvazia a fila de quem saiu. Se algo não foi
+     enviado (offline), pergunta antes de descartar. */
+  async function beforeLogout(userId, confirmDiscard) {
+    try {
+      await Promise.race([
+        flush(userId),
+        new Promise((resolve) => setTimeout(resolve, LOGOUT_FLUSH_MS))
+      ]);
+    } catch (e) {
+      // offline: o que sobrou fica para a pergunta abaixo
+    }
+    const left = (await pending(userId)).length;
+    if (left && !confirmDiscard(left)) return false;
+    await clear(userId);
+    return true;
+  }
+
+  // formulários de logout marcados com data-xp-user="{{ current_user.id }}"
+  function bindLogout(doc) {
+    doc.querySelectorAll("form[data-xp-user]").forEach((form) => {
+      form.addEventListener("submit", (event) => {
+        event.preventDefault();
+        const userId = Number(form.dataset.xpUser);
+        const ask = (n) => root.confirm(
+          `${n} lançamento(s) de XP ainda não foram enviados e serão descartados deste navegador. Sair mesmo assim?`
+        );
+        beforeLogout(userId, ask)
+          .catch(() => true) // sem IndexedDB: não há fila para limpar
+          .then((ok) => { if (ok) form.submit(); });
+      });
+    });
+  }
+
+  const XpQueue = { enqueue, pending, flush, clear, beforeLogout, localDate, syncTag, userFromTag, SYNC_TAG };
+  root.XpQueue = XpQueue;
+  if (typeof module !== "undefined" && module.exports) module.exports = XpQueue;
+
+  if (typeof document !== "undefined") {
+    if (document.readyState === "loading") document.addEventListener("DOMContentLoaded", () => bindLogout(document));
+    else bindLogout(document);
+  }
+})(typeof self !== "undefined" ? self : globalThis);
@@ -0,0 +1,23 @@
+/* =========================
+   Service worker da fila offline de XP (servido em /sw.js).
+   Quando a conexão volta, o Background Sync acorda este worker mesmo com a aba
+   fechada; ele envia a fila do IndexedDB e avisa as abas abertas com os números
+   atualizados. Navegadores sem Background Sync usam o flush da própria página.
+========================= */
+importScripts("/static/js/xp-queue.js");
+
+self.addEventListener("install", () => self.skipWaiting());
+self.addEventListener("activate", (event) => event.waitUntil(self.clients.claim()));
+
+// a tag diz de qual usuário é a fila (XpQueue.syncTag); se a sessão do navegador
+// for de outra conta, o /xp/sync recusa e a fila espera o dono voltar
+async function syncAndNotify(userId) {
+  const result = await XpQueue.flush(userId);
+  const clients = await self.clients.matchAll({ type: "window" });
+  clients.forEach((c) => c.postMessage({ type: "xp-synced", ...result }));
+}
+
+self.addEventListener("sync", (event) => {
+  const userId = XpQueue.userFromTag(event.tag);
+  if (userId !== null) event.waitUntil(syncAndNotify(userId));
+});
@@ -0,0 +1,323 @@
+"""
+Métricas no formato texto do Prometheus, servidas em /internal/metrics.
+
+Sem dependência externa: cada processo guarda contadores, gauges e histogramas em
+memória. Com vários workers (gunicorn), defina METRICS_DIR: cada worker grava um
+snapshot `<pid>.json` nessa pasta a cada METRICS_FLUSH_INTERVAL segundos e o
+worker que atende o scrape soma todos. Contadores e histogramas de workers que
+já morreram continuam somando (senão o total "anda para trás"); gauges só contam
+processos vivos. Limpe a pasta ao reiniciar o serviço.
+
+O que é medido (ver init_app e os pontos de instrumentação no app.py):
+
+- latência por endpoint Flask e por evento do Socket.IO;
+- chamadas de saída (TibiaData): status, latência e retries;
+- cache de personagem (fresh/stale/miss), sockets conectados, mensagens do chat,
+  anti-flood e fila de gravação do chat, jobs em segundo plano (jobs.py) e
+  latência dos commits do banco.
+
+Números que já são contados em outro objeto (FloodControl, ChatWriteBehind) entram
+por collector(): lidos a cada snapshot, sem instrumentar o código deles.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# buckets padrão do Prometheus (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    # nome: (tipo, ajuda, labels)
+    "yonexus_http_requests_total": (
+        "counter", "Requests HTTP por endpoint, método e status.", ("endpoint", "method", "status")),
+    "yonexus_http_request_duration_seconds": (
+        "histogram", "Latência dos requests HTTP por endpoint.", ("endpoint", "method")),
+    "yonexus_socketio_events_total": (
+        "counter", "Eventos do Socket.IO recebidos.", ("event",)),
+    "yonexus_socketio_event_duration_seconds": (
+        "histogram", "Latência dos handlers do Socket.IO.", ("event",)),
+    "yonexus_socketio_connections": (
+        "gauge", "Sockets conectados (soma dos workers vivos).", ()),
+    "yonexus_upstream_requests_total": (
+        "counter", "Chamadas HTTP de saída por host e status (ou 'error').", ("host", "status")),
+    "yonexus_upstream_request_duration_seconds": (
+        "histogram", "Latência das chamadas HTTP de saída, retries incluídos.", ("host",)),
+    "yonexus_upstream_retries_total": (
+        "counter", "Tentativas repetidas pelo Retry das chamadas de saída.", ()),
+    "yonexus_char_info_total": (
+        "counter", "Consultas de personagem: fresh (TibiaData), stale (cache após erro), miss.", ("result",)),
+    "yonexus_chat_messages_total": (
+        "counter", "Mensagens de chat aceitas por canal.", ("channel",)),
+    "yonexus_chat_flood_rejected_total": (
+        "counter", "Mensagens de chat recusadas pelo anti-flood, por limite (user/conn).", ("scope",)),
+    "yonexus_chat_write_queue_depth": (
+        "gauge", "Mensagens de chat aguardando gravação no chat.db (soma dos workers vivos).", ()),
+    "yonexus_chat_write_rows_total": (
+        "counter", "Mensagens de chat por destino na gravação: flushed, dropped (inválidas/esgotaram "
+                   "as tentativas), rejected (fila cheia).", ("result",)),
+    "yonexus_chat_write_errors_total": (
+        "counter", "Falhas de gravação de lotes do chat (cada tentativa).", ()),
+    "yonexus_jobs_total": (
+        "counter", "Tentativas de jobs em segundo plano por tipo e resultado (done/failed/queued = retry).",
+        ("kind", "status")),
+    "yonexus_job_duration_seconds": (
+        "histogram", "Duração de cada tentativa de job.", ("kind",)),
+    "yonexus_db_commit_duration_seconds": (
+        "histogram", "Latência dos commits de sessão (flush incluído).", ()),
+}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Telemetry:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        # nome -> {labels (tupla): valor}; histogramas: [contagens por bucket..., soma, total]
+        self._values = {name: {} for name in METRICS}
+        self._collectors = []
+        self.metrics_dir = None
+        self.flush_interval = 5.0
+        self._flusher = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_DIR", None)
+        app.config.setdefault("METRICS_TOKEN", None)
+        app.config.setdefault("METRICS_FLUSH_INTERVAL", 5.0)
+        self.metrics_dir = app.config["METRICS_DIR"]
+        self.flush_interval = float(app.config["METRICS_FLUSH_INTERVAL"])
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        _listen_commits(self)
+
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            self._start_flusher()
+
+    # ---------- registro ----------
+    def inc(self, name, labels=(), value=1):
+        series = self._values[name]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + value
+
+    def gauge_add(self, name, value, labels=()):
+        self.inc(name, labels, value)
+
+    def observe(self, name, value, labels=()):
+        series = self._values[name]
+        with self._lock:
+            row = series.get(labels)
+            if row is None:
+                row = series[labels] = [0] * (len(DEFAULT_BUCKETS) + 2)
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def collector(self, fn):
+        """
+        fn() -> {métrica: {labels: valor}}, chamado a cada snapshot; os valores
+        substituem os atuais (contadores que o próprio objeto já acumula).
+        """
+        if fn not in self._collectors:
+            self._collectors.append(fn)
+        return fn
+
+    def timed(self, name, labels=()):
+        """with telemetry.timed("..._seconds", labels): ..."""
+        return _Timer(self, name, labels)
+
+    # ---------- Flask ----------
+    def _start_request(self):
+        g._telemetry_t0 = time.perf_counter()
+
+    def _finish_request(self, response):
+        t0 = g.pop("_telemetry_t0", None)
+        if t0 is not None:
+            endpoint = request.endpoint or "unmatched"
+            self.observe("yonexus_http_request_duration_seconds", time.perf_counter() - t0,
+                         (endpoint, request.method))
+            self.inc("yonexus_http_requests_total", (endpoint, request.method, str(response.status_code)))
+        return response
+
+    # ---------- Socket.IO ----------
+    def track_event(self, fn):
+        """Decorator para handlers do Socket.IO (abaixo do @socketio.on)."""
+        name = fn.__name__[len("socket_"):] if fn.__name__.startswith("socket_") else fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.inc("yonexus_socketio_events_total", (name,))
+            with self.timed("yonexus_socketio_event_duration_seconds", (name,)):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    # ---------- agregação entre workers ----------
+    def snapshot(self) -> dict:
+        for fn in self._collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            with self._lock:
+                for name, series in values.items():
+                    self._values[name].update(series)
+        with self._lock:
+            return {
+                name: [[list(labels), value if not isinstance(value, list) else list(value)]
+                       for labels, value in series.items()]
+                for name, series in self._values.items()
+            }
+
+    def flush(self):
+        if not self.metrics_dir:
+            return
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot()}, f)
+        os.replace(tmp, path)
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=run, name="telemetry-flush", daemon=True)
+        self._flusher.start()
+
+    def _collect(self) -> dict:
+        """Snapshot deste processo somado ao dos outros workers (METRICS_DIR)."""
+        own_pid = os.getpid()
+        snapshots = [(own_pid, self.snapshot())]
+        if self.metrics_dir and os.path.isdir(self.metrics_dir):
+            for fname in os.listdir(self.metrics_dir):
+                if not fname.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.metrics_dir, fname), encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if data.get("pid") != own_pid:
+                    snapshots.append((data.get("pid"), data.get("metrics", {})))
+
+        merged = {name: {} for name in METRICS}
+        for pid, snap in snapshots:
+            alive = pid == own_pid or _pid_alive(int(pid))
+            for name, rows in snap.items():
+                if name not in METRICS or (METRICS[name][0] == "gauge" and not alive):
+                    continue
+                series = merged[name]
+                for labels, value in rows:
+                    key = tuple(labels)
+                    if isinstance(value, list):
+                        prev = series.get(key)
+                        series[key] = value if prev is None else [a + b for a, b in zip(prev, value)]
+                    else:
+                        series[key] = series.get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, series in self._collect().items():
+            kind, help_text, label_names = METRICS[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if not series and not label_names and kind != "histogram":
+                lines.append(f"{name} 0")
+            for labels, value in sorted(series.items()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {_format_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(DEFAULT_BUCKETS, value):
+                    cumulative += count
+                    le = _format_labels(label_names, labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _format_labels(label_names, labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {value[-1]}")
+                lines.append(f"{name}_sum{_format_labels(label_names, labels)} {_format_number(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(label_names, labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("telemetry", "name", "labels", "t0")
+
+    def __init__(self, telemetry, name, labels):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.telemetry.observe(self.name, time.perf_counter() - self.t0, self.labels)
+        return False
+
+
+_commit_listeners = []
+
+
+def _listen_commits(telemetry):
+    """Latência de commit de qualquer Session (app, chat, write-behind do chat)."""
+    if _commit_listeners:
+        return
+
+    def before_commit(session):
+        session.info["_telemetry_commit_t0"] = time.perf_counter()
+
+    def after_commit(session):
+        t0 = session.info.pop("_telemetry_commit_t0", None)
+        if t0 is not None:
+            telemetry.observe("yonexus_db_commit_duration_seconds", time.perf_counter() - t0)
+
+    event.listen(Session, "before_commit", before_commit)
+    event.listen(Session, "after_commit", after_commit)
+    _commit_listeners.extend((before_commit, after_commit))
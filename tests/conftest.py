@@ -0,0 +1,74 @@
+"""
+Fixtures dos testes (pytest). Cada teste recebe um app com bancos SQLite
+temporários, Socket.IO em modo threading e jobs rodando na própria request.
+
+  python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv("CHAT_DATABASE_URL", f"sqlite:///{tmp_path / 'chat.db'}")
+    monkeypatch.setenv("CHAT_ARCHIVE_DIR", str(tmp_path / "chat_archive"))
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("SOCKETIO_ASYNC_MODE", "threading")
+    monkeypatch.setenv("JOB_WORKERS", "0")
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    monkeypatch.delenv("SOCKETIO_MESSAGE_QUEUE", raising=False)
+
+    import app as app_module
+    from models import init_schema
+
+    flask_app = app_module.create_app({"TESTING": True})
+    with flask_app.app_context():
+        init_schema()
+    yield flask_app
+    app_module.chat_writer.stop()
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user("alice", vip=False, world="Antica") → id do usuário (senha "pw")."""
+    import app as app_module
+    from datetime import date
+    from models import Character, User, db
+
+    def make(username="alice", vip=False, world="Antica"):
+        with app.app_context():
+            user = User(username=username, email=f"{username}@example.com")
+            user.set_password("pw")
+            if vip:
+                user.vip_until = date(2099, 1, 1)
+            name = f"{username.title()} Char"
+            user.characters.append(Character(
+                char_name=name, xp_start=1000, xp_goal=5000, daily_goal=100, goal_level=20,
+            ))
+            db.session.add(user)
+            db.session.commit()
+            app_module.CHAR_INFO_CACHE[name] = {"vocation": "Knight", "level": 10, "world": world}
+            return user.id
+
+    return make
+
+
+@pytest.fixture
+def login(app, make_user):
+    """login("alice") → test client já logado (cria o usuário se preciso)."""
+    def do_login(username="alice", **kwargs):
+        make_user(username, **kwargs)
+        client = app.test_client()
+        r = client.post("/login", data={"username": username, "password": "pw"})
+        assert r.status_code == 302
+        return client
+
+    return do_login
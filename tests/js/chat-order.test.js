@@ -0,0 +1,55 @@
+// node --test tests/js   (também roda pelo pytest: tests/test_js.py)
+const test = require("node:test");
+const assert = require("node:assert/strict");
+const { ChatOrder, ID_MS } = require("../../static/js/chat-order.js");
+
+// id no formato do chat_writer: (ms << 10) | nó << 4 | sequência
+const id = (ms, node = 0, seq = 0) => ms * ID_MS + node * 16 + seq;
+
+/* Simula o DOM do chat.js: insere na posição devolvida por add(). */
+function render(order, messages, shown = []) {
+  for (const m of messages) {
+    const i = order.add(m.id);
+    if (i >= 0) shown.splice(i, 0, m.id);
+  }
+  return shown;
+}
+
+test("mensagem de outro worker com id menor chega depois e não é descartada", () => {
+  const order = new ChatOrder();
+  const fromB = id(5000, 2); // worker B, relógio adiantado
+  const fromA = id(4990, 1); // worker A, enviada antes mas entregue depois
+  const shown = render(order, [{ id: fromB }, { id: fromA }]);
+  assert.deepEqual(shown, [fromA, fromB]);
+});
+
+test("chat_batch inteiro com ids menores que o já exibido entra em ordem", () => {
+  const order = new ChatOrder();
+  const shown = render(order, [{ id: id(100, 1) }, { id: id(200, 1) }]);
+  // micro-lote do worker 2, segurado pela janela dele
+  render(order, [{ id: id(150, 2) }, { id: id(160, 2) }, { id: id(250, 2) }], shown);
+  assert.deepEqual(shown, [id(100, 1), id(150, 2), id(160, 2), id(200, 1), id(250, 2)]);
+});
+
+test("duplicadas (socket + catch-up) aparecem uma vez só", () => {
+  const order = new ChatOrder();
+  const shown = render(order, [{ id: id(1) }, { id: id(2) }, { id: id(1) }, { id: id(2) }, { id: id(3) }]);
+  assert.deepEqual(shown, [id(1), id(2), id(3)]);
+});
+
+test("catch-up começa antes do maior id visto, dentro da folga", () => {
+  const order = new ChatOrder();
+  assert.equal(order.catchUpAfter(60000), null);
+  render(order, [{ id: id(100000, 1) }, { id: id(90000, 3) }]);
+  const after = order.catchUpAfter(60000);
+  assert.equal(after, id(40000, 1));
+  // id menor de outro worker, perdido na reconexão, fica dentro da janela
+  assert.ok(id(99000, 2) > after);
+});
+
+test("reset limpa o que foi exibido", () => {
+  const order = new ChatOrder();
+  render(order, [{ id: id(1) }]);
+  order.reset();
+  assert.equal(order.add(id(1)), 0);
+});
@@ -0,0 +1,47 @@
+// node --test tests/js   (também roda pelo pytest: tests/test_js.py)
+const test = require("node:test");
+const assert = require("node:assert/strict");
+const { loadHuntPlan, PER_PAGE } = require("../../static/js/hunt-plan.js");
+
+/* Servidor falso: `total` monstros paginados como o /api/hunt/plan. */
+function fakeApi(total, failPage = null) {
+  const urls = [];
+  const fetchJson = async (url) => {
+    urls.push(url);
+    const params = new URL(url, "http://x").searchParams;
+    const page = Number(params.get("page"));
+    const perPage = Math.min(Number(params.get("per_page")), PER_PAGE);
+    if (page === failPage) return null;
+    const names = Array.from({ length: total }, (_, i) => `m${i}`);
+    const slice = names.slice((page - 1) * perPage, page * perPage);
+    return {
+      total,
+      page,
+      per_page: perPage,
+      pages: Math.ceil(total / perPage),
+      results: slice.map((name, i) => ({ name, kills_daily: i + 1, kills_level: null })),
+    };
+  };
+  return { fetchJson, urls };
+}
+
+test("bestiário maior que uma página: o plano cobre todos os monstros", async () => {
+  const api = fakeApi(PER_PAGE * 2 + 17);
+  const map = await loadHuntPlan(api.fetchJson, "stamina=green");
+  assert.equal(Object.keys(map).length, PER_PAGE * 2 + 17);
+  assert.deepEqual(map.m416, { daily: 17, level: null });
+  assert.equal(api.urls.length, 3);
+  assert.match(api.urls[0], /^\/api\/hunt\/plan\?stamina=green&page=1&per_page=200$/);
+});
+
+test("uma página só: um request", async () => {
+  const api = fakeApi(29);
+  const map = await loadHuntPlan(api.fetchJson, "boost=1");
+  assert.equal(Object.keys(map).length, 29);
+  assert.equal(api.urls.length, 1);
+});
+
+test("página intermediária com erro: não devolve plano truncado", async () => {
+  const api = fakeApi(PER_PAGE * 3, 2);
+  assert.equal(await loadHuntPlan(api.fetchJson, ""), null);
+});
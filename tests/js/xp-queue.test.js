@@ -0,0 +1,126 @@
+// node --test tests/js   (também roda pelo pytest: tests/test_js.py)
+const test = require("node:test");
+const assert = require("node:assert/strict");
+
+const QUEUE = require.resolve("../../static/js/xp-queue.js");
+
+/* IndexedDB mínimo, só o que o xp-queue.js usa: um banco, um store por keyPath. */
+function fakeIndexedDB(initial = null) {
+  const dbs = new Map(initial ? [["yonexus", initial]] : []);
+  return {
+    dbs,
+    open(name, version) {
+      const req = {};
+      setTimeout(() => {
+        const state = dbs.get(name) || { version: 0, stores: new Map() };
+        dbs.set(name, state);
+        const db = {
+          objectStoreNames: { contains: (s) => state.stores.has(s) },
+          createObjectStore: (s, { keyPath }) => state.stores.set(s, { keyPath, rows: new Map() }),
+          transaction: (s, mode) => {
+            const t = { objectStore: () => store(state.stores.get(s)) };
+            setTimeout(() => t.oncomplete && t.oncomplete());
+            return t;
+          },
+        };
+        req.result = db;
+        if (state.version < version) {
+          req.transaction = { objectStore: (s) => store(state.stores.get(s)) };
+          req.onupgradeneeded({ oldVersion: state.version });
+          state.version = version;
+        }
+        req.onsuccess();
+      });
+      return req;
+    },
+  };
+}
+
+function store(s) {
+  return {
+    put: (row) => { s.rows.set(row[s.keyPath], { ...row }); return {}; },
+    delete: (key) => { s.rows.delete(key); return {}; },
+    clear: () => { s.rows.clear(); return {}; },
+    getAll: () => ({ result: [...s.rows.values()] }),
+  };
+}
+
+/* /xp/sync falso: responde como o servidor, 409 se o lote não for da sessão atual. */
+function fakeServer(sessionUser) {
+  const server = { sessionUser, bodies: [] };
+  globalThis.fetch = async (url, opts) => {
+    const body = JSON.parse(opts.body);
+    server.bodies.push(body);
+    if (body.user_id !== server.sessionUser) return { ok: false, status: 409, json: async () => ({}) };
+    const keys = body.entries.map((e) => e.key);
+    return { ok: true, json: async () => ({ accepted: keys, duplicates: [], rejected: [], metrics: null }) };
+  };
+  return server;
+}
+
+function loadQueue(idb) {
+  globalThis.indexedDB = idb;
+  delete require.cache[QUEUE];
+  return require(QUEUE);
+}
+
+test("cada usuário só vê e envia a própria fila", async () => {
+  const q = loadQueue(fakeIndexedDB());
+  await q.enqueue(1, 10, 500);
+  await q.enqueue(2, 20, 700);
+
+  assert.deepEqual((await q.pending(1)).map((e) => e.xp), [500]);
+  assert.deepEqual((await q.pending(2)).map((e) => e.xp), [700]);
+
+  const server = fakeServer(2); // navegador agora logado como o usuário 2
+  const result = await q.flush(2);
+  assert.equal(result.sent, 1);
+  assert.deepEqual(server.bodies.map((b) => [b.user_id, b.entries.map((e) => e.xp)]), [[2, [700]]]);
+  assert.equal((await q.pending(1)).length, 1); // a fila do usuário 1 ficou intacta
+});
+
+test("fila de outra conta não é enviada nem apagada com a sessão errada", async () => {
+  const q = loadQueue(fakeIndexedDB());
+  await q.enqueue(1, 10, 500);
+  fakeServer(2);
+  await assert.rejects(q.flush(1), /sync 409/);
+  assert.equal((await q.pending(1)).length, 1);
+});
+
+test("logout envia o pendente e esvazia a fila de quem saiu", async () => {
+  const q = loadQueue(fakeIndexedDB());
+  await q.enqueue(1, 10, 500);
+  await q.enqueue(2, 20, 700);
+  const server = fakeServer(1);
+
+  assert.equal(await q.beforeLogout(1, () => assert.fail("nada ficou pendente")), true);
+  assert.equal(server.bodies.length, 1);
+  assert.equal((await q.pending(1)).length, 0);
+  assert.equal((await q.pending(2)).length, 1);
+});
+
+test("logout offline pergunta antes de descartar", async () => {
+  const q = loadQueue(fakeIndexedDB());
+  await q.enqueue(1, 10, 500);
+  globalThis.fetch = async () => { throw new TypeError("offline"); };
+
+  assert.equal(await q.beforeLogout(1, (n) => { assert.equal(n, 1); return false; }), false);
+  assert.equal((await q.pending(1)).length, 1);
+  assert.equal(await q.beforeLogout(1, () => true), true);
+  assert.equal((await q.pending(1)).length, 0);
+});
+
+test("registros da versão 1 (sem dono) são descartados na atualização", async () => {
+  const old = { version: 1, stores: new Map([["xpQueue", { keyPath: "key", rows: new Map([
+    ["old", { key: "old", character_id: 10, xp: 300, date: "2026-01-01", created_at: 1 }],
+  ]) }]]) };
+  const q = loadQueue(fakeIndexedDB(old));
+  assert.equal((await q.pending(1)).length, 0);
+  assert.equal(old.stores.get("xpQueue").rows.size, 0);
+});
+
+test("tag do Background Sync carrega o usuário", () => {
+  const q = loadQueue(fakeIndexedDB());
+  assert.equal(q.userFromTag(q.syncTag(42)), 42);
+  assert.equal(q.userFromTag("xp-sync"), null);
+});
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from bestiary_index import BestiaryIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "bestiary.json"
+    path.write_text(json.dumps({
+        "lycanthrope": [{"name": "Wolf", "hp": 25, "exp": 18}, {"name": "Werewolf", "hp": 1955, "exp": 1900}],
+        "construct": [{"name": "Golem", "hp": 1500, "exp": 1450}],
+        "dragon": [{"name": "Dragon Lord", "hp": 1900, "exp": 2100}],
+    }), encoding="utf-8")
+    return BestiaryIndex(str(path))
+
+
+def names(index, q):
+    return [m["name"] for m in index.search(q)["results"]]
+
+
+def test_infix_query_matches_middle_of_word(index):
+    assert names(index, "olf") == ["Werewolf", "Wolf"]
+    assert names(index, "ol") == ["Golem", "Werewolf", "Wolf"]
+
+
+def test_ranking_and_typos_still_work(index):
+    assert names(index, "wolf") == ["Wolf", "Werewolf"]
+    assert names(index, "lord") == ["Dragon Lord"]
+    assert names(index, "dragn lord") == ["Dragon Lord"]
+    assert names(index, "w") == ["Werewolf", "Wolf"]
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def _db_path(url=None):
+    env = {k: v for k, v in os.environ.items() if k not in ("CHAT_DATABASE_URL", "CHAT_DB_PATH")}
+    if url:
+        env["CHAT_DATABASE_URL"] = url
+    code = "import chat_archive; print(chat_archive.DB_PATH)"
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_scripts_use_the_app_chat_database(tmp_path):
+    # chat_archive/export_chat/debug_chat_db abrem o mesmo arquivo do bind "chat"
+    assert _db_path(f"sqlite:///{tmp_path / 'chat.db'}") == str(tmp_path / "chat.db")
+    assert _db_path() == os.path.join(ROOT, "data", "chat.db")
+
+
+def test_relative_sqlite_url_resolves_like_flask_sqlalchemy():
+    assert _db_path("sqlite:///chat.db") == os.path.join(ROOT, "instance", "chat.db")
@@ -0,0 +1,41 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import chat_search
+from chat_archive import ChatArchive
+
+
+def _insert(conn, id, text, created_at):
+    conn.execute(
+        "INSERT INTO chat_message (id, username, channel_type, world, text, created_at) "
+        "VALUES (?, 'alice', 'global', NULL, ?, ?)",
+        (id, text, created_at.strftime("%Y-%m-%d %H:%M:%S.%f")),
+    )
+
+
+def test_archived_messages_leave_the_search_index(app, tmp_path):
+    db_path = tmp_path / "chat.db"
+    conn = sqlite3.connect(db_path)
+    with conn:
+        _insert(conn, 1, "dragon lord antigo", datetime.utcnow() - timedelta(days=120))
+        _insert(conn, 2, "dragon lord recente", datetime.utcnow())
+    assert [r["id"] for r in chat_search.search(conn, "dragon", sort="oldest")] == [1, 2]
+
+    moved = ChatArchive(tmp_path / "chat_archive").archive_old(db_path=db_path, hot_days=30)
+    assert sum(moved.values()) == 1
+
+    # o DELETE do arquivamento tira a linha do índice na mesma transação
+    assert [r["id"] for r in chat_search.search(conn, "dragon", sort="oldest")] == [2]
+    assert conn.execute(f"SELECT COUNT(*) FROM {chat_search.FTS_TABLE}").fetchone()[0] == 1
+    conn.close()
+
+
+def test_rebuild_drops_rows_no_longer_in_the_table(app, tmp_path):
+    conn = sqlite3.connect(tmp_path / "chat.db")
+    with conn:
+        _insert(conn, 1, "hunt em roshamuul", datetime.utcnow())
+        # banco antigo: linha órfã no índice (arquivada antes do trigger de DELETE)
+        conn.execute(f"INSERT INTO {chat_search.FTS_TABLE} (rowid, text) VALUES (99, 'hunt velha')")
+    assert chat_search.rebuild(conn) == 1
+    assert [r["id"] for r in chat_search.search(conn, "hunt")] == [1]
+    conn.close()
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+
+def _drop_cascade(table):
+    """Recria `table` com a FK para character sem ON DELETE CASCADE (banco não migrado)."""
+    from models import db
+
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        ddl = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)
+        ).scalar()
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" RENAME TO "_old_{table}"')
+        conn.exec_driver_sql(ddl.replace("ON DELETE CASCADE", ""))
+        conn.exec_driver_sql(f'INSERT INTO "{table}" SELECT * FROM "_old_{table}"')
+        conn.exec_driver_sql(f'DROP TABLE "_old_{table}"')
+        conn.commit()
+
+
+@pytest.fixture
+def legacy_db(app, make_user):
+    """alice com dois personagens e histórico, num banco sem cascade em xp_log/xp_entry."""
+    from models import Character, XpEntry, XpLog, cascade_ready, db
+
+    user_id = make_user("alice")
+    with app.app_context():
+        first = Character.query.filter_by(user_id=user_id).one()
+        second = Character(user_id=user_id, char_name="Alt Char", xp_start=0, xp_goal=100, daily_goal=10)
+        db.session.add(second)
+        db.session.flush()
+        today = date.today().isoformat()
+        for ch in (first, second):
+            db.session.add(XpLog(character_id=ch.id, date=today, xp=100))
+            db.session.add(XpEntry(key=f"key-{ch.id:08d}", character_id=ch.id, date=today, xp=100))
+        db.session.commit()
+        ids = (user_id, first.id, second.id)
+
+        _drop_cascade("xp_log")
+        _drop_cascade("xp_entry")
+        assert not cascade_ready()
+    return ids
+
+
+def _rows(model, **filters):
+    return model.query.filter_by(**filters).count()
+
+
+def test_character_delete_route_without_cascade(app, legacy_db):
+    from models import Character, XpEntry, XpLog
+
+    user_id, first_id, second_id = legacy_db
+    client = app.test_client()
+    assert client.post("/login", data={"username": "alice", "password": "pw"}).status_code == 302
+
+    assert client.post("/characters/delete", data={"character_id": second_id}).status_code == 302
+    with app.app_context():
+        assert _rows(Character, id=second_id) == 0
+        assert _rows(XpLog, character_id=second_id) == 0
+        assert _rows(XpEntry, character_id=second_id) == 0
+        assert _rows(XpLog, character_id=first_id) == 1
+
+
+def test_manage_delete_user_without_cascade(app, legacy_db, monkeypatch):
+    import manage
+    from models import Character, User, XpEntry, XpLog
+
+    user_id, first_id, second_id = legacy_db
+    monkeypatch.setattr("builtins.input", lambda prompt="": "s")
+    with app.app_context():
+        manage.YonexusCLI().do_delete_user("alice")
+        assert _rows(User, id=user_id) == 0
+        assert _rows(Character, user_id=user_id) == 0
+        assert XpLog.query.count() == 0
+        assert XpEntry.query.count() == 0
@@ -0,0 +1,10 @@
+def test_pages_cover_the_whole_bestiary(login):
+    client = login("alice")
+    first = client.get("/api/hunt/plan?per_page=10").get_json()
+    assert first["pages"] > 1
+
+    names = []
+    for page in range(1, first["pages"] + 1):
+        data = client.get(f"/api/hunt/plan?per_page=10&page={page}").get_json()
+        names += [r["name"] for r in data["results"]]
+    assert len(names) == len(set(names)) == first["total"]
@@ -0,0 +1,40 @@
+EXTERNAL = {"REMOTE_ADDR": "203.0.113.7"}
+LOOPBACK = {"REMOTE_ADDR": "127.0.0.1"}  # atrás de nginx na mesma máquina, todo request vem daqui
+
+
+def test_metrics_denied_without_token_or_allowlist(app):
+    client = app.test_client()
+    assert client.get("/internal/metrics", environ_base=LOOPBACK).status_code == 403
+    assert client.get("/internal/metrics", environ_base=EXTERNAL).status_code == 403
+
+
+def test_metrics_with_token(app):
+    app.config["METRICS_TOKEN"] = "s3cret"
+    client = app.test_client()
+    assert client.get("/internal/metrics", environ_base=LOOPBACK).status_code == 403
+    assert client.get("/internal/metrics", headers={"Authorization": "Bearer errado"}).status_code == 403
+    r = client.get("/internal/metrics", headers={"Authorization": "Bearer s3cret"}, environ_base=EXTERNAL)
+    assert r.status_code == 200
+    assert "yonexus_http_requests_total" in r.get_data(as_text=True)
+
+
+def test_metrics_allowlist(app):
+    app.config["METRICS_ALLOW_IPS"] = frozenset({"10.0.0.5"})
+    client = app.test_client()
+    assert client.get("/internal/metrics", environ_base={"REMOTE_ADDR": "10.0.0.5"}).status_code == 200
+    assert client.get("/internal/metrics", environ_base=LOOPBACK).status_code == 403
+
+
+def test_chat_stats_needs_admin_or_metrics_access(app, login):
+    client = login("alice")
+    # usuário comum, mesmo chegando por loopback (proxy local), não vê os internos do chat
+    assert client.get("/chat/api/stats", environ_base=LOOPBACK).status_code == 403
+
+    app.config["METRICS_TOKEN"] = "s3cret"
+    assert app.test_client().get("/chat/api/stats", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    import app as app_module
+    app_module.profiler.admins = frozenset({"alice"})
+    r = client.get("/chat/api/stats", environ_base=EXTERNAL)
+    assert r.status_code == 200
+    assert {"flood", "writer", "pid"} <= r.get_json().keys()
@@ -0,0 +1,13 @@
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node não instalado")
+def test_js_units():
+    # testes do JS do front (node:test), ex.: ordem das mensagens do chat
+    r = subprocess.run(["node", "--test", "tests/js/"], cwd=ROOT, capture_output=True, text=True)
+    assert r.returncode == 0, r.stdout + r.stderr
@@ -0,0 +1,28 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def admin(app, login):
+    import app as app_module
+    app_module.profiler.admins = frozenset({"alice"})
+    os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+    for i in range(3):
+        with open(os.path.join(app.config["PROFILE_DIR"], f"p{i}.json"), "w", encoding="utf-8") as f:
+            json.dump({"id": f"p{i}"}, f)
+    return login("alice")
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", 3), ("?limit=abc", 3), ("?limit=0", 1), ("?limit=-5", 1), ("?limit=2", 2), ("?limit=99999", 3),
+])
+def test_profiles_limit_is_parsed_and_clamped(admin, query, expected):
+    r = admin.get("/internal/profiles" + query)
+    assert r.status_code == 200
+    assert len(r.get_json()) == expected
+
+
+def test_profiles_need_admin(login):
+    assert login("bob").get("/internal/profiles").status_code == 403
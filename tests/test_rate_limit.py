@@ -0,0 +1,78 @@
+import sys
+import types
+
+import pytest
+
+from rate_limit import FloodControl, MemoryBucketStore, RedisBucketStore, make_bucket_store
+
+SLOW = 0.001  # recarga desprezível durante o teste: o limite é o burst
+
+
+class BrokenRedis:
+    """Cliente Redis cujo servidor caiu: todo comando levanta."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls += 1
+            raise ConnectionError("Redis fora do ar")
+        return run
+
+    def delete(self, *keys):
+        raise ConnectionError("Redis fora do ar")
+
+
+@pytest.fixture
+def broken_redis(monkeypatch):
+    client = BrokenRedis()
+    fake = types.ModuleType("redis")
+    fake.Redis = types.SimpleNamespace(from_url=lambda url: client)
+    monkeypatch.setitem(sys.modules, "redis", fake)
+    return client
+
+
+def test_redis_store_fails_open(broken_redis, caplog):
+    store = make_bucket_store("redis://localhost:6379/0")
+    assert isinstance(store, RedisBucketStore)
+
+    assert all(store.take("user:1", SLOW, 1) for _ in range(5))
+    assert broken_redis.calls == 5
+    assert "liberando envio" in caplog.text
+    store.drop("conn:x")  # não levanta
+
+    flood = FloodControl(store, user_rate=SLOW, user_burst=1, conn_rate=SLOW, conn_burst=1)
+    assert all(flood.allow(1, "sid") for _ in range(3))
+    assert flood.stats()["allowed"] == 3
+
+
+def test_connection_limit():
+    flood = FloodControl(MemoryBucketStore(), user_rate=SLOW, user_burst=100, conn_rate=SLOW, conn_burst=2)
+    assert [flood.allow(1, "a") for _ in range(3)] == [True, True, False]
+    assert flood.rejected_conn == 1 and flood.rejected_user == 0
+
+    # outra conexão do mesmo usuário tem o próprio bucket; desconectar zera o da antiga
+    assert flood.allow(1, "b")
+    flood.forget_connection("a")
+    assert flood.allow(1, "a")
+
+
+def test_user_limit_spans_connections_and_workers():
+    # dois workers no mesmo barramento (local://): o limite por usuário é somado
+    worker_a = FloodControl(make_bucket_store("local://flood-test"), user_rate=SLOW, user_burst=3,
+                            conn_rate=SLOW, conn_burst=100)
+    worker_b = FloodControl(make_bucket_store("local://flood-test"), user_rate=SLOW, user_burst=3,
+                            conn_rate=SLOW, conn_burst=100)
+
+    results = [worker_a.allow(7, "a1"), worker_b.allow(7, "b1"), worker_a.allow(7, "a2"), worker_b.allow(7, "b2")]
+    assert results == [True, True, True, False]
+    assert worker_b.rejected_user == 1 and worker_b.rejected_conn == 0
+    assert worker_a.allow(8, "a3")  # outro usuário não é afetado
+
+
+def test_bucket_refills_at_rate():
+    store = MemoryBucketStore()
+    assert store.take("user:1", 2.0, 1, now=100.0)
+    assert not store.take("user:1", 2.0, 1, now=100.1)
+    assert store.take("user:1", 2.0, 1, now=100.6)
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_import_and_create_app_do_not_monkey_patch(tmp_path):
+    # só o wsgi.py aplica o monkey_patch; importar o app (testes, scripts) não
+    code = (
+        "import app; app.create_app(); "
+        "import eventlet.patcher; print(eventlet.patcher.is_monkey_patched('socket'))"
+    )
+    env = dict(os.environ, SOCKETIO_ASYNC_MODE="eventlet",
+               DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+               CHAT_DATABASE_URL=f"sqlite:///{tmp_path / 'chat.db'}")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "False"
+
+
+def test_wsgi_patches_before_importing_app(tmp_path):
+    code = "import wsgi, eventlet.patcher; print(eventlet.patcher.is_monkey_patched('socket'))"
+    env = dict(os.environ, SOCKETIO_ASYNC_MODE="eventlet",
+               DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+               CHAT_DATABASE_URL=f"sqlite:///{tmp_path / 'chat.db'}")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "True"
@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from xp_collector import PAGE_SIZE, collect
+
+
+class FakeClient:
+    """TibiaData falso: pages = {mundo: [entradas da página 1, da página 2, ...]}."""
+
+    def __init__(self, pages, worlds, failing=()):
+        self.pages = pages
+        self.worlds = worlds
+        self.failing = set(failing)
+        self.calls = {"character": 0, "highscore": 0}
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def character(self, name):
+        with self._lock:
+            self.calls["character"] += 1
+        return {"world": self.worlds[name], "level": 100}
+
+    def highscore_page(self, world, page):
+        with self._lock:
+            self.calls["highscore"] += 1
+            self.requested.append(page)
+        if page in self.failing:
+            raise IOError(f"página {page} fora do ar")
+        pages = self.pages.get(world, [])
+        return (pages[page - 1] if page <= len(pages) else []), len(pages)
+
+
+def highscore(total_pages, placed):
+    """Páginas cheias de anônimos; placed = {nome: (rank, experiência)}."""
+    pages = [[{"name": f"Filler {p}-{i}", "level": 50, "value": 1, "rank": (p - 1) * PAGE_SIZE + i + 1}
+              for i in range(PAGE_SIZE)] for p in range(1, total_pages + 1)]
+    for name, (rank, experience) in placed.items():
+        page, slot = divmod(rank - 1, PAGE_SIZE)
+        pages[page][slot] = {"name": name, "level": 100, "value": experience, "rank": rank}
+    return pages
+
+
+@pytest.fixture
+def tracked(app, make_user):
+    """alice com coleta ligada, bob sem; os dois em Antica."""
+    from models import Character, db
+
+    make_user("alice")
+    make_user("bob")
+    with app.app_context():
+        alice = Character.query.filter_by(char_name="Alice Char").one()
+        alice.auto_xp = True
+        db.session.commit()
+        return alice.id
+
+
+def run(app, client, **kw):
+    with app.app_context():
+        return collect(client, concurrency=4, max_pages=20, today="2026-10-19", **kw)
+
+
+def snapshot(app, char_id):
+    from models import XpSnapshot, db
+
+    with app.app_context():
+        snap = db.session.get(XpSnapshot, char_id)
+        return snap and (snap.world, snap.experience, snap.rank)
+
+
+def xp_logged(app, char_id):
+    from models import XpLog
+
+    with app.app_context():
+        return sum(r.xp for r in XpLog.query.filter_by(character_id=char_id))
+
+
+def test_only_opted_in_characters_are_collected(app, tracked):
+    from models import Character
+
+    worlds = {"Alice Char": "Antica", "Bob Char": "Antica"}
+    pages = {"Antica": highscore(1, {"Alice Char": (3, 10_000), "Bob Char": (4, 20_000)})}
+    client = FakeClient(pages, worlds)
+
+    stats = run(app, client)
+    assert stats["characters"] == 1
+    assert client.calls["character"] == 1  # bob nem é resolvido
+    assert snapshot(app, tracked) == ("Antica", 10_000, 3)
+    with app.app_context():
+        bob = Character.query.filter_by(char_name="Bob Char").one().id
+    assert snapshot(app, bob) is None
+
+
+def test_page_count_is_probed_before_the_parallel_wave(app, tracked):
+    # mundo de uma página: uma chamada só, mesmo com concurrency=4
+    client = FakeClient({"Antica": highscore(1, {})}, {"Alice Char": "Antica"})
+    run(app, client)
+    assert client.calls["highscore"] == 1
+
+    # três páginas, personagem na última: não pede páginas além do total
+    client = FakeClient({"Antica": highscore(3, {"Alice Char": (120, 5_000)})}, {"Alice Char": "Antica"})
+    run(app, client)
+    assert sorted(client.requested) == [1, 2, 3]
+
+
+def test_failed_page_keeps_the_snapshot(app, tracked):
+    worlds = {"Alice Char": "Antica"}
+    run(app, FakeClient({"Antica": highscore(3, {"Alice Char": (120, 5_000)})}, worlds))
+    assert snapshot(app, tracked) == ("Antica", 5_000, 120)
+
+    # página do personagem com erro: não some do mundo nem perde a base
+    stats = run(app, FakeClient({"Antica": highscore(3, {"Alice Char": (120, 6_000)})}, worlds, failing={3}))
+    assert stats["failed_pages"] == 1
+    assert snapshot(app, tracked) == ("Antica", 5_000, 120)
+    assert xp_logged(app, tracked) == 0
+
+    # na coleta seguinte o delta é contado inteiro a partir da base mantida
+    run(app, FakeClient({"Antica": highscore(3, {"Alice Char": (110, 6_500)})}, worlds))
+    assert snapshot(app, tracked) == ("Antica", 6_500, 110)
+    assert xp_logged(app, tracked) == 1_500
+
+
+def test_missing_from_a_fully_read_highscore_resets_the_world(app, tracked):
+    worlds = {"Alice Char": "Antica"}
+    run(app, FakeClient({"Antica": highscore(2, {"Alice Char": (60, 5_000)})}, worlds))
+    run(app, FakeClient({"Antica": highscore(2, {})}, worlds))
+    assert snapshot(app, tracked) == (None, None, None)
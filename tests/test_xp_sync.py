@@ -0,0 +1,33 @@
+from datetime import date
+
+
+def _entry(key, char_id, xp=100):
+    return {"key": key, "character_id": char_id, "xp": xp, "date": date.today().isoformat()}
+
+
+def test_sync_refuses_another_users_queue(app, login, make_user):
+    from models import Character
+
+    alice_id = make_user("alice")
+    client = login("bob")
+    with app.app_context():
+        alice_char = Character.query.filter_by(user_id=alice_id).one().id
+
+    # fila da alice no mesmo navegador, sessão do bob: 409 (nada rejeitado, nada apagado)
+    r = client.post("/xp/sync", json={"user_id": alice_id, "entries": [_entry("k" * 16, alice_char)]})
+    assert r.status_code == 409
+    r = client.post("/xp/sync", json={"entries": [_entry("k" * 16, alice_char)]})
+    assert r.status_code == 409
+
+
+def test_sync_accepts_own_queue(app, login):
+    from models import Character, User
+
+    client = login("alice")
+    with app.app_context():
+        user = User.query.filter_by(username="alice").one()
+        user_id, char_id = user.id, Character.query.filter_by(user_id=user.id).one().id
+
+    r = client.post("/xp/sync", json={"user_id": user_id, "entries": [_entry("a" * 16, char_id)]})
+    assert r.status_code == 200
+    assert r.get_json()["accepted"] == ["a" * 16]
@@ -0,0 +1,30 @@
+"""
+Ponto de entrada do servidor. Aplica o monkey_patch do eventlet (modo padrão do
+Socket.IO) antes de importar o app e monta o app:
+
+  gunicorn -k eventlet -w 1 wsgi:app
+  python wsgi.py      # servidor de desenvolvimento (cria o schema que faltar)
+
+O patch fica aqui, e não no app.py, para que `import app` / create_app() não
+tenham efeito colateral (testes, bench_startup.py, scripts).
+"""
+
+import os
+
+if os.environ.get("SOCKETIO_ASYNC_MODE", "eventlet") == "eventlet":
+    # precisa rodar antes de qualquer import que use socket/threading (requests,
+    # urllib3, SQLAlchemy...), senão cada chamada HTTP bloqueia o hub inteiro
+    # (inclusive os sockets do chat)
+    import eventlet
+    eventlet.monkey_patch()
+
+from app import create_app, socketio  # noqa: E402
+from models import init_schema  # noqa: E402
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        init_schema()
+    socketio.run(app, debug=True)
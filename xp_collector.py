@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Coleta automática de XP pelo highscore de experiência de cada mundo (TibiaData).
+
+Só entram personagens com a coleta ligada (Character.auto_xp, em Configurações);
+para esses o lançamento manual (/add_xp, /xp/sync) fica bloqueado, senão a mesma
+caçada seria contada duas vezes.
+
+Em vez de uma chamada por personagem, os personagens são agrupados por mundo e
+cada mundo é lido página a página do highscore
+(`/v4/highscores/<mundo>/experience/all/<página>`, 50 por página, top 1000):
+
+1. personagens sem mundo conhecido (novos ou renomeados) são resolvidos uma vez
+   por `/v4/character/<nome>`; o mundo fica no XpSnapshot;
+2. a primeira página de cada mundo (a do personagem na última coleta, ou a 1)
+   é lida sozinha e traz o total de páginas; as seguintes vão em ondas de
+   --concurrency requisições, até esse total, e param assim que todos os
+   personagens do mundo aparecem;
+3. a experiência lida é comparada com o snapshot anterior e a diferença entra no
+   XpLog do dia (models.add_xp_bulk); o snapshot é atualizado.
+
+A primeira leitura de um personagem só grava o snapshot (não há base para delta).
+Página que falhou não apaga nada: o snapshot de quem não apareceu só é
+esquecido (mundo = None, para resolver de novo) quando o highscore do mundo foi
+lido inteiro sem erro. Personagem fora do top 1000 não tem XP coletado; deixe a
+coleta desligada para ele e use o lançamento manual.
+
+Uso (agende no cron/systemd, ou deixe em loop):
+
+  python xp_collector.py run [--dry-run] [--concurrency 4] [--max-pages 20]
+  python xp_collector.py run --loop [--interval 1800]
+
+Para testar sem a API real: `python loadtest.py collect` (TibiaData falso local).
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert, select, update
+from urllib3.util import Retry
+
+from models import Character, XpSnapshot, add_xp_bulk, create_cli_app, db
+
+PAGE_SIZE = 50  # entradas por página do highscore
+
+
+class TibiaDataClient:
+    """Cliente HTTP mínimo do TibiaData, com retry e contagem de chamadas."""
+
+    def __init__(self, base_url, timeout=10.0, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.6, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=["GET"])
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.calls = {"character": 0, "highscore": 0}
+
+    def _get(self, path):
+        r = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def character(self, name) -> dict:
+        self.calls["character"] += 1
+        char = self._get(f"/v4/character/{quote(name)}")["character"]["character"]
+        return {"world": char["world"], "level": int(char["level"])}
+
+    def highscore_page(self, world, page):
+        """(entradas [{name, level, value, rank}], total de páginas)"""
+        self.calls["highscore"] += 1
+        data = self._get(f"/v4/highscores/{quote(world)}/experience/all/{page}")["highscores"]
+        entries = data.get("highscore_list") or []
+        total_pages = int((data.get("highscore_page") or {}).get("total_pages") or 0)
+        return entries, total_pages
+
+
+def load_tracked(opted_in_only=True):
+    """
+    Personagens com coleta ligada (já validados) + snapshot (None se nunca coletado).
+    opted_in_only=False: todos os validados (só para o loadtest medir chamadas).
+    """
+    q = (
+        select(Character.id, Character.char_name, XpSnapshot)
+        .outerjoin(XpSnapshot, XpSnapshot.character_id == Character.id)
+        .where(Character.validation.is_(None))  # pendentes/inválidos ficam para o job de validação
+    )
+    if opted_in_only:
+        q = q.where(Character.auto_xp.is_(True))
+    rows = db.session.execute(q).all()
+    return [(char_id, name, snap) for char_id, name, snap in rows]
+
+
+def resolve_worlds(client, names, pool):
+    """Mundo de cada nome (uma chamada por personagem). Falhas ficam de fora."""
+    def fetch(name):
+        try:
+            return name, client.character(name)["world"]
+        except Exception:
+            return name, None
+
+    return {name: world for name, world in pool.map(fetch, names) if world}
+
+
+def scan_world(client, world, wanted, hints, pool, concurrency, max_pages):
+    """
+    Lê páginas do highscore de `world` até achar todos os nomes de `wanted`
+    (minúsculos). Devolve ({nome: entrada}, páginas pedidas, páginas com erro,
+    completo). completo = todas as páginas do highscore foram lidas sem erro, ou
+    seja, quem não apareceu está mesmo fora dele.
+    """
+    found = {}
+    order = sorted(p for p in hints if p <= max_pages) + [p for p in range(1, max_pages + 1) if p not in hints]
+    last_page = None  # total de páginas informado pelo highscore
+    ok, failed = set(), set()
+
+    def fetch(page):
+        try:
+            return page, client.highscore_page(world, page)
+        except Exception:
+            return page, None
+
+    while order and len(found) < len(wanted):
+        # até saber o total de páginas, uma por vez (mundo com 1 página = 1 chamada)
+        size = concurrency if last_page is not None else 1
+        limit = min(max_pages, last_page or max_pages)
+        wave = []
+        while order and len(wave) < size:
+            page = order.pop(0)
+            if page <= limit:
+                wave.append(page)
+        if not wave:
+            break
+        for page, result in pool.map(fetch, wave):
+            if result is None:
+                failed.add(page)
+                continue
+            entries, pages = result
+            ok.add(page)
+            if pages:
+                last_page = pages
+            for entry in entries:
+                key = (entry.get("name") or "").lower()
+                if key in wanted:
+                    found[key] = entry
+
+    complete = last_page is not None and last_page <= max_pages and ok >= set(range(1, last_page + 1))
+    return found, len(ok) + len(failed), len(failed), complete
+
+
+def collect(client, concurrency=4, max_pages=20, dry_run=False, today=None, opted_in_only=True):
+    """Uma coleta completa. Devolve um dict com os números da rodada."""
+    t0 = time.perf_counter()
+    today = today or date.today().isoformat()
+    now = datetime.utcnow()
+    tracked = load_tracked(opted_in_only)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        # 1) mundo de quem ainda não tem (ou mudou de nome)
+        unresolved = sorted({
+            name for _, name, snap in tracked
+            if snap is None or snap.world is None or snap.char_name != name
+        })
+        worlds = resolve_worlds(client, unresolved, pool)
+
+        # 2) agrupa por mundo e lê as páginas
+        by_world = {}
+        hints = {}
+        for char_id, name, snap in tracked:
+            same = snap is not None and snap.char_name == name
+            world = snap.world if same and snap.world else worlds.get(name)
+            if not world:
+                continue
+            by_world.setdefault(world, {}).setdefault(name.lower(), []).append(char_id)
+            if same and snap.rank:
+                hints.setdefault(world, set()).add((snap.rank - 1) // PAGE_SIZE + 1)
+
+        entries = {}
+        pages = failed_pages = 0
+        complete = set()  # mundos lidos inteiros, sem página com erro
+        for world, wanted in sorted(by_world.items()):
+            found, read, failed, whole = scan_world(client, world, wanted, hints.get(world, set()), pool,
+                                                    concurrency, max_pages)
+            pages += read
+            failed_pages += failed
+            if whole:
+                complete.add(world)
+            for key, entry in found.items():
+                for char_id in wanted[key]:
+                    entries[char_id] = (world, entry)
+
+    # 3) diferença contra o snapshot anterior
+    world_of = {char_id: w for w, names in by_world.items() for ids in names.values() for char_id in ids}
+    deltas = {}
+    snap_updates, snap_inserts = [], []
+    for char_id, name, snap in tracked:
+        world = world_of.get(char_id)
+        if world is None:
+            continue
+        same = snap is not None and snap.char_name == name
+        row = {"character_id": char_id, "char_name": name, "world": world,
+               "experience": None, "level": None, "rank": None, "observed_at": None}
+        if char_id in entries:
+            entry = entries[char_id][1]
+            experience = int(entry.get("value") or 0)
+            row.update(experience=experience, level=int(entry.get("level") or 0),
+                       rank=int(entry.get("rank") or 0) or None, observed_at=now)
+            if same and snap.experience is not None and experience != snap.experience:
+                deltas[char_id] = experience - snap.experience
+        elif same and snap.experience is None:
+            continue  # segue fora do highscore: nada a atualizar
+        elif same and world in complete:
+            # estava no highscore e sumiu (transferência de mundo ou saiu do top 1000):
+            # esquece o mundo para resolver de novo na próxima coleta
+            row["world"] = None
+        elif same:
+            continue  # página com erro ou highscore lido só em parte: mantém a base
+        (snap_updates if snap is not None else snap_inserts).append(row)
+
+    log_updates = log_inserts = 0
+    if not dry_run:
+        if deltas:
+            log_updates, log_inserts = add_xp_bulk({(c, today): d for c, d in deltas.items()})
+        if snap_updates:
+            db.session.execute(update(XpSnapshot), snap_updates)
+        if snap_inserts:
+            db.session.execute(insert(XpSnapshot), snap_inserts)
+        db.session.commit()
+
+    return {
+        "characters": len(tracked),
+        "worlds": len(by_world),
+        "found": len(entries),
+        "missing": len(world_of) - len(entries),
+        "unresolved": len(tracked) - len(world_of),
+        "deltas": len(deltas),
+        "xp_total": sum(deltas.values()),
+        "xplog_updated": log_updates,
+        "xplog_inserted": log_inserts,
+        "calls_character": client.calls["character"],
+        "calls_highscore": client.calls["highscore"],
+        "pages": pages,
+        "failed_pages": failed_pages,
+        "seconds": round(time.perf_counter() - t0, 2),
+        "dry_run": dry_run,
+    }
+
+
+def print_stats(stats):
+    print(
+        f"{'(dry-run) ' if stats['dry_run'] else ''}"
+        f"{stats['characters']} personagens em {stats['worlds']} mundos: "
+        f"{stats['found']} no highscore, {stats['missing']} fora, {stats['unresolved']} sem mundo | "
+        f"{stats['deltas']} com XP nova ({stats['xp_total']:+,}) | "
+        f"chamadas: {stats['calls_highscore']} páginas ({stats['failed_pages']} com erro) + "
+        f"{stats['calls_character']} personagens | "
+        f"{stats['seconds']}s"
+    )
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Coleta de XP pelo highscore do TibiaData.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="coleta uma vez (ou em loop com --loop)")
+    p_run.add_argument("--concurrency", type=int, help="requisições simultâneas (XP_COLLECTOR_CONCURRENCY)")
+    p_run.add_argument("--max-pages", type=int, help="páginas por mundo (XP_COLLECTOR_MAX_PAGES)")
+    p_run.add_argument("--dry-run", action="store_true", help="só mostra, não grava")
+    p_run.add_argument("--loop", action="store_true", help="repete a cada --interval segundos")
+    p_run.add_argument("--interval", type=float, help="segundos entre coletas (XP_COLLECTOR_INTERVAL)")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    app = create_cli_app()
+    cfg = app.config
+    concurrency = args.concurrency or cfg["XP_COLLECTOR_CONCURRENCY"]
+    max_pages = args.max_pages or cfg["XP_COLLECTOR_MAX_PAGES"]
+    interval = args.interval or cfg["XP_COLLECTOR_INTERVAL"]
+
+    with app.app_context():
+        while True:
+            client = TibiaDataClient(cfg["TIBIADATA_URL"], timeout=cfg["HTTP_TIMEOUT"], pool_size=concurrency)
+            try:
+                print_stats(collect(client, concurrency, max_pages, dry_run=args.dry_run))
+            except Exception as e:
+                db.session.rollback()
+                if not args.loop:
+                    raise
+                print(f"❌ Coleta falhou: {e}", file=sys.stderr)
+            if not args.loop:
+                break
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
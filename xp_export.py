@@ -0,0 +1,88 @@
+"""
+Exportação do histórico de XP (XpLog) por personagem, em streaming, para o /xp/export.
+
+O histórico é lido em blocos por keyset ((date, id) > último visto), sem cursor
+aberto durante o download: um cliente lento não segura transação de leitura no
+SQLite, a memória fica constante e o cabeçalho sai antes da primeira query.
+Cada linha traz o XP do dia e o total acumulado (xp_start + tudo até aquele dia,
+inclusive o que ficou antes do filtro de data).
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import func, select, tuple_
+
+from models import XpLog, db
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+CSV_COLUMNS = ("character_id", "char_name", "date", "xp", "xp_total")
+
+
+def iter_xp_rows(characters, start=None, end=None, chunk_size=1000):
+    """
+    Dicts com CSV_COLUMNS, personagem por personagem, em ordem de data.
+    `characters`: lista de (id, char_name, xp_start); start/end: "YYYY-MM-DD" inclusivos.
+    """
+    for char_id, char_name, xp_start in characters:
+        total = xp_start or 0
+        if start:
+            total += db.session.execute(
+                select(func.coalesce(func.sum(XpLog.xp), 0))
+                .where(XpLog.character_id == char_id, XpLog.date < start)
+            ).scalar()
+
+        last = None
+        while True:
+            q = select(XpLog.id, XpLog.date, XpLog.xp).where(XpLog.character_id == char_id)
+            if start:
+                q = q.where(XpLog.date >= start)
+            if end:
+                q = q.where(XpLog.date <= end)
+            if last is not None:
+                q = q.where(tuple_(XpLog.date, XpLog.id) > last)
+            rows = db.session.execute(q.order_by(XpLog.date, XpLog.id).limit(chunk_size)).all()
+            db.session.rollback()  # encerra a leitura entre blocos (não segura lock no SQLite)
+            if not rows:
+                break
+            for row_id, day, xp in rows:
+                total += xp
+                yield {"character_id": char_id, "char_name": char_name, "date": day, "xp": xp, "xp_total": total}
+            last = (rows[-1].date, rows[-1].id)
+            if len(rows) < chunk_size:
+                break
+
+
+def _csv_line(values) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue()
+
+
+def encode(rows, fmt, batch=500):
+    """Texto em pedaços de até `batch` linhas; o CSV começa pelo cabeçalho."""
+    if fmt == "csv":
+        yield _csv_line(CSV_COLUMNS)
+    lines = []
+    for r in rows:
+        if fmt == "csv":
+            lines.append(_csv_line(r[c] for c in CSV_COLUMNS))
+        else:
+            lines.append(json.dumps(r, ensure_ascii=False) + "\n")
+        if len(lines) >= batch:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def gzip_stream(chunks, level=6):
+    """Bytes gzip de um gerador de texto, com sync flush a cada pedaço (o download não trava)."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for text in chunks:
+        data = z.compress(text.encode("utf-8")) + z.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield z.flush()